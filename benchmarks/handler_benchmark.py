@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Page latency and SQL statement benchmark for the custom hub-config handlers
+For each hub size, starts an in-process hub (see harness.py), bulk-seeds
+students, groups and running servers, logs in as a student, a teacher, the
+admin and a few unenrolled students, then times every custom page's GET
+and POST and counts the SQL statements each request runs.
+
+The suite fails (exit status 1) when a request runs more SQL statements
+than in the stored baseline, or when its statement count grows with the
+number of users (an N+1 query). Latency is compared against the baseline
+too, but only reported unless --fail-on-latency is given, as it depends
+on the machine.
+
+Usage: python3 benchmarks/handler_benchmark.py [--users 100,1000,10000] [--groups 10]
+                                              [--running 0.25] [--repeat 20]
+                                              [--baseline benchmarks/handler_baseline.json]
+                                              [--update-baseline] [--json results.json]
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from harness import SEED_PASSWORD, HubClient, InProcessHub, StatementCounter, Timings, print_report
+from provisioning import AccountSpec
+from tornado.httpclient import AsyncHTTPClient
+from urllib.parse import urlencode
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'handler_baseline.json')
+
+# Passwords only need to verify here, not to be expensive
+BENCH_BCRYPT_ROUNDS = 4
+
+# actor: 'student' (enrolled), 'teacher', 'admin', or 'newcomer' (a different
+#   unenrolled student for each request)
+# body: None, or body(i, client) -> (body, headers) for request number i
+# expect: status code of a successful request
+Scenario = namedtuple('Scenario', ['name', 'actor', 'method', 'path', 'body', 'expect'])
+
+
+def move_student(i, client):
+    """Move one student per request from Prof. Doe's class to Prof. Smith's"""
+    # Seeded students i % 3 == 0 are in teacher-prof-doe (classes sorted by name)
+    body = json.dumps({'group': 'teacher-prof-smith', 'add': [f'stud{3 * i:05d}']})
+    return body, {'Content-Type': 'application/json', 'X-XSRFToken': client.xsrf}
+
+
+def enroll_form(i, client):
+    return urlencode({'class_slug': 'prof-smith-class', '_xsrf': client.xsrf}), {}
+
+
+SCENARIOS = [
+    Scenario('home (student)', 'student', 'GET', '/hub/home', None, 200),
+    Scenario('home (teacher)', 'teacher', 'GET', '/hub/home', None, 200),
+    Scenario('home (admin)', 'admin', 'GET', '/hub/home', None, 200),
+    Scenario('my-students', 'teacher', 'GET', '/hub/my-students', None, 200),
+    Scenario('my-students roster', 'teacher', 'GET', '/hub/my-students/roster', None, 200),
+    Scenario('admin-panel', 'admin', 'GET', '/hub/admin-panel', None, 200),
+    Scenario('manage-groups', 'admin', 'GET', '/hub/manage-groups', None, 200),
+    Scenario('manage-groups users', 'admin', 'GET', '/hub/manage-groups/users?group=teacher-prof-smith', None, 200),
+    Scenario('manage-groups POST', 'admin', 'POST', '/hub/manage-groups', move_student, 200),
+    Scenario('enroll', 'newcomer', 'GET', '/hub/enroll', None, 200),
+    Scenario('enroll POST', 'newcomer', 'POST', '/hub/enroll', enroll_form, 302),
+]
+
+
+async def login(hub, username):
+    client = HubClient(hub.url)
+    page = await client.request('/hub/login')
+    response = await client.post_login(page, username, SEED_PASSWORD)
+    if response.code != 302 or '/hub/login' in response.headers.get('Location', ''):
+        raise RuntimeError(f"Could not log in as {username} (HTTP {response.code})")
+    return client
+
+
+async def bench_size(args, students):
+    """{scenario name: summary} for a hub with `students` students"""
+    requests = args.repeat + 1  # the first request of each scenario warms caches and is not counted
+    async with InProcessHub(log_level=args.log_level) as hub:
+        print(f"Seeding {students} students, {args.groups} extra groups, {args.running:.0%} running...")
+        started = time.perf_counter()
+        hub.seed(
+            students, extra_groups=args.groups, running_fraction=args.running,
+            unenrolled=requests, rounds=BENCH_BCRYPT_ROUNDS,
+        )
+        hub.provision_accounts([
+            AccountSpec('admin', None, SEED_PASSWORD, True, []),
+            AccountSpec('prof_smith', None, SEED_PASSWORD, False, []),
+        ], rounds=BENCH_BCRYPT_ROUNDS)
+        print(f"  seeded in {time.perf_counter() - started:.1f}s")
+
+        clients = {
+            'student': await login(hub, 'stud00000'),
+            'teacher': await login(hub, 'prof_smith'),
+            'admin': await login(hub, 'admin'),
+        }
+        newcomers = [await login(hub, f'newcomer{i:03d}') for i in range(requests)]
+
+        counter = StatementCounter(hub.app.db.get_bind())
+        timings = []
+        for scenario in SCENARIOS:
+            timing = Timings(scenario.name)
+            for i in range(requests):
+                client = newcomers[i] if scenario.actor == 'newcomer' else clients[scenario.actor]
+                body, headers = scenario.body(i, client) if scenario.body else (None, {})
+                before = counter.count
+                request_started = time.perf_counter()
+                response = await client.request(scenario.path, scenario.method, body, headers)
+                elapsed = time.perf_counter() - request_started
+                if i == 0:
+                    timing.start()
+                    continue
+                timing.record(elapsed, response.code == scenario.expect, counter.count - before)
+            timing.stop()
+            timings.append(timing)
+
+    print_report(f"{students} students", timings)
+    return {timing.name: timing.summary() for timing in timings}
+
+
+def compare(results, baseline, latency_tolerance):
+    """(report lines, failures) for results against a baseline and across sizes"""
+    lines, failures = [], []
+    sizes = sorted(results, key=int)
+    for size in sizes:
+        for name, now in results[size].items():
+            if now['errors']:
+                failures.append(f"{name} @ {size} users: {now['errors']} failed request(s)")
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                lines.append(f"  {name:<24}{size:>7}  SQL {now['statements']:>4}  p50 {now['p50_ms']:>8} ms  (new)")
+                continue
+            change = (now['p50_ms'] - before['p50_ms']) / before['p50_ms'] if before['p50_ms'] else 0.0
+            flags = []
+            if now['statements'] > before['statements']:
+                flags.append('MORE SQL')
+                failures.append(
+                    f"{name} @ {size} users: {now['statements']} SQL statements, baseline {before['statements']}"
+                )
+            if change > latency_tolerance:
+                flags.append('SLOWER')
+            lines.append(
+                f"  {name:<24}{size:>7}  SQL {before['statements']:>4} -> {now['statements']:<4}"
+                f"  p50 {before['p50_ms']:>8} -> {now['p50_ms']:>8} ms ({change:+.0%})  {' '.join(flags)}"
+            )
+
+    # N+1: the statement count of a page must not depend on how many users there are
+    if len(sizes) > 1:
+        smallest, largest = sizes[0], sizes[-1]
+        for name, now in results[largest].items():
+            small = results[smallest].get(name)
+            if small and now['statements'] > small['statements']:
+                failures.append(
+                    f"{name}: {small['statements']} SQL statements at {smallest} users, "
+                    f"{now['statements']} at {largest} (N+1 query)"
+                )
+    return lines, failures
+
+
+def latency_regressions(results, baseline, latency_tolerance):
+    regressions = []
+    for size, scenarios in results.items():
+        for name, now in scenarios.items():
+            before = baseline.get(size, {}).get(name)
+            if before and before['p50_ms'] and now['p50_ms'] > before['p50_ms'] * (1 + latency_tolerance):
+                regressions.append(f"{name} @ {size} users: p50 {now['p50_ms']} ms, baseline {before['p50_ms']} ms")
+    return regressions
+
+
+def run_size(args, students):
+    AsyncHTTPClient.configure(None, max_clients=10)
+    return asyncio.run(bench_size(args, students))
+
+
+def run(args):
+    """Each size in a fresh process: the hub-config modules register their metrics once per process"""
+    results = {}
+    for students in args.users:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            results[str(students)] = pool.submit(run_size, args, students).result()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the custom hub-config pages")
+    parser.add_argument('--users', default='100,1000,10000', help="comma-separated hub sizes (up to 50000)")
+    parser.add_argument('--groups', type=int, default=10, help="extra non-class groups")
+    parser.add_argument('--running', type=float, default=0.25, help="fraction of students with a running server")
+    parser.add_argument('--repeat', type=int, default=20, help="timed requests per page")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument('--update-baseline', action='store_true', help="store these results as the baseline")
+    parser.add_argument('--latency-tolerance', type=float, default=0.5, help="p50 increase flagged as slower")
+    parser.add_argument('--fail-on-latency', action='store_true', help="also fail on slower pages")
+    parser.add_argument('--log-level', default='WARN', help="hub log level")
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    args = parser.parse_args()
+    args.users = sorted(int(size) for size in args.users.split(','))
+    if 3 * (args.repeat + 1) > args.users[0]:
+        parser.error(f"--users must be at least {3 * (args.repeat + 1)} for --repeat {args.repeat}")
+
+    results = run(args)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Results written to {args.json}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    lines, failures = compare(results, baseline, args.latency_tolerance)
+    print()
+    print("=" * 80)
+    print(f"Comparison with {args.baseline}" if baseline else "No baseline yet")
+    print("=" * 80)
+    for line in lines:
+        print(line)
+
+    if args.fail_on_latency:
+        failures += latency_regressions(results, baseline, args.latency_tolerance)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        print(f"✓ Baseline written to {args.baseline}")
+
+    if failures:
+        print()
+        for failure in failures:
+            print(f"✗ {failure}")
+        sys.exit(1)
+    print()
+    print("✓ No SQL regressions")
+
+
+if __name__ == '__main__':
+    main()
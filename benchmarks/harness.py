@@ -0,0 +1,365 @@
+"""
+In-process JupyterHub for benchmarking the hub-config modules
+Loads config.yaml the way the chart does (hub.config, then hub.extraConfig
+in key order) with the hub-config/ modules from this checkout, and swaps
+only what needs a cluster: SQLite instead of the PVC database, a no-op
+spawner and an in-memory proxy. Requests go straight to the hub's own
+HTTP server; the client runs in the same event loop as the hub, so
+numbers are comparable between runs on the same machine, not absolute.
+
+Usage: see login_benchmark.py
+"""
+
+from http.cookies import SimpleCookie
+from sqlalchemy import event, insert, select
+from traitlets.config import Config
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+from urllib.parse import urlencode
+import os
+import re
+import socket
+import statistics
+import sys
+import tempfile
+import time
+import yaml
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from jupyterhub import orm
+from jupyterhub.app import JupyterHub
+from jupyterhub.proxy import Proxy
+from jupyterhub.spawner import Spawner
+from nativeauthenticator.orm import UserInfo
+from provisioning import AccountSpec, apply_plan, credential_row, hash_password, open_session, plan_accounts
+
+
+CONFIG_YAML = os.path.join(REPO_ROOT, 'config.yaml')
+HUB_CONFIG_DIR = os.path.join(REPO_ROOT, 'hub-config')
+# Where the chart mounts the hub-config-modules ConfigMap
+CHART_HUB_CONFIG_DIR = '/usr/local/etc/jupyterhub/hub-config'
+
+# Periodic jobs that talk to Kubernetes or spawn servers; not part of a request path
+BACKGROUND_TASKS = ('lab-prewarm', 'placeholder-pool', 'placement-sync', 'idle-culler')
+
+STUDENT_EMAIL_DOMAIN = 'stud.acs.pub.ro'
+# Password of every account created by InProcessHub.seed()
+SEED_PASSWORD = 'bench-password'
+SEED_CHUNK = 5000
+XSRF_RE = re.compile(r'name="_xsrf" value="([^"]+)"')
+
+
+class NoopSpawner(Spawner):
+    """Spawner that pretends to start servers without running anything"""
+
+    _running = False
+
+    async def start(self):
+        self._running = True
+        return ('127.0.0.1', 1)
+
+    async def stop(self, now=False):
+        self._running = False
+
+    async def poll(self):
+        return None if self._running else 0
+
+
+class MemoryProxy(Proxy):
+    """Proxy that only remembers its routes"""
+
+    should_start = False
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.routes = {}
+
+    async def add_route(self, routespec, target, data):
+        self.routes[routespec] = {'routespec': routespec, 'target': target, 'data': data}
+
+    async def delete_route(self, routespec):
+        self.routes.pop(routespec, None)
+
+    async def get_all_routes(self):
+        return dict(self.routes)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def hub_config(db_url, port, log_level='WARN'):
+    """Config equivalent to the chart's, runnable without a cluster.
+
+    Must be called inside the event loop the hub will run in, as the
+    extraConfig modules schedule their background jobs on it.
+    """
+    with open(CONFIG_YAML) as f:
+        values = yaml.safe_load(f)['hub']
+
+    c = Config(values.get('config') or {})
+    c.JupyterHub.template_paths = [HUB_CONFIG_DIR]
+    c.NativeAuthenticator.template_paths = [HUB_CONFIG_DIR]
+
+    os.environ['HUB_CONFIG_DIR'] = HUB_CONFIG_DIR
+    namespace = {'c': c}
+    for key, code in sorted((values.get('extraConfig') or {}).items()):
+        code = code.replace(CHART_HUB_CONFIG_DIR, HUB_CONFIG_DIR)
+        exec(compile(code, f'extraConfig/{key}', 'exec'), namespace)
+    for name in BACKGROUND_TASKS:
+        namespace['hub_tasks'].cancel(name)
+
+    c.JupyterHub.db_url = db_url
+    c.JupyterHub.spawner_class = NoopSpawner
+    c.JupyterHub.proxy_class = MemoryProxy
+    c.JupyterHub.hub_ip = '127.0.0.1'
+    c.JupyterHub.hub_port = port
+    c.JupyterHub.cookie_secret = os.urandom(32)
+    c.JupyterHub.log_level = log_level
+    c.JupyterHub.cleanup_servers = False
+    return c, namespace
+
+
+class InProcessHub:
+    """JupyterHub application started in the current event loop.
+
+    async with InProcessHub() as hub:
+        hub.provision_students(300)
+        client = HubClient(hub.url)
+    """
+
+    def __init__(self, db_path=None, log_level='WARN'):
+        self._tmpdir = tempfile.TemporaryDirectory(prefix='hub-bench-')
+        # Everything comes from hub_config(); the hub still wants a config file to load
+        self.config_file = os.path.join(self._tmpdir.name, 'jupyterhub_config.py')
+        open(self.config_file, 'w').close()
+        db_path = db_path or os.path.join(self._tmpdir.name, 'jupyterhub.sqlite')
+        self.db_url = f'sqlite:///{db_path}'
+        self.port = free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.log_level = log_level
+        self.app = None
+        self.namespace = None
+
+    async def __aenter__(self):
+        config, self.namespace = hub_config(self.db_url, self.port, self.log_level)
+        self.app = JupyterHub.instance(config=config)
+        await self.app.initialize(['--config', self.config_file])
+        await self.app.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for name in BACKGROUND_TASKS:
+            self.namespace['hub_tasks'].cancel(name)
+        await self.app.cleanup()
+        self.app.http_server.stop()
+        JupyterHub.clear_instance()
+        self._tmpdir.cleanup()
+
+    def class_groups(self):
+        return sorted(
+            name for name in self.app.config.JupyterHub.load_groups if name.startswith('teacher-prof-')
+        )
+
+    def provision_accounts(self, accounts, rounds, workers=None):
+        """Create or update AccountSpecs through provisioning.py"""
+        session = open_session(self.db_url)
+        try:
+            apply_plan(session, plan_accounts(session, accounts), rounds=rounds, workers=workers)
+        finally:
+            session.close()
+
+    def provision_students(self, count, rounds, workers=None):
+        """Pre-authorized students stud00000.., spread over the classes; returns {username: password}"""
+        classes = self.class_groups()
+        accounts = [
+            AccountSpec(
+                username=f'stud{i:05d}',
+                email=f'stud{i:05d}@{STUDENT_EMAIL_DOMAIN}',
+                password=f'bench-password-{i:05d}',
+                is_admin=False,
+                groups=[classes[i % len(classes)]],
+            )
+            for i in range(count)
+        ]
+        self.provision_accounts(accounts, rounds=rounds, workers=workers)
+        return {account.username: account.password for account in accounts}
+
+    def seed(self, students, extra_groups=0, running_fraction=0.0, unenrolled=0, rounds=4):
+        """Bulk-create a populated hub, all accounts with password SEED_PASSWORD.
+
+        students: stud00000.. spread over the classes, with a spawner each;
+            the first running_fraction of them have a running server
+        extra_groups: bench-group-000.. groups, each with every 10th student
+        unenrolled: newcomer000.. students in no class yet
+        Rows go in with bulk inserts, so 50k users take seconds, not hours.
+        """
+        classes = self.class_groups()
+        session = open_session(self.db_url)
+        try:
+            group_ids = dict(session.query(orm.Group.name, orm.Group.id).filter(orm.Group.name.in_(classes)))
+            if extra_groups:
+                session.execute(insert(orm.Group.__table__), [
+                    {'name': f'bench-group-{g:03d}'} for g in range(extra_groups)
+                ])
+            extra_ids = [
+                group_id for (group_id,) in
+                session.query(orm.Group.id).filter(orm.Group.name.like('bench-group-%')).order_by(orm.Group.id)
+            ]
+
+            names = [f'stud{i:05d}' for i in range(students)] + [f'newcomer{i:03d}' for i in range(unenrolled)]
+            password_hash = hash_password(SEED_PASSWORD, rounds)
+            running = int(students * running_fraction)
+            for start in range(0, len(names), SEED_CHUNK):
+                chunk = names[start:start + SEED_CHUNK]
+                session.execute(insert(orm.User.__table__), [{'name': name} for name in chunk])
+                session.execute(insert(UserInfo.__table__), [
+                    credential_row(name, f'{name}@{STUDENT_EMAIL_DOMAIN}', password_hash) for name in chunk
+                ])
+            user_ids = dict(session.execute(
+                select(orm.User.__table__.c.name, orm.User.__table__.c.id)
+                .where(orm.User.__table__.c.name.like('stud%'))
+            ).all())
+
+            memberships = []
+            for i in range(students):
+                user_id = user_ids[f'stud{i:05d}']
+                memberships.append({'user_id': user_id, 'group_id': group_ids[classes[i % len(classes)]]})
+                if extra_ids and i % 10 == 0:
+                    memberships.append({'user_id': user_id, 'group_id': extra_ids[(i // 10) % len(extra_ids)]})
+            for start in range(0, len(memberships), SEED_CHUNK):
+                session.execute(insert(orm.user_group_map), memberships[start:start + SEED_CHUNK])
+
+            first_server = (session.query(orm.Server.id).order_by(orm.Server.id.desc()).limit(1).scalar() or 0) + 1
+            if running:
+                session.execute(insert(orm.Server.__table__), [
+                    {'ip': '127.0.0.1', 'port': 1, 'base_url': f'/user/stud{i:05d}/'} for i in range(running)
+                ])
+            session.execute(insert(orm.Spawner.__table__), [
+                {
+                    'user_id': user_ids[f'stud{i:05d}'],
+                    'name': '',
+                    'server_id': first_server + i if i < running else None,
+                }
+                for i in range(students)
+            ])
+            session.commit()
+        finally:
+            session.close()
+
+
+class StatementCounter:
+    """Counts the SQL statements an engine executes"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+class HubClient:
+    """One browser session against the hub: keeps its cookies, follows no redirects"""
+
+    def __init__(self, url):
+        self.url = url
+        self.cookies = {}
+        self.http = AsyncHTTPClient()
+
+    @property
+    def xsrf(self):
+        return self.cookies.get('_xsrf')
+
+    async def request(self, path, method='GET', body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        try:
+            response = await self.http.fetch(
+                self.url + path, method=method, body=body, headers=headers,
+                follow_redirects=False, raise_error=False, request_timeout=300,
+            )
+        except HTTPClientError as e:
+            response = e.response
+        for header in response.headers.get_list('Set-Cookie'):
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        return response
+
+    async def post_login(self, page, username, password):
+        """Post the login form from `page` (the GET /hub/login response)"""
+        match = XSRF_RE.search(page.body.decode('utf-8', 'replace'))
+        form = {'username': username, 'password': password}
+        if match:
+            form['_xsrf'] = match.group(1)
+        return await self.request('/hub/login', method='POST', body=urlencode(form))
+
+
+class Timings:
+    """Latency samples of one kind of request"""
+
+    def __init__(self, name):
+        self.name = name
+        self.samples = []
+        self.errors = 0
+        self.statements = []
+        self.started = None
+        self.finished = None
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def record(self, seconds, ok=True, statements=None):
+        self.samples.append(seconds)
+        if not ok:
+            self.errors += 1
+        if statements is not None:
+            self.statements.append(statements)
+
+    def summary(self):
+        """{requests, errors, rps, p50_ms, p95_ms, p99_ms, max_ms}, plus statements if counted"""
+        samples = sorted(self.samples)
+        if len(samples) > 1:
+            cuts = statistics.quantiles(samples, n=100, method='inclusive')
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = samples[0] if samples else 0.0
+        wall = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        summary = {
+            'requests': len(samples),
+            'errors': self.errors,
+            'rps': round(len(samples) / wall, 1) if wall > 0 else 0.0,
+            'p50_ms': round(p50 * 1000, 1),
+            'p95_ms': round(p95 * 1000, 1),
+            'p99_ms': round(p99 * 1000, 1),
+            'max_ms': round(samples[-1] * 1000, 1) if samples else 0.0,
+        }
+        if self.statements:
+            # Median: a cache expiring mid-run should not count as a regression
+            summary['statements'] = int(statistics.median_low(self.statements))
+        return summary
+
+
+def print_report(title, timings):
+    counted = any(timing.statements for timing in timings)
+    print("=" * 80)
+    print(title)
+    print("=" * 80)
+    print(
+        f"{'request':<24}{'count':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        + (f"{'SQL':>6}" if counted else "")
+    )
+    for timing in timings:
+        s = timing.summary()
+        print(
+            f"{timing.name:<24}{s['requests']:>7}{s['errors']:>8}{s['rps']:>9}"
+            f"{s['p50_ms']:>9}{s['p95_ms']:>9}{s['p99_ms']:>9}"
+            + (f"{s.get('statements', ''):>6}" if counted else "")
+        )
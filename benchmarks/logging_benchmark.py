@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Overhead of the structured logging facility (hub-config/00_hub_logging.py)
+Times one log call in each state a hot path sees: level disabled, sampled
+out, and written, next to the six f-string log.info calls the home page
+used to make per view. Exits 1 if a disabled or sampled-out call costs
+more than its budget, as those run on every request. Budgets are on top
+of calling an empty function with the same arguments, so they hold on
+slow and fast machines alike.
+
+Usage: python3 benchmarks/logging_benchmark.py [--calls 200000]
+"""
+
+from harness import HUB_CONFIG_DIR
+import argparse
+import logging
+import os
+import sys
+import timeit
+
+
+# Budget per call that does not write a record, in nanoseconds over an empty call
+OVERHEAD_BUDGET_NS = {
+    'disabled': 1000,
+    'sampled out': 3000,
+}
+
+FIELDS = dict(
+    user='stud00042', groups=('teacher-prof-smith',), admin=False, teacher=False, student=True,
+)
+
+
+def load_logging():
+    namespace = {}
+    path = os.path.join(HUB_CONFIG_DIR, '00_hub_logging.py')
+    with open(path) as f:
+        exec(compile(f.read(), path, 'exec'), namespace)
+    return namespace
+
+
+def per_call_ns(func, calls):
+    return min(timeit.repeat(func, number=calls, repeat=3)) / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cost of hub-config log calls")
+    parser.add_argument('--calls', type=int, default=200000, help="calls per measurement")
+    args = parser.parse_args()
+
+    hub_logger = logging.getLogger('JupyterHub')
+    hub_logger.propagate = False
+    handler = logging.StreamHandler(open(os.devnull, 'w'))
+    handler.setFormatter(logging.Formatter('[%(levelname)1.1s %(asctime)s %(name)s] %(message)s'))
+    hub_logger.addHandler(handler)
+    hub_logger.setLevel(logging.INFO)
+
+    ns = load_logging()
+    log = ns['HubLogger']('bench')
+    log.rate_limit, log.interval = 20, 3600
+    for _ in range(log.rate_limit):
+        log.info('bench.sampled', **FIELDS)
+    writer = ns['HubLogger']('bench', rate_limit=0)
+    legacy = logging.getLogger('JupyterHub.legacy')
+
+    def legacy_home_view():
+        username, user_groups = FIELDS['user'], set(FIELDS['groups'])
+        is_admin, is_teacher, is_student = FIELDS['admin'], FIELDS['teacher'], FIELDS['student']
+        legacy.info(f"CustomHome DEBUG: User {username} has groups: {user_groups}")
+        legacy.info(f"CustomHome DEBUG: User={username}, Groups={user_groups}")
+        legacy.info(f"CustomHome DEBUG: is_admin={is_admin}, is_teacher={is_teacher}, is_student={is_student}")
+        legacy.info(f"CustomHome DEBUG: Will show Admin buttons: {is_admin}, Teacher buttons: {is_teacher}, Student info: {is_student}")
+        legacy.info(f"CustomHome DEBUG: Adding TEACHER BUTTON for {username}")
+        legacy.info(f"CustomHome DEBUG: Adding ADMIN BUTTONS for {username}")
+
+    def empty(event, **fields):
+        pass
+
+    baseline = per_call_ns(lambda: empty('bench.empty', **FIELDS), args.calls)
+    results = {
+        'disabled': per_call_ns(lambda: log.debug('bench.disabled', **FIELDS), args.calls),
+        'sampled out': per_call_ns(lambda: log.info('bench.sampled', **FIELDS), args.calls),
+        'written': per_call_ns(lambda: writer.info('bench.written', **FIELDS), args.calls // 10),
+        'legacy home view (6 f-strings)': per_call_ns(legacy_home_view, args.calls // 10),
+    }
+
+    print("=" * 72)
+    print(f"Cost per log call (an empty call with the same arguments takes {baseline:.0f} ns)")
+    print("=" * 72)
+    failures = []
+    for name, ns_per_call in results.items():
+        overhead = ns_per_call - baseline
+        budget = OVERHEAD_BUDGET_NS.get(name)
+        verdict = ''
+        if budget is not None:
+            verdict = f"(budget {budget} ns)" if overhead <= budget else f"✗ over budget of {budget} ns"
+            if overhead > budget:
+                failures.append(name)
+        print(f"{name:<32}{ns_per_call:>10.0f} ns  +{max(overhead, 0):.0f} ns  {verdict}")
+
+    if failures:
+        sys.exit(1)
+    print("✓ Within the overhead budget")
+
+
+if __name__ == '__main__':
+    main()
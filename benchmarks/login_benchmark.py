@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark: a whole lab logging in at once
+Starts an in-process hub (see harness.py) with N pre-authorized students,
+then every student loads the login form, posts it through NativeAuthenticator's
+LoginHandler and student_post_auth_hook, and loads the home page.
+Reports p50/p95/p99 latency and requests per second for each step.
+
+NativeAuthenticator checks bcrypt on the event loop, so the password cost
+dominates login latency; use --bcrypt-rounds 4 to measure the hub-config
+modules alone, or the production cost (12) to measure what students see.
+
+Usage: python3 benchmarks/login_benchmark.py [--users 300] [--concurrency N]
+                                            [--bcrypt-rounds 12] [--home-loads 1] [--json results.json]
+"""
+
+from harness import HubClient, InProcessHub, Timings, print_report
+from provisioning import BCRYPT_ROUNDS
+from tornado.httpclient import AsyncHTTPClient
+import argparse
+import asyncio
+import json
+import time
+
+
+async def timed(timings, request, ok):
+    started = time.perf_counter()
+    response = await request
+    timings.record(time.perf_counter() - started, ok(response))
+    return response
+
+
+def logged_in(response):
+    return response.code == 302 and '/hub/login' not in response.headers.get('Location', '')
+
+
+async def run(args):
+    AsyncHTTPClient.configure(None, max_clients=args.concurrency)
+    login_form = Timings('login form')
+    login_post = Timings('login POST')
+    home = Timings('home page')
+
+    async with InProcessHub(log_level=args.log_level) as hub:
+        print(f"Provisioning {args.users} students (bcrypt rounds {args.bcrypt_rounds})...")
+        passwords = hub.provision_students(args.users, rounds=args.bcrypt_rounds, workers=args.workers)
+        clients = {username: HubClient(hub.url) for username in passwords}
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def login(username, client):
+            async with semaphore:
+                page = await timed(login_form, client.request('/hub/login'), lambda r: r.code == 200)
+                await timed(login_post, client.post_login(page, username, passwords[username]), logged_in)
+
+        async def load_home(client):
+            async with semaphore:
+                for _ in range(args.home_loads):
+                    await timed(home, client.request('/hub/home'), lambda r: r.code == 200)
+
+        print(f"Logging in {args.users} students, {args.concurrency} at a time...")
+        for timings in (login_form, login_post):
+            timings.start()
+        await asyncio.gather(*(login(username, client) for username, client in clients.items()))
+        for timings in (login_form, login_post):
+            timings.stop()
+
+        print(f"Loading the home page {args.home_loads} time(s) per student...")
+        home.start()
+        await asyncio.gather(*(load_home(client) for client in clients.values()))
+        home.stop()
+
+    print_report(
+        f"{args.users} students, concurrency {args.concurrency}, bcrypt rounds {args.bcrypt_rounds}",
+        [login_form, login_post, home],
+    )
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'users': args.users,
+                'concurrency': args.concurrency,
+                'bcrypt_rounds': args.bcrypt_rounds,
+                'results': {t.name: t.summary() for t in (login_form, login_post, home)},
+            }, f, indent=2)
+        print(f"✓ Results written to {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent student logins")
+    parser.add_argument('--users', type=int, default=300, help="students logging in")
+    parser.add_argument('--concurrency', type=int, help="requests in flight (default: all users)")
+    parser.add_argument('--bcrypt-rounds', type=int, default=BCRYPT_ROUNDS, help="bcrypt cost of the passwords")
+    parser.add_argument('--workers', type=int, help="password hashing processes while provisioning")
+    parser.add_argument('--home-loads', type=int, default=1, help="home page loads per student")
+    parser.add_argument('--log-level', default='WARN', help="hub log level")
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    args = parser.parse_args()
+    args.concurrency = args.concurrency or args.users
+
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
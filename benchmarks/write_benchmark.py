@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Event loop lag while hub-config writes contend with the hub's own
+Every newcomer posts the enrollment form (hub_writer, on its own thread)
+while as many enrolled students log in (the hub's session, on the event
+loop). Both need SQLite's single write lock, so a long hub_writer
+transaction shows up as event loop lag: the loop thread waits for the
+lock. Reports request latency, write group sizes and the lag seen by a
+10 ms probe, next to the hub's custom_event_loop_lag_seconds.
+
+Usage: python3 benchmarks/write_benchmark.py [--users 200] [--concurrency 50] [--batch 20]
+"""
+
+from harness import SEED_PASSWORD, HubClient, InProcessHub, Timings, print_report
+from tornado.httpclient import AsyncHTTPClient
+from urllib.parse import urlencode
+import argparse
+import asyncio
+import statistics
+import time
+
+
+CLASS_SLUGS = ['prof-smith-class', 'prof-jones-class', 'prof-doe-class']
+PROBE_INTERVAL_SECONDS = 0.01
+
+
+async def probe_loop(lags, done):
+    """Record how late the loop wakes up a 10 ms sleep until `done` is set"""
+    loop = asyncio.get_running_loop()
+    while not done.is_set():
+        expected = loop.time() + PROBE_INTERVAL_SECONDS
+        await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+def histogram_totals(histogram):
+    """(count, sum) of an unlabelled prometheus Histogram"""
+    count = total = 0
+    for metric in histogram.collect():
+        for sample in metric.samples:
+            if sample.name.endswith('_count'):
+                count = sample.value
+            elif sample.name.endswith('_sum'):
+                total = sample.value
+    return count, total
+
+
+async def timed(timings, request, ok):
+    started = time.perf_counter()
+    response = await request
+    timings.record(time.perf_counter() - started, ok(response))
+    return response
+
+
+async def run(args):
+    AsyncHTTPClient.configure(None, max_clients=args.concurrency)
+    enroll = Timings('enroll POST')
+    login = Timings('login POST')
+
+    async with InProcessHub(log_level=args.log_level) as hub:
+        print(f"Seeding {args.users} newcomers and {args.users} enrolled students...")
+        hub.seed(args.users, unenrolled=args.users)
+        ns = hub.namespace
+        ns['hub_writer'].max_batch = args.batch
+
+        async def log_in(username):
+            client = HubClient(hub.url)
+            page = await client.request('/hub/login')
+            return client, page
+
+        newcomers = []
+        for i in range(args.users):
+            client, page = await log_in(f'newcomer{i:03d}')
+            await client.post_login(page, f'newcomer{i:03d}', SEED_PASSWORD)
+            newcomers.append(client)
+        students = [(f'stud{i:05d}', *(await log_in(f'stud{i:05d}'))) for i in range(args.users)]
+
+        def enrolled(response):
+            return response.code in (200, 302)
+
+        def logged_in(response):
+            return response.code == 302 and '/hub/login' not in response.headers.get('Location', '')
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def post_enrollment(i, client):
+            body = urlencode({'class_slug': CLASS_SLUGS[i % len(CLASS_SLUGS)], '_xsrf': client.xsrf})
+            async with semaphore:
+                await timed(enroll, client.request('/hub/enroll', 'POST', body), enrolled)
+
+        async def post_login(name, client, page):
+            async with semaphore:
+                await timed(login, client.post_login(page, name, SEED_PASSWORD), logged_in)
+
+        lag_count, lag_sum = histogram_totals(ns['EVENT_LOOP_LAG_SECONDS'])
+        batch_count, batch_sum = histogram_totals(ns['DB_WRITE_BATCH_SIZE'])
+        lags, done = [], asyncio.Event()
+        probe = asyncio.ensure_future(probe_loop(lags, done))
+
+        print(f"{args.users} enrollments racing {args.users} logins, write groups of up to {args.batch}...")
+        for timings in (enroll, login):
+            timings.start()
+        await asyncio.gather(
+            *(post_enrollment(i, client) for i, client in enumerate(newcomers)),
+            *(post_login(name, client, page) for name, client, page in students),
+        )
+        for timings in (enroll, login):
+            timings.stop()
+        done.set()
+        await probe
+
+        hub_lag_count, hub_lag_sum = histogram_totals(ns['EVENT_LOOP_LAG_SECONDS'])
+        hub_lag_count, hub_lag_sum = hub_lag_count - lag_count, hub_lag_sum - lag_sum
+        batches, written = histogram_totals(ns['DB_WRITE_BATCH_SIZE'])
+        batches, written = batches - batch_count, written - batch_sum
+
+    print_report(f"{args.users} enrollments and {args.users} logins, write groups of up to {args.batch}", [enroll, login])
+    cuts = statistics.quantiles(lags, n=100, method='inclusive') if len(lags) > 1 else [0.0] * 99
+    print(f"write groups: {int(batches)} committing {int(written)} writes")
+    print(
+        f"event loop lag ({len(lags)} probes): p50 {cuts[49] * 1000:.1f} ms, p99 {cuts[98] * 1000:.1f} ms, "
+        f"max {max(lags, default=0.0) * 1000:.1f} ms"
+    )
+    if hub_lag_count:
+        print(f"custom_event_loop_lag_seconds: {int(hub_lag_count)} probes, mean {hub_lag_sum / hub_lag_count * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure event loop lag under concurrent hub writes")
+    parser.add_argument('--users', type=int, default=200, help="newcomers enrolling, and students logging in")
+    parser.add_argument('--concurrency', type=int, default=50, help="requests in flight")
+    parser.add_argument('--batch', type=int, default=20, help="most writes hub_writer commits at once")
+    parser.add_argument('--log-level', default='WARN', help="hub log level")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Aggregate hub statistics for the admin panel"""
+from collections import namedtuple
+
+from jupyterhub import orm
+from sqlalchemy import case, func, or_, select
+
+
+GroupStats = namedtuple('GroupStats', ['name', 'member_count', 'student_count', 'member_names'])
+HubStats = namedtuple('HubStats', ['total_users', 'active_servers', 'groups'])
+
+
+def managed_groups_clause():
+    """SQL filter for the groups shown on admin pages (admins, teachers, classes)"""
+    return or_(
+        orm.Group.name.in_(['admins', 'teachers']),
+        orm.Group.name.like('teacher-prof-%'),
+    )
+
+
+def load_hub_stats(db, teacher_names, preview_size=10, active_servers=None):
+    """Compute admin panel statistics with a fixed number of queries.
+
+    Totals and per-group member/student counts come from COUNT and GROUP BY
+    queries and running servers from the in-memory server_index. Only the
+    first `preview_size` member names of each group (by name) are fetched,
+    using a ROW_NUMBER() window per group. Pass `active_servers` when
+    running on hub_reader, as server_index belongs to the event loop.
+    """
+    total_users = db.query(func.count(orm.User.id)).scalar() or 0
+    if active_servers is None:
+        active_servers = server_index.running_count(db)
+
+    membership = orm.user_group_map
+    is_student = case((orm.User.name.notin_(list(teacher_names)), 1), else_=0)
+    counts = (
+        db.query(
+            orm.Group.id,
+            orm.Group.name,
+            func.count(orm.User.id),
+            func.coalesce(func.sum(is_student), 0),
+        )
+        .outerjoin(membership, membership.c.group_id == orm.Group.id)
+        .outerjoin(orm.User, orm.User.id == membership.c.user_id)
+        .filter(managed_groups_clause())
+        .group_by(orm.Group.id)
+        .order_by(orm.Group.id)
+        .all()
+    )
+
+    previews = {group_id: [] for group_id, _name, _members, _students in counts}
+    if previews:
+        position = func.row_number().over(
+            partition_by=membership.c.group_id,
+            order_by=orm.User.name,
+        ).label('position')
+        ranked = (
+            select(membership.c.group_id, orm.User.name, position)
+            .join(orm.User, orm.User.id == membership.c.user_id)
+            .where(membership.c.group_id.in_(list(previews)))
+            .subquery()
+        )
+        preview_rows = (
+            db.query(ranked.c.group_id, ranked.c.name)
+            .filter(ranked.c.position <= preview_size)
+            .order_by(ranked.c.group_id, ranked.c.position)
+        )
+        for group_id, name in preview_rows:
+            previews[group_id].append(name)
+
+    groups = [
+        GroupStats(name, member_count, int(student_count), previews[group_id])
+        for group_id, name, member_count, student_count in counts
+    ]
+    return HubStats(total_users, active_servers, groups)
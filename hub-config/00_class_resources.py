@@ -0,0 +1,66 @@
+"""Per-class resource policies stored on the teacher-prof-* groups"""
+import time
+from collections import namedtuple
+
+from jupyterhub import orm
+
+
+# KubeSpawner traits a class policy may override
+CLASS_RESOURCE_KEYS = ('cpu_guarantee', 'cpu_limit', 'mem_guarantee', 'mem_limit', 'image')
+
+# profile: the profileList slug that enrolls a student in the class
+# overrides: kubespawner_override applied to the class's student servers
+ClassPolicy = namedtuple('ClassPolicy', ['profile', 'overrides'])
+
+
+def class_policy(class_name, properties):
+    """ClassPolicy from a class group's properties.
+
+    The class profile defaults to the naming convention
+    teacher-prof-smith <-> prof-smith-class; resources come from the
+    'resources' property (set through load_groups in config.yaml).
+    """
+    properties = properties or {}
+    profile = properties.get('profile') or class_name[len('teacher-'):] + '-class'
+    resources = properties.get('resources') or {}
+    overrides = {key: resources[key] for key in CLASS_RESOURCE_KEYS if key in resources}
+    return ClassPolicy(profile, overrides)
+
+
+class ClassPolicyCache:
+    """Every class's ClassPolicy, loaded with one query and kept for `ttl` seconds"""
+
+    def __init__(self, ttl=60, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._policies = None
+        self._expires = 0
+
+    def policies(self, db):
+        """{class name: ClassPolicy}"""
+        now = self.clock()
+        if self._policies is None or self._expires <= now:
+            rows = (
+                db.query(orm.Group.name, orm.Group.properties)
+                .filter(orm.Group.name.like(CLASS_GROUP_PREFIX + '%'))
+            )
+            self._policies = {name: class_policy(name, properties) for name, properties in rows}
+            self._expires = now + self.ttl
+        return self._policies
+
+    def get(self, db, class_name):
+        """ClassPolicy of a class, or None if there is no such class"""
+        return self.policies(db).get(class_name)
+
+    def class_for_profile(self, db, profile_slug):
+        """Class group a profile slug enrolls into, or None"""
+        for class_name, policy in self.policies(db).items():
+            if policy.profile == profile_slug:
+                return class_name
+        return None
+
+    def invalidate(self):
+        self._policies = None
+
+
+class_policies = ClassPolicyCache(ttl=60)
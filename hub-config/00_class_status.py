@@ -0,0 +1,74 @@
+"""In-memory live server status per class, pushed to teacher dashboards"""
+import asyncio
+
+
+class ClassStatusBoard:
+    """Snapshot of which students of a class have a running server.
+
+    A class snapshot is seeded from the roster and server_index when the
+    first teacher subscribes, kept current from server_index change events,
+    and dropped when the last subscriber leaves. Subscribers receive only
+    the changes, as {'name': ..., 'active': ...} dicts on an asyncio.Queue.
+    Names excluded from the snapshot (teachers, admins) are never pushed.
+    """
+
+    # Undelivered changes per subscriber before it is told to resync
+    max_pending = 1000
+
+    def __init__(self):
+        self._snapshots = {}
+        self._excluded = {}
+        self._listeners = {}
+
+    def subscribe(self, db, class_name, exclude=()):
+        """Register a listener; returns (queue, current snapshot as {name: active})"""
+        snapshot = self._snapshots.get(class_name)
+        if snapshot is None:
+            snapshot = {
+                row.name: row.is_active
+                for row in load_class_roster(
+                    db, class_name, exclude=exclude,
+                    running=server_index.class_running(db, class_name),
+                )
+            }
+            self._snapshots[class_name] = snapshot
+            self._excluded[class_name] = frozenset(exclude)
+
+        queue = asyncio.Queue(maxsize=self.max_pending)
+        self._listeners.setdefault(class_name, set()).add(queue)
+        return queue, dict(snapshot)
+
+    def unsubscribe(self, class_name, queue):
+        """Remove a listener, dropping the class snapshot once nobody watches it"""
+        listeners = self._listeners.get(class_name)
+        if listeners is None:
+            return
+        listeners.discard(queue)
+        if not listeners:
+            del self._listeners[class_name]
+            self._snapshots.pop(class_name, None)
+            self._excluded.pop(class_name, None)
+
+    def set_active(self, class_name, user_name, active):
+        """Record a server start/stop and push the change to watching teachers"""
+        snapshot = self._snapshots.get(class_name)
+        if snapshot is None or snapshot.get(user_name) == active:
+            return
+        if user_name in self._excluded.get(class_name, ()):
+            return
+        snapshot[user_name] = active
+
+        change = {'name': user_name, 'active': active}
+        listeners = self._listeners.get(class_name, set())
+        for queue in list(listeners):
+            try:
+                queue.put_nowait(change)
+            except asyncio.QueueFull:
+                # A stalled client: stop feeding it, and a None tells its stream
+                # to close so the browser reconnects from a fresh snapshot
+                listeners.discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+
+class_status = ClassStatusBoard()
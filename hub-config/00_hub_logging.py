@@ -0,0 +1,184 @@
+"""Structured, level-gated and sampled logging for the hub-config modules"""
+import logging
+import re
+import time
+import uuid
+from contextvars import ContextVar
+
+
+# Custom loggers are children of the hub's own logger, so they share its
+# handler and format (JupyterHub.custom.home, ...)
+LOG_NAMESPACE = 'JupyterHub.custom'
+
+# Level of the custom modules, and per-module overrides ({'home': 'DEBUG'})
+LOG_LEVEL = logging.INFO
+LOG_LEVELS = {}
+
+# Default sampling: at most this many records per event and interval;
+# warnings and errors are never sampled
+LOG_RATE_LIMIT = 20
+LOG_RATE_INTERVAL_SECONDS = 60
+
+# Request id of the request being served, set by InstrumentedHandler
+current_request_id = ContextVar('current_request_id', default=None)
+
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+_BARE_VALUE_RE = re.compile(r'^[^\s="]+$')
+
+
+def bind_request_id(handler):
+    """Adopt the client's X-Request-Id (or make one up) for logs and the response"""
+    request_id = handler.request.headers.get('X-Request-Id', '')
+    if not _REQUEST_ID_RE.match(request_id):
+        request_id = uuid.uuid4().hex[:12]
+    current_request_id.set(request_id)
+    handler.set_header('X-Request-Id', request_id)
+    return request_id
+
+
+def _level_number(level):
+    """logging level from a number or a name ('DEBUG')"""
+    if isinstance(level, int):
+        return level
+    return logging.getLevelName(level.upper())
+
+
+def _format_value(value):
+    if isinstance(value, (set, frozenset)):
+        value = ','.join(sorted(map(str, value)))
+    elif isinstance(value, (list, tuple)):
+        value = ','.join(map(str, value))
+    else:
+        value = str(value)
+    if _BARE_VALUE_RE.match(value):
+        return value
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class LogEvent:
+    """`event key=value ...` line, only formatted if a handler writes it"""
+
+    __slots__ = ('event', 'fields')
+
+    def __init__(self, event, fields):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self):
+        return ' '.join(
+            [self.event] + [f'{key}={_format_value(value)}' for key, value in self.fields.items()]
+        )
+
+
+class HubLogger:
+    """Logger taking an event name and fields instead of a formatted message.
+
+    home_log.debug('home.view', user=name, groups=groups)
+
+    Nothing is formatted unless the level is enabled and the record passes
+    sampling: each event logs at most `rate_limit` records per `interval`
+    seconds below WARNING, and the next record after a quiet spell carries
+    a `suppressed=N` field. Audit records (.audit) are never sampled.
+    Records carry the current request id.
+
+    The level lives here rather than on the logging.Logger: the hub
+    reconfigures logging after the config files run, which resets the
+    levels of its child loggers.
+    """
+
+    def __init__(self, name, level=logging.INFO, rate_limit=LOG_RATE_LIMIT,
+                 interval=LOG_RATE_INTERVAL_SECONDS, clock=time.monotonic):
+        self.logger = logging.getLogger(f'{LOG_NAMESPACE}.{name}')
+        self.level = _level_number(level)
+        self.rate_limit = rate_limit
+        self.interval = interval
+        self.clock = clock
+        # event -> [window start, records in window, suppressed records]
+        self._windows = {}
+
+    def _sample(self, event):
+        """Suppressed count to report if the record may be logged, else None"""
+        now = self.clock()
+        window = self._windows.get(event)
+        if window is None or now - window[0] >= self.interval:
+            suppressed = window[2] if window else 0
+            self._windows[event] = [now, 1, 0]
+            return suppressed
+        if window[1] < self.rate_limit:
+            window[1] += 1
+            return 0
+        window[2] += 1
+        return None
+
+    def log(self, level, event, **fields):
+        """Log an event; pass exc_info=True to include the current exception"""
+        if level >= self.level:
+            self._emit(level, event, fields)
+
+    def _emit(self, level, event, fields, sampled=True):
+        exc_info = fields.pop('exc_info', False)
+        if sampled and level < logging.WARNING and self.rate_limit:
+            suppressed = self._sample(event)
+            if suppressed is None:
+                return
+            if suppressed:
+                fields['suppressed'] = suppressed
+        request_id = current_request_id.get()
+        if request_id is not None:
+            fields['request_id'] = request_id
+        self.logger.log(level, LogEvent(event, fields), exc_info=exc_info, stacklevel=3)
+
+    def debug(self, event, **fields):
+        if self.level <= logging.DEBUG:
+            self._emit(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        if self.level <= logging.INFO:
+            self._emit(logging.INFO, event, fields)
+
+    def audit(self, event, **fields):
+        """INFO record of a change to users' memberships, access or servers, never sampled out"""
+        if self.level <= logging.INFO:
+            self._emit(logging.INFO, event, fields, sampled=False)
+
+    def warning(self, event, **fields):
+        if self.level <= logging.WARNING:
+            self._emit(logging.WARNING, event, fields)
+
+    def error(self, event, **fields):
+        if self.level <= logging.ERROR:
+            self._emit(logging.ERROR, event, fields)
+
+
+_loggers = {}
+
+
+def get_logger(name):
+    """Shared HubLogger of a hub-config module ('home', 'spawner', ...).
+
+    The config files run in one namespace, so bind it to a name of the
+    module's own (home_log = get_logger('home')), not a shared `log`.
+    """
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = _loggers[name] = HubLogger(
+            name, LOG_LEVELS.get(name, LOG_LEVEL), LOG_RATE_LIMIT, LOG_RATE_INTERVAL_SECONDS,
+        )
+    return logger
+
+
+def configure_logging(c, level='INFO', levels=None, rate_limit=LOG_RATE_LIMIT, interval=LOG_RATE_INTERVAL_SECONDS):
+    """Set the level of the custom modules, per-module levels ({'home': 'DEBUG'}) and sampling.
+
+    Records still go through the hub's handler, which drops anything below
+    JupyterHub.log_level.
+    """
+    global LOG_LEVEL, LOG_LEVELS, LOG_RATE_LIMIT, LOG_RATE_INTERVAL_SECONDS
+    LOG_LEVEL = _level_number(level)
+    LOG_LEVELS = {name: _level_number(module_level) for name, module_level in (levels or {}).items()}
+    LOG_RATE_LIMIT, LOG_RATE_INTERVAL_SECONDS = rate_limit, interval
+    for name, logger in _loggers.items():
+        logger.level = LOG_LEVELS.get(name, LOG_LEVEL)
+        logger.rate_limit = rate_limit
+        logger.interval = interval
+    print(f"✓ Structured logging at {level}, {rate_limit} records per event every {interval}s, levels {levels or {}}")
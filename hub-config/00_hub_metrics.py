@@ -0,0 +1,166 @@
+"""Prometheus metrics for the custom handlers and spawner, served on /hub/metrics"""
+import time
+from contextvars import ContextVar
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+HANDLER_DURATION_SECONDS = Histogram(
+    'custom_handler_duration_seconds',
+    'Time to serve a request to a custom hub-config page',
+    ['handler', 'method', 'code'],
+    buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf')],
+)
+STREAM_DURATION_SECONDS = Histogram(
+    'custom_stream_duration_seconds',
+    'Time a custom event stream stayed connected',
+    ['handler', 'code'],
+    buckets=[1, 10, 60, 300, 900, 1800, 3600, 7200, 14400, 28800, float('inf')],
+)
+HANDLER_SQL_STATEMENTS = Histogram(
+    'custom_handler_sql_statements',
+    'SQL statements run by one request to a custom page',
+    ['handler', 'method'],
+    buckets=[1, 2, 5, 10, 20, 50, 100, 200, 500, float('inf')],
+)
+HANDLER_SQL_SECONDS = Histogram(
+    'custom_handler_sql_duration_seconds',
+    'Time one request to a custom page spent in SQL statements',
+    ['handler', 'method'],
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, float('inf')],
+)
+RENDER_DURATION_SECONDS = Histogram(
+    'custom_render_duration_seconds',
+    'Time to render a page template',
+    ['template'],
+    buckets=[0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, float('inf')],
+)
+ENROLLMENT_TRANSITIONS = Counter(
+    'custom_enrollment_transitions',
+    'Students entering, leaving or moving between classes',
+    ['source', 'transition'],
+)
+SPAWN_PHASE_SECONDS = Histogram(
+    'custom_spawn_phase_duration_seconds',
+    'Time ClassSelectionSpawner.start spends in each phase',
+    ['phase'],
+    buckets=[0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, float('inf')],
+)
+DB_WRITE_BATCH_SIZE = Histogram(
+    'custom_db_write_batch_size',
+    'Writes committed together by the hub-config writer',
+    buckets=[1, 2, 5, 10, 20, 50, 100, 200, float('inf')],
+)
+DB_WRITE_SECONDS = Histogram(
+    'custom_db_write_duration_seconds',
+    'Time from queueing a hub-config write to its commit',
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, float('inf')],
+)
+DB_READ_SECONDS = Histogram(
+    'custom_db_read_duration_seconds',
+    'Time a hub-config read spent queued for and running on the read threads',
+    ['read'],
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, float('inf')],
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    'custom_event_loop_lag_seconds',
+    "How late the hub's event loop ran a periodic probe",
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, float('inf')],
+)
+
+
+class RequestStats:
+    """SQL statements and time of the request being served"""
+
+    __slots__ = ('statements', 'sql_seconds')
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+
+# Tornado serves each request in its own task, so concurrent requests
+# each see their own stats; outside a custom handler this is None
+current_request_stats = ContextVar('current_request_stats', default=None)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_request_stats.get() is not None:
+        conn.info.setdefault('custom_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request_stats.get()
+    starts = conn.info.get('custom_query_start')
+    if stats is None or not starts:
+        return
+    stats.statements += 1
+    stats.sql_seconds += time.perf_counter() - starts.pop()
+
+
+class InstrumentedHandler:
+    """Mixin for the custom BaseHandler subclasses: latency and SQL per request.
+
+    Also gives each request an id (X-Request-Id) for its log records, and
+    profiles its SQL when sql_profiler says so (00_sql_profiler.py).
+    List it before BaseHandler: class MyHandler(InstrumentedHandler, BaseHandler)
+
+    Handlers that hold the connection open (`streaming = True`) record how
+    long it stayed connected in STREAM_DURATION_SECONDS instead of latency.
+    """
+
+    streaming = False
+    _sql_profile = None
+
+    async def prepare(self):
+        bind_request_id(self)
+        self._request_stats = RequestStats()
+        current_request_stats.set(self._request_stats)
+        await super().prepare()
+        if not self._finished:
+            self._sql_profile = sql_profiler.begin(self)
+
+    def _end_sql_profile(self):
+        profile, self._sql_profile = self._sql_profile, None
+        if profile is not None:
+            sql_profiler.end(self, profile)
+
+    def finish(self, chunk=None):
+        # Before the headers go out, so the summary can still be sent
+        self._end_sql_profile()
+        return super().finish(chunk)
+
+    def on_finish(self):
+        self._end_sql_profile()
+        handler = type(self).__name__
+        method = self.request.method
+        code = str(self.get_status())
+        if self.streaming:
+            STREAM_DURATION_SECONDS.labels(handler, code).observe(self.request.request_time())
+        else:
+            HANDLER_DURATION_SECONDS.labels(handler, method, code).observe(self.request.request_time())
+        stats = getattr(self, '_request_stats', None)
+        if stats is not None:
+            HANDLER_SQL_STATEMENTS.labels(handler, method).observe(stats.statements)
+            HANDLER_SQL_SECONDS.labels(handler, method).observe(stats.sql_seconds)
+            current_request_stats.set(None)
+        super().on_finish()
+
+
+def observe_render(template, seconds):
+    RENDER_DURATION_SECONDS.labels(template).observe(seconds)
+
+
+def record_enrollment(source, transition, count=1):
+    """Count students who 'enrolled' in, 'moved' between or were 'removed' from classes"""
+    if count:
+        ENROLLMENT_TRANSITIONS.labels(source, transition).inc(count)
+
+
+def spawn_phase(phase):
+    """Context manager timing one phase of a spawn"""
+    return SPAWN_PHASE_SECONDS.labels(phase).time()
@@ -0,0 +1,249 @@
+"""Hub database access for the hub-config modules: tuned SQLite connections, a read pool and one group-committing writer"""
+import asyncio
+import contextvars
+import sqlite3
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from jupyterhub import orm
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.pool import StaticPool
+
+
+# PRAGMAs run on every new SQLite connection once configure_database() is called.
+# WAL lets readers carry on while a write commits (it needs a local disk,
+# which the sqlite-pvc volume is); synchronous=NORMAL is safe with WAL, only
+# a power loss can undo the last commits; mmap_size reads pages through a
+# memory map. There is still a single write lock: a connection that finds
+# it taken waits up to 5s (Python's sqlite3 default timeout) before failing
+# with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+# Most writes committed in one transaction. The hub's own session writes
+# from the event loop and waits for the lock while a group commits, so
+# groups are kept short (see HubWriter).
+WRITE_BATCH_SIZE = 20
+
+# Threads running hub-config reads, so at most this many run at once
+READ_WORKERS = 4
+
+# class_name: the class the student is in afterwards (None if there is no such class)
+# added: whether this write enrolled them
+Enrollment = namedtuple('Enrollment', ['class_name', 'group_id', 'added'])
+
+db_log = get_logger('db')
+
+_sqlite_pragmas = None
+
+
+@event.listens_for(Engine, 'connect')
+def _tune_sqlite_connection(dbapi_connection, connection_record):
+    if _sqlite_pragmas is None or not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in _sqlite_pragmas.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+
+class HubWriter:
+    """Serialized writer for the hub-config modules, with group commit.
+
+    Writes are functions `write(session, *args)`. They run one at a time on
+    a single thread with its own session, off the event loop, and every
+    write queued while a transaction commits goes into the next one: a
+    burst of enrollments or logins costs a few commits instead of one per
+    request. If a write fails, its group is rolled back and retried one
+    write per transaction, so only the failing write raises.
+
+    The hub's own session still writes from the event loop (logins, server
+    state), and SQLite has one write lock: while a group holds it, a hub
+    write waits, and the whole loop with it. `max_batch` bounds how long
+    that is; larger groups save commits but stall the loop for longer.
+
+    The hub's own session does not see these commits in objects it loaded
+    earlier; expire what a write changed (expire_memberships). With an
+    in-memory database, which has a single shared connection, writes run
+    inline on the caller's session instead.
+    """
+
+    def __init__(self, max_batch=WRITE_BATCH_SIZE):
+        self.max_batch = max_batch
+        self._queue = deque()
+        self._sessions = None
+        self._executor = None
+        self._drain_task = None
+
+    def submit(self, db, write, *args):
+        """Future of write(session, *args), resolved once its transaction is committed"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        engine = db.get_bind()
+        if isinstance(engine.pool, StaticPool):
+            error, results = self._commit(db, [(write, args)])
+            if error is None:
+                future.set_result(results[0])
+            else:
+                future.set_exception(error)
+            return future
+
+        if self._sessions is None:
+            self._sessions = sessionmaker(bind=engine, expire_on_commit=False)
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='hub-writer')
+        self._queue.append((write, args, future, time.perf_counter()))
+        if self._drain_task is None:
+            self._drain_task = loop.create_task(self._drain())
+        return future
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._queue:
+                batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+                try:
+                    outcomes = await loop.run_in_executor(
+                        self._executor, self._commit_group, [(write, args) for write, args, _, _ in batch],
+                    )
+                except Exception as e:
+                    db_log.error('db.writer_failed', writes=len(batch), error=e, exc_info=True)
+                    outcomes = [(e, None)] * len(batch)
+
+                committed = time.perf_counter()
+                DB_WRITE_BATCH_SIZE.observe(len(batch))
+                for (_write, _args, future, queued), (error, result) in zip(batch, outcomes):
+                    DB_WRITE_SECONDS.observe(committed - queued)
+                    if future.done():
+                        continue
+                    if error is None:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(error)
+        finally:
+            self._drain_task = None
+
+    def _commit(self, session, writes):
+        """(None, results) if all writes committed, else (error, None) after a rollback"""
+        try:
+            results = [write(session, *args) for write, args in writes]
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            return e, None
+        return None, results
+
+    def _commit_group(self, writes):
+        """(error, result) of each write; runs on the writer thread"""
+        session = self._sessions()
+        try:
+            error, results = self._commit(session, writes)
+            if error is None:
+                return [(None, result) for result in results]
+            if len(writes) == 1:
+                return [(error, None)]
+
+            db_log.warning('db.group_retried', writes=len(writes), error=error)
+            outcomes = []
+            for write in writes:
+                error, results = self._commit(session, [write])
+                outcomes.append((error, results[0] if results else None))
+            return outcomes
+        finally:
+            session.close()
+
+
+hub_writer = HubWriter()
+
+
+class HubReader:
+    """Runs the heavy read-only queries of the hub-config handlers off the event loop.
+
+    `await hub_reader.run(db, read, *args, **kwargs)` calls
+    read(session, *args, **kwargs) on one of `max_workers` threads, each
+    with its own session, so a slow admin page no longer holds up every
+    other request; reads beyond `max_workers` wait for a free thread.
+    Reads must return plain rows or tuples, not ORM objects, and must not
+    touch state owned by the loop (server_index, role_cache): pass what
+    they need in. They run in the caller's context, so the request's SQL
+    metrics and the profiler still count their statements. With an
+    in-memory database reads run inline.
+    """
+
+    def __init__(self, max_workers=READ_WORKERS):
+        self.max_workers = max_workers
+        self._sessions = None
+        self._executor = None
+
+    async def run(self, db, read, *args, **kwargs):
+        engine = db.get_bind()
+        if isinstance(engine.pool, StaticPool):
+            return read(db, *args, **kwargs)
+
+        if self._sessions is None:
+            self._sessions = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='hub-reader')
+        context = contextvars.copy_context()
+        with DB_READ_SECONDS.labels(read.__name__).time():
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, context.run, self._read, read, args, kwargs,
+            )
+
+    def _read(self, read, args, kwargs):
+        try:
+            return read(self._sessions(), *args, **kwargs)
+        finally:
+            # Ends the read transaction, so WAL checkpoints are not held back
+            self._sessions.remove()
+
+
+hub_reader = HubReader()
+
+
+def enroll_student(db, user_id, class_name):
+    """Add a student to a class unless they are already in one.
+
+    Run through hub_writer, so checking for an existing class and adding
+    the membership cannot interleave with another enrollment.
+    """
+    enrolled_class = resolve_enrolled_class(db, user_id)
+    if enrolled_class:
+        return Enrollment(enrolled_class, None, False)
+    group_id = db.query(orm.Group.id).filter_by(name=class_name).scalar()
+    if group_id is None:
+        return Enrollment(None, None, False)
+    db.execute(orm.user_group_map.insert(), {'user_id': user_id, 'group_id': group_id})
+    return Enrollment(class_name, group_id, True)
+
+
+def expire_memberships(db, user_ids, group_ids):
+    """Expire cached group collections of already-loaded ORM objects.
+
+    The hub session does not expire objects on commit, and does not see
+    commits made by other sessions (hub_writer), so relationship
+    collections loaded before a change would otherwise stay stale.
+    """
+    for user_id in user_ids:
+        obj = db.identity_map.get(identity_key(orm.User, user_id))
+        if obj is not None:
+            db.expire(obj, ['groups'])
+    for group_id in group_ids:
+        obj = db.identity_map.get(identity_key(orm.Group, group_id))
+        if obj is not None:
+            db.expire(obj, ['users'])
+
+
+def configure_database(c, pragmas=None, max_batch=WRITE_BATCH_SIZE, read_workers=READ_WORKERS):
+    """Tune the hub's SQLite connections (SQLITE_PRAGMAS, or `pragmas` on top), size write groups and the read pool"""
+    global _sqlite_pragmas
+    _sqlite_pragmas = {**SQLITE_PRAGMAS, **(pragmas or {})}
+    hub_writer.max_batch = max_batch
+    hub_reader.max_workers = read_workers
+    print(f"✓ SQLite tuned ({', '.join(f'{name}={value}' for name, value in _sqlite_pragmas.items())}), "
+          f"hub-config writes group-committed up to {max_batch} at a time, {read_workers} read threads")
@@ -0,0 +1,52 @@
+"""Periodic background jobs running inside the hub's event loop"""
+import asyncio
+
+from jupyterhub.app import JupyterHub
+
+
+tasks_log = get_logger('tasks')
+
+
+class HubTasks:
+    """Registry of named periodic jobs.
+
+    Config files are executed while the hub initializes inside its event
+    loop, so jobs registered from extraConfig are scheduled right away and
+    keep running once the hub is serving. Each job is called as
+    `await func(app)` with the JupyterHub application; a failing run is
+    logged and retried on the next interval.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+
+    def every(self, name, interval, func):
+        """Run `await func(app)` every `interval` seconds"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            print(f"⚠ No running event loop, hub task {name} not scheduled")
+            return
+        self.cancel(name)
+        self._tasks[name] = loop.create_task(self._run(name, interval, func))
+
+    def cancel(self, name):
+        """Stop a job if it is scheduled"""
+        task = self._tasks.pop(name, None)
+        if task is not None:
+            task.cancel()
+
+    async def _run(self, name, interval, func):
+        app = JupyterHub.instance()
+        while True:
+            await asyncio.sleep(interval)
+            if getattr(app, 'db', None) is None:
+                # Hub still initializing
+                continue
+            try:
+                await func(app)
+            except Exception:
+                tasks_log.error('tasks.failed', task=name, exc_info=True)
+
+
+hub_tasks = HubTasks()
@@ -0,0 +1,201 @@
+"""Pre-warm student servers ahead of scheduled labs, and stop unused ones"""
+import asyncio
+import functools
+import os
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from jupyterhub import orm
+
+
+# Start servers this long before a lab begins
+PREWARM_LEAD_SECONDS = 10 * 60
+# Stop warmed servers nobody used this long after the lab began
+PREWARM_GRACE_SECONDS = 20 * 60
+# How often the scheduler looks at the timetable
+PREWARM_INTERVAL_SECONDS = 60
+
+LAB_TIMEZONE = ZoneInfo(os.environ.get('LAB_TIMEZONE', 'Europe/Bucharest'))
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+# Length of a lab slot that does not set 'minutes'
+LAB_DEFAULT_MINUTES = 120
+
+# A weekly lab of a class: weekday 0-6, start as (hour, minute), length in minutes
+LabSlot = namedtuple('LabSlot', ['class_name', 'weekday', 'hour', 'minute', 'minutes'])
+WarmServer = namedtuple('WarmServer', ['slot_key', 'warmed_at', 'expires_at'])
+
+prewarm_log = get_logger('prewarm')
+
+
+def parse_lab_slots(class_name, properties):
+    """LabSlots from a class group's properties.
+
+    Slots are listed under 'lab_slots' as {'day': 'mon', 'start': '10:00'},
+    optionally with 'minutes' (set through load_groups in config.yaml).
+    Malformed entries are skipped.
+    """
+    slots = []
+    for entry in (properties or {}).get('lab_slots', []):
+        try:
+            weekday = WEEKDAYS.index(str(entry['day']).lower()[:3])
+            hour, minute = (int(part) for part in str(entry['start']).split(':'))
+            minutes = int(entry.get('minutes', LAB_DEFAULT_MINUTES))
+        except (KeyError, TypeError, ValueError):
+            continue
+        slots.append(LabSlot(class_name, weekday, hour, minute, minutes))
+    return slots
+
+
+def load_lab_slots(db):
+    """All lab slots of all classes, with one query on the class groups"""
+    rows = (
+        db.query(orm.Group.name, orm.Group.properties)
+        .filter(orm.Group.name.like(CLASS_GROUP_PREFIX + '%'))
+    )
+    return [slot for name, properties in rows for slot in parse_lab_slots(name, properties)]
+
+
+class HubSpawnBackend:
+    """Start and stop servers through the running hub, like the REST API does"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _user(self, user_name):
+        orm_user = orm.User.find(self.app.db, user_name)
+        return self.app.users[orm_user] if orm_user is not None else None
+
+    def is_running(self, user_name):
+        return server_index.is_running(self.app.db, user_name)
+
+    def last_activity(self, user_name):
+        user = self._user(user_name)
+        return user.last_activity if user is not None else None
+
+    async def start(self, user_name):
+        user = self._user(user_name)
+        if user is None or user.spawner.active:
+            return
+        await user.spawn()
+        await self.app.proxy.add_user(user)
+
+    async def stop(self, user_name):
+        user = self._user(user_name)
+        if user is None or not user.spawner.active or user.spawner.pending:
+            return
+        await self.app.proxy.delete_user(user)
+        await user.stop()
+
+
+class PrewarmScheduler:
+    """Starts enrolled students' servers `lead` seconds before each lab slot.
+
+    Warmed servers that show no user activity `grace` seconds after the slot
+    began are stopped again. Starts go through ClassSelectionSpawner, so they
+    queue behind the spawn admission limits like any other spawn; tick()
+    does not wait for them, and a server is only stopped once its start
+    has finished.
+    """
+
+    def __init__(self, lead=PREWARM_LEAD_SECONDS, grace=PREWARM_GRACE_SECONDS,
+                 tz=LAB_TIMEZONE, clock=time.time):
+        self.lead = timedelta(seconds=lead)
+        self.grace = timedelta(seconds=grace)
+        self.tz = tz
+        self.clock = clock
+        self._warmed = {}
+        self._handled = {}
+        # user name -> task of a start still in flight
+        self._starting = {}
+
+    def now(self):
+        return datetime.fromtimestamp(self.clock(), self.tz)
+
+    def due_slots(self, slots, now):
+        """(slot, start) for slots starting within the lead time from now"""
+        due = []
+        for slot in slots:
+            for days_ahead in (0, 1):
+                day = (now + timedelta(days=days_ahead)).date()
+                if day.weekday() != slot.weekday:
+                    continue
+                start = datetime(day.year, day.month, day.day, slot.hour, slot.minute, tzinfo=self.tz)
+                if start - self.lead <= now < start:
+                    due.append((slot, start))
+        return due
+
+    async def tick(self, db, backend, exclude=()):
+        """Warm due classes and stop expired unused servers; returns (started, stopped).
+
+        `started` are the servers whose start was scheduled by this tick.
+        """
+        now = self.now()
+        started = []
+        for slot, start in self.due_slots(load_lab_slots(db), now):
+            slot_key = (slot.class_name, start.isoformat())
+            if slot_key in self._handled:
+                continue
+            self._handled[slot_key] = start + self.grace
+            for row in load_class_roster(db, slot.class_name, exclude=exclude):
+                if row.name in self._warmed or backend.is_running(row.name):
+                    continue
+                self._warmed[row.name] = WarmServer(slot_key, now, start + self.grace)
+                started.append(row.name)
+        # A spawn can wait minutes behind the admission limits: start them in
+        # the background so this and later ticks can still stop unused servers
+        for user_name in started:
+            task = asyncio.ensure_future(backend.start(user_name))
+            self._starting[user_name] = task
+            task.add_done_callback(functools.partial(self._start_done, user_name))
+
+        stopped = []
+        for user_name, warm in list(self._warmed.items()):
+            if warm.expires_at > now or user_name in self._starting:
+                continue
+            del self._warmed[user_name]
+            last_activity = backend.last_activity(user_name)
+            if not self._used_since(last_activity, warm.warmed_at) and backend.is_running(user_name):
+                await backend.stop(user_name)
+                stopped.append(user_name)
+
+        for slot_key, expires_at in list(self._handled.items()):
+            if expires_at <= now:
+                del self._handled[slot_key]
+        return started, stopped
+
+    def _start_done(self, user_name, task):
+        self._starting.pop(user_name, None)
+        if task.cancelled():
+            self._warmed.pop(user_name, None)
+        elif task.exception() is not None:
+            prewarm_log.warning('prewarm.start_failed', user=user_name, error=task.exception())
+            self._warmed.pop(user_name, None)
+
+    @staticmethod
+    def _used_since(last_activity, warmed_at):
+        if last_activity is None:
+            return False
+        if last_activity.tzinfo is None:
+            # The hub stores naive UTC timestamps
+            last_activity = last_activity.replace(tzinfo=timezone.utc)
+        return last_activity > warmed_at
+
+
+lab_prewarm = PrewarmScheduler()
+
+
+def schedule_prewarm(c):
+    """Check the lab timetable periodically from the hub's event loop"""
+    teacher_names = {'admin', 'prof_smith', 'prof_jones', 'prof_doe'}
+
+    async def prewarm_labs(app):
+        started, stopped = await lab_prewarm.tick(app.db, HubSpawnBackend(app), exclude=teacher_names)
+        if started or stopped:
+            prewarm_log.info('prewarm.ticked', started=len(started), stopped=len(stopped))
+
+    hub_tasks.every('lab-prewarm', PREWARM_INTERVAL_SECONDS, prewarm_labs)
+    print(f"✓ Lab pre-warm scheduler: {PREWARM_LEAD_SECONDS // 60} min lead, {PREWARM_GRACE_SECONDS // 60} min grace")
@@ -0,0 +1,44 @@
+"""Event loop lag of the hub, exported as custom_event_loop_lag_seconds"""
+import asyncio
+
+
+# How often the loop is probed, in seconds
+LOOP_PROBE_INTERVAL_SECONDS = 0.5
+
+# Lag logged as a warning: every request waited at least this long
+LOOP_LAG_WARNING_SECONDS = 1.0
+
+loop_log = get_logger('loop')
+
+
+class LoopLagProbe:
+    """How late the hub's event loop wakes up a periodic job.
+
+    Whatever blocks the loop (a synchronous query, a slow template) delays
+    every other request on the hub by as much, and shows up here as lag.
+    """
+
+    def __init__(self, interval=LOOP_PROBE_INTERVAL_SECONDS, warning=LOOP_LAG_WARNING_SECONDS):
+        self.interval = interval
+        self.warning = warning
+        self.last_lag = 0.0
+        self._last_run = None
+
+    async def __call__(self, app):
+        now = asyncio.get_running_loop().time()
+        if self._last_run is not None:
+            self.last_lag = max(0.0, now - self._last_run - self.interval)
+            EVENT_LOOP_LAG_SECONDS.observe(self.last_lag)
+            if self.last_lag >= self.warning:
+                loop_log.warning('loop.lagging', lag_ms=round(self.last_lag * 1000))
+        self._last_run = now
+
+
+loop_lag_probe = LoopLagProbe()
+
+
+def schedule_loop_monitor(c, interval=LOOP_PROBE_INTERVAL_SECONDS):
+    """Probe the event loop every `interval` seconds"""
+    loop_lag_probe.interval = interval
+    hub_tasks.every('loop-monitor', interval, loop_lag_probe)
+    print(f"✓ Event loop lag probed every {interval}s (custom_event_loop_lag_seconds)")
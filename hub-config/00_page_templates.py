@@ -0,0 +1,125 @@
+"""Shared rendering layer: precompiled page templates and cacheable static assets"""
+import hashlib
+import os
+import time
+from datetime import datetime, timezone
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from tornado import web
+
+
+HUB_CONFIG_DIR = os.environ.get('HUB_CONFIG_DIR', '/usr/local/etc/jupyterhub/hub-config')
+
+# Templates rendered by the custom handlers, compiled once at hub startup
+PAGE_TEMPLATES = [
+    'custom-page.html',
+    'custom-home.html',
+    'my-students.html',
+    'enroll.html',
+    'admin-panel.html',
+    'manage-groups.html',
+    'sql-profile.html',
+]
+
+# Files served from /hub/custom-static/ with an ETag and a long max-age
+STATIC_ASSETS = [
+    'custom-home.css',
+    'my-students.css',
+    'my-students.js',
+    'enroll.css',
+    'admin-panel.css',
+    'manage-groups.css',
+    'manage-groups.js',
+]
+
+page_env = Environment(
+    loader=FileSystemLoader(HUB_CONFIG_DIR),
+    autoescape=select_autoescape(['html']),
+    auto_reload=False,
+    trim_blocks=True,
+    lstrip_blocks=True,
+    cache_size=len(PAGE_TEMPLATES) * 2,
+)
+
+
+def class_display(group_name):
+    """'teacher-prof-smith' -> 'Prof. Smith'"""
+    return group_name.replace('teacher-prof-', 'Prof. ').replace('-', ' ').title()
+
+
+def time_ago(last_activity):
+    """Human readable age of a (naive UTC or aware) timestamp"""
+    if not last_activity:
+        return "Never"
+    if last_activity.tzinfo is None:
+        last_activity = last_activity.replace(tzinfo=timezone.utc)
+
+    elapsed = datetime.now(timezone.utc) - last_activity
+    if elapsed.days > 0:
+        return f"{elapsed.days} days ago"
+    elif elapsed.seconds > 3600:
+        return f"{elapsed.seconds // 3600} hours ago"
+    elif elapsed.seconds > 60:
+        return f"{elapsed.seconds // 60} minutes ago"
+    return "Just now"
+
+
+page_env.filters['class_display'] = class_display
+page_env.filters['time_ago'] = time_ago
+
+
+def _asset_version(filename):
+    """Short content hash used to bust browser caches when an asset changes"""
+    try:
+        with open(os.path.join(HUB_CONFIG_DIR, filename), 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()[:12]
+    except OSError:
+        return '0'
+
+
+ASSET_VERSIONS = {}
+
+
+def static_url(filename):
+    """Versioned URL of a static asset; safe to cache forever"""
+    return f"/hub/custom-static/{filename}?v={ASSET_VERSIONS.get(filename, '0')}"
+
+
+page_env.globals['static_url'] = static_url
+
+
+def render_page(name, **context):
+    """Render a precompiled page template to a string"""
+    started = time.perf_counter()
+    html = page_env.get_template(name).render(**context)
+    observe_render(name, time.perf_counter() - started)
+    return html
+
+
+class CustomStaticHandler(web.StaticFileHandler):
+    """Serve only the listed hub-config assets.
+
+    Tornado's StaticFileHandler already computes ETags and, for URLs that carry
+    a ?v= version, sends a one year max-age.
+    """
+
+    def validate_absolute_path(self, root, absolute_path):
+        if os.path.relpath(absolute_path, root) not in STATIC_ASSETS:
+            raise web.HTTPError(404)
+        return super().validate_absolute_path(root, absolute_path)
+
+
+def register_templates(c):
+    """Precompile page templates and serve their static assets"""
+    for filename in STATIC_ASSETS:
+        ASSET_VERSIONS[filename] = _asset_version(filename)
+    for name in PAGE_TEMPLATES:
+        page_env.get_template(name)
+
+    if not hasattr(c.JupyterHub, 'extra_handlers') or c.JupyterHub.extra_handlers is None:
+        c.JupyterHub.extra_handlers = []
+
+    c.JupyterHub.extra_handlers.append(
+        (r'/custom-static/(.*)', CustomStaticHandler, {'path': HUB_CONFIG_DIR})
+    )
+    print(f"✓ Precompiled {len(PAGE_TEMPLATES)} page templates, static assets at /hub/custom-static/")
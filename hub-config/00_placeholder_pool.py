@@ -0,0 +1,229 @@
+"""Per-profile pool of placeholder pods that keep capacity and images warm"""
+import asyncio
+import os
+from collections import Counter, namedtuple
+
+from jupyterhub.traitlets import ByteSpecification
+from slugify import slugify
+
+
+PLACEHOLDER_COMPONENT = 'profile-placeholder'
+PLACEHOLDER_PROFILE_LABEL = 'hub.jupyter.org/placeholder-profile'
+
+# How often the pool is topped up even without spawns
+PLACEHOLDER_REFILL_SECONDS = 60
+
+# Low PriorityClass the chart creates for its own user-placeholder pods
+# (scheduling.podPriority.enabled), so user pods preempt placeholders
+PLACEHOLDER_PRIORITY_CLASS = 'user-placeholder-priority'
+
+PlaceholderSpec = namedtuple('PlaceholderSpec', ['slug', 'image', 'cpu', 'memory'])
+
+
+def profile_slug(profile):
+    """Slug of a profileList entry, generated from display_name like KubeSpawner does"""
+    return profile.get('slug') or slugify(profile['display_name'])
+
+
+def placeholder_specs(profile_list, sizes, default_image=None):
+    """PlaceholderSpec per pooled profile slug, from the profiles' overrides.
+
+    Guarantees are converted like KubeSpawner's traits do (CPU to a float,
+    memory to bytes with 'G' = 1024**3), so a placeholder requests exactly
+    what the user pod that claims it will.
+    """
+    specs = {}
+    for profile in profile_list or []:
+        slug = profile_slug(profile)
+        if slug not in sizes:
+            continue
+        override = profile.get('kubespawner_override', {})
+        cpu, memory = override.get('cpu_guarantee'), override.get('mem_guarantee')
+        specs[slug] = PlaceholderSpec(
+            slug=slug,
+            image=override.get('image', default_image),
+            cpu=float(cpu) if cpu is not None else None,
+            memory=ByteSpecification().validate(None, memory) if memory is not None else None,
+        )
+    return specs
+
+
+class KubePlaceholderBackend:
+    """Creates placeholder pods that request a profile's resources and run its image.
+
+    A placeholder holds the node capacity a user pod of that profile needs
+    and keeps the profile image pulled on that node.
+    """
+
+    def __init__(self, api, namespace, node_selector=None, priority_class=None):
+        self.api = api
+        self.namespace = namespace
+        self.node_selector = node_selector or None
+        self.priority_class = priority_class
+
+    async def list(self, slug):
+        """{pod name: scheduled on a node} of the profile's live placeholders"""
+        pods = await self.api.list_namespaced_pod(
+            self.namespace,
+            label_selector=f"component={PLACEHOLDER_COMPONENT},{PLACEHOLDER_PROFILE_LABEL}={slug}",
+        )
+        return {
+            pod.metadata.name: pod.spec.node_name is not None
+            for pod in pods.items if pod.metadata.deletion_timestamp is None
+        }
+
+    async def create(self, spec):
+        from kubernetes_asyncio.client import models
+
+        requests = {}
+        if spec.cpu:
+            requests['cpu'] = str(spec.cpu)
+        if spec.memory:
+            requests['memory'] = str(spec.memory)
+        pod = models.V1Pod(
+            metadata=models.V1ObjectMeta(
+                generate_name=f"placeholder-{spec.slug}-",
+                labels={'component': PLACEHOLDER_COMPONENT, PLACEHOLDER_PROFILE_LABEL: spec.slug},
+            ),
+            spec=models.V1PodSpec(
+                containers=[models.V1Container(
+                    name='placeholder',
+                    image=spec.image,
+                    command=['sleep', 'infinity'],
+                    resources=models.V1ResourceRequirements(requests=requests),
+                )],
+                node_selector=self.node_selector,
+                priority_class_name=self.priority_class,
+                termination_grace_period_seconds=0,
+                automount_service_account_token=False,
+            ),
+        )
+        created = await self.api.create_namespaced_pod(self.namespace, pod)
+        return created.metadata.name
+
+    async def delete(self, name):
+        from kubernetes_asyncio.client.rest import ApiException
+
+        try:
+            await self.api.delete_namespaced_pod(name, self.namespace, grace_period_seconds=0)
+        except ApiException as e:
+            if e.status != 404:
+                raise
+
+
+class PlaceholderPool:
+    """Keeps `sizes[slug]` placeholder pods per profile.
+
+    A spawn claims one scheduled placeholder of its profile: the placeholder
+    is deleted right before the user pod is created, so the user pod lands on
+    capacity (and usually a node with the image) that was held for it instead
+    of waiting for a scale-up or an image pull. Pending placeholders hold no
+    capacity and are never claimed. The spawn calls `refill_after_spawn` once
+    its pod is scheduled, so the replacement placeholder does not compete
+    with it for the capacity just freed.
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.sizes = {}
+        self.specs = {}
+        self._ready = {}
+        self._pending = {}
+        self._claimed = set()
+        # Spawns that claimed a placeholder and are not scheduled yet, per profile
+        self._spawning = Counter()
+        self._refills = {}
+
+    def configure(self, sizes, specs, backend=None):
+        self.sizes = dict(sizes)
+        self.specs = dict(specs)
+        if backend is not None:
+            self.backend = backend
+
+    def ready(self, slug):
+        """Number of placeholders of a profile known to be available"""
+        return len(self._ready.get(slug, ()))
+
+    async def claim(self, slug):
+        """Release one scheduled placeholder of the profile; True if there was one"""
+        if self.backend is None or slug not in self.specs:
+            return False
+        ready = self._ready.get(slug)
+        if not ready:
+            return False
+        claimed = ready.pop()
+        self._claimed.add(claimed)
+        self._spawning[slug] += 1
+        await self.backend.delete(claimed)
+        return True
+
+    def refill_after_spawn(self, slug):
+        """Replace a claimed placeholder, once the spawn that claimed it is scheduled"""
+        if self._spawning[slug] > 0:
+            self._spawning[slug] -= 1
+        if self.backend is not None and slug in self.specs:
+            self.schedule_refill(slug)
+
+    def schedule_refill(self, slug):
+        """Top the profile's pool up in the background, once at a time"""
+        task = self._refills.get(slug)
+        if task is None or task.done():
+            self._refills[slug] = asyncio.get_running_loop().create_task(self.refill(slug))
+
+    async def refill(self, slug):
+        """Create placeholders until the profile's pool is full"""
+        pods = await self.backend.list(slug)
+        # A listing can still show pods deleted by a concurrent claim
+        self._claimed.intersection_update(pods)
+        ready = self._ready.setdefault(slug, set())
+        pending = self._pending.setdefault(slug, set())
+        ready.clear()
+        pending.clear()
+        for name, scheduled in pods.items():
+            if name not in self._claimed:
+                (ready if scheduled else pending).add(name)
+        # Capacity freed for a spawn is left to it until its pod is scheduled
+        while len(ready) + len(pending) < self.sizes.get(slug, 0) - self._spawning[slug]:
+            pending.add(await self.backend.create(self.specs[slug]))
+
+    async def refill_all(self):
+        """Top every pooled profile up, sharing any refill already running"""
+        for slug in self.specs:
+            self.schedule_refill(slug)
+        await asyncio.gather(*(self._refills[slug] for slug in self.specs))
+
+
+placeholder_pool = PlaceholderPool()
+
+
+def schedule_placeholder_pool(c, sizes, priority_class=PLACEHOLDER_PRIORITY_CLASS):
+    """Keep `sizes` ({profile slug: pod count}) placeholders for the profileList.
+
+    `priority_class` must rank below user pods; the default one only exists
+    with the chart's scheduling.podPriority.enabled.
+    """
+    specs = placeholder_specs(
+        c.KubeSpawner.get('profile_list', []),
+        sizes,
+        default_image=c.KubeSpawner.get('image'),
+    )
+    placeholder_pool.configure(sizes, specs)
+    if not specs:
+        print("✓ Placeholder pool disabled (no pooled profiles)")
+        return
+
+    async def refill_placeholders(app):
+        if placeholder_pool.backend is None:
+            from kubespawner.clients import shared_client
+
+            placeholder_pool.backend = KubePlaceholderBackend(
+                shared_client('CoreV1Api'),
+                os.environ.get('POD_NAMESPACE', 'default'),
+                node_selector=c.KubeSpawner.get('node_selector'),
+                priority_class=priority_class,
+            )
+        await placeholder_pool.refill_all()
+
+    hub_tasks.every('placeholder-pool', PLACEHOLDER_REFILL_SECONDS, refill_placeholders)
+    pooled = ', '.join(f"{slug}={sizes[slug]}" for slug in specs)
+    print(f"✓ Placeholder pool: {pooled} (priority class {priority_class})")
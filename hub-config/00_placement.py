@@ -0,0 +1,192 @@
+"""Capacity-aware placement of student pods onto nodes (best-fit bin packing)"""
+import os
+import re
+from collections import namedtuple
+
+from jupyterhub.traitlets import ByteSpecification
+
+
+# How often granted requests are re-read from the running user pods
+PLACEMENT_SYNC_SECONDS = 5 * 60
+
+NodeCapacity = namedtuple('NodeCapacity', ['name', 'cpu', 'memory'])
+Grant = namedtuple('Grant', ['node', 'cpu', 'memory'])
+
+# Kubernetes quantity suffixes, for requests read back from pod specs
+_QUANTITY_UNITS = {
+    '': 1, 'k': 10**3, 'M': 10**6, 'G': 10**9, 'T': 10**12,
+    'Ki': 2**10, 'Mi': 2**20, 'Gi': 2**30, 'Ti': 2**40,
+}
+
+
+def parse_cpu(value):
+    """CPU quantity ('500m', '2', 0.5) in cores"""
+    if value is None:
+        return 0.0
+    value = str(value)
+    if value.endswith('m'):
+        return float(value[:-1]) / 1000
+    return float(value)
+
+
+def parse_memory(value):
+    """Memory size as KubeSpawner reads it ('1G', 1073741824) in bytes.
+
+    K, M, G and T are powers of 1024 (ByteSpecification), as in profile
+    overrides, class resources and the sizes given to schedule_placement.
+    """
+    if value is None:
+        return 0
+    return ByteSpecification().validate(None, value)
+
+
+def parse_memory_quantity(value):
+    """Kubernetes memory quantity ('1G', '512Mi') from a pod spec, in bytes"""
+    if value is None:
+        return 0
+    match = re.fullmatch(r'([0-9.]+)\s*([kMGT]i?)?', str(value))
+    if match is None:
+        raise ValueError(f"Invalid memory quantity: {value!r}")
+    number, unit = match.groups()
+    return int(float(number) * _QUANTITY_UNITS[unit or ''])
+
+
+class ClusterFullError(Exception):
+    """No node has room for a pod; the message is shown on the spawn page"""
+
+    def __init__(self, cpu, memory):
+        self.jupyterhub_message = (
+            f"The cluster is full: no node has {cpu:g} CPU and {memory / 2**30:.1f} GB "
+            "of memory free for your server. Please try again in a few minutes."
+        )
+        super().__init__(self.jupyterhub_message)
+
+
+class PlacementAdvisor:
+    """Pure-Python model of granted requests per node.
+
+    Grants come from this hub's own spawns and stops, and are resynced from
+    the running user pods (see load_pod_grants). A pod goes to the fitting
+    node with the least capacity left afterwards (best fit), which keeps
+    nodes full and leaves whole nodes free for large pods and scale-down.
+    With no nodes configured the advisor is disabled and places nothing.
+    """
+
+    def __init__(self, nodes=()):
+        self.nodes = {}
+        self._granted = {}
+        self._pending = set()
+        self.configure(nodes)
+
+    def configure(self, nodes):
+        """Set node capacities from NodeCapacity tuples"""
+        self.nodes = {node.name: node for node in nodes}
+
+    @property
+    def enabled(self):
+        return bool(self.nodes)
+
+    def free(self, node_name):
+        """(cpu, memory) not yet granted on a node"""
+        node = self.nodes[node_name]
+        cpu, memory = node.cpu, node.memory
+        for grant in self._granted.values():
+            if grant.node == node_name:
+                cpu -= grant.cpu
+                memory -= grant.memory
+        return cpu, memory
+
+    def choose(self, cpu, memory):
+        """Best-fit node for a pod's requests, or None if none has room"""
+        best, best_score = None, None
+        for name, node in sorted(self.nodes.items()):
+            free_cpu, free_memory = self.free(name)
+            if free_cpu < cpu or free_memory < memory:
+                continue
+            # Fraction of the node left over after placing the pod
+            score = (free_cpu - cpu) / node.cpu + (free_memory - memory) / node.memory
+            if best_score is None or score < best_score:
+                best, best_score = name, score
+        return best
+
+    def reserve(self, user_name, cpu, memory):
+        """Grant a node to the user's pod; raises ClusterFullError if none fits"""
+        self.release(user_name)
+        node = self.choose(cpu, memory)
+        if node is None:
+            raise ClusterFullError(cpu, memory)
+        self._granted[user_name] = Grant(node, cpu, memory)
+        self._pending.add(user_name)
+        return node
+
+    def release(self, user_name):
+        """Forget the user's grant after a stop or failed spawn"""
+        self._granted.pop(user_name, None)
+        self._pending.discard(user_name)
+
+    def sync(self, observed):
+        """Replace grants with those observed on the cluster ({user: Grant}).
+
+        Reservations whose pod is not visible yet are kept.
+        """
+        granted = dict(observed)
+        for user_name in list(self._pending):
+            if user_name in observed:
+                self._pending.discard(user_name)
+            elif user_name in self._granted:
+                granted[user_name] = self._granted[user_name]
+        self._granted = granted
+
+
+async def load_pod_grants(api, namespace):
+    """{user: Grant} for the scheduled user pods in the namespace"""
+    pods = await api.list_namespaced_pod(namespace, label_selector='component=singleuser-server')
+    grants = {}
+    for pod in pods.items:
+        user_name = (pod.metadata.annotations or {}).get('hub.jupyter.org/username')
+        if not user_name or not pod.spec.node_name or pod.status.phase not in ('Pending', 'Running'):
+            continue
+        cpu = memory = 0
+        for container in pod.spec.containers:
+            requests = (container.resources and container.resources.requests) or {}
+            cpu += parse_cpu(requests.get('cpu'))
+            memory += parse_memory_quantity(requests.get('memory'))
+        grants[user_name] = Grant(pod.spec.node_name, cpu, memory)
+    return grants
+
+
+placement_advisor = PlacementAdvisor()
+
+
+def schedule_placement(c, nodes, reserved=None):
+    """Pack user pods onto `nodes` ({node name: {'cpu': ..., 'memory': ...}}).
+
+    Memory sizes are read like KubeSpawner's (parse_memory): '2000M' is
+    2000 MiB.
+
+    `reserved` takes the requests of pods that are not user servers, such
+    as the hub itself, off a node's capacity, in the same format.
+    """
+    reserved = reserved or {}
+    placement_advisor.configure([
+        NodeCapacity(
+            name,
+            parse_cpu(capacity['cpu']) - parse_cpu(reserved.get(name, {}).get('cpu')),
+            parse_memory(capacity['memory']) - parse_memory(reserved.get(name, {}).get('memory')),
+        )
+        for name, capacity in nodes.items()
+    ])
+    if not placement_advisor.enabled:
+        print("✓ Placement advisor disabled (no nodes)")
+        return
+
+    async def sync_placement(app):
+        from kubespawner.clients import shared_client
+
+        observed = await load_pod_grants(
+            shared_client('CoreV1Api'), os.environ.get('POD_NAMESPACE', 'default')
+        )
+        placement_advisor.sync(observed)
+
+    hub_tasks.every('placement-sync', PLACEMENT_SYNC_SECONDS, sync_placement)
+    print(f"✓ Placement advisor packing onto {len(nodes)} node(s)")
@@ -0,0 +1,73 @@
+"""Hub-wide cache of per-user group membership, roles and class enrollment"""
+import time
+from collections import OrderedDict, namedtuple
+
+from jupyterhub import orm
+
+
+UserRoles = namedtuple('UserRoles', ['groups', 'is_admin', 'is_teacher', 'enrolled_class'])
+
+
+class RoleCache:
+    """TTL cache of UserRoles keyed by user id.
+
+    Entries are loaded with a single query on the user-group association
+    table and expire after `ttl` seconds, which bounds staleness for changes
+    made outside hub-config (e.g. the built-in admin UI). Code in hub-config
+    that changes membership must call invalidate() for the affected users.
+    """
+
+    def __init__(self, ttl=60, max_entries=20000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+
+    def get(self, db, user):
+        """Return UserRoles for a JupyterHub User or orm.User"""
+        now = self.clock()
+        entry = self._entries.get(user.id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        roles = self._load(db, user)
+        self._entries[user.id] = (now + self.ttl, roles)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return roles
+
+    def refresh(self, db, user):
+        """Reload one user's entry, for write paths that must not act on stale data"""
+        self.invalidate(user.id)
+        return self.get(db, user)
+
+    def invalidate(self, *user_ids):
+        """Drop cached entries so the next lookup reads the database"""
+        for user_id in user_ids:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        """Drop every cached entry"""
+        self._entries.clear()
+
+    def _load(self, db, user):
+        rows = (
+            db.query(orm.Group.name)
+            .join(orm.user_group_map, orm.user_group_map.c.group_id == orm.Group.id)
+            .filter(orm.user_group_map.c.user_id == user.id)
+            .all()
+        )
+        groups = frozenset(name for (name,) in rows)
+        enrolled_class = next(
+            (name for name in sorted(groups) if name.startswith(CLASS_GROUP_PREFIX)), None
+        )
+        return UserRoles(
+            groups=groups,
+            is_admin=bool(user.admin),
+            is_teacher='teachers' in groups,
+            enrolled_class=enrolled_class,
+        )
+
+
+role_cache = RoleCache(ttl=60)
@@ -0,0 +1,125 @@
+"""Shared roster queries for class (teacher-prof-*) groups"""
+from collections import namedtuple
+
+from jupyterhub import orm
+from sqlalchemy import and_, func
+
+
+# One compact row per class member: no ORM objects, no lazy loads
+RosterRow = namedtuple('RosterRow', ['name', 'last_activity', 'is_active'])
+RosterCounts = namedtuple('RosterCounts', ['total', 'active'])
+
+# Class groups are the teacher-prof-* groups
+CLASS_GROUP_PREFIX = 'teacher-prof-'
+
+# Largest page any roster/user listing endpoint will return
+MAX_PAGE_SIZE = 200
+
+
+def page_limit(value, default):
+    """Parse a ?limit= argument, clamped to 1..MAX_PAGE_SIZE"""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        limit = default
+    return min(max(limit, 1), MAX_PAGE_SIZE)
+
+
+def name_filters(column, after=None, prefix=None):
+    """Keyset and prefix conditions on a name column.
+
+    The prefix search is written as a range rather than LIKE so SQLite can
+    answer both conditions from the unique index on the name column.
+    """
+    conditions = []
+    if after:
+        conditions.append(column > after)
+    if prefix:
+        conditions.append(column >= prefix)
+        conditions.append(column < prefix + '\uffff')
+    return conditions
+
+
+def load_class_roster(db, group_name, exclude=(), after=None, prefix=None, limit=None, running=()):
+    """Load (a page of) a class roster with a single SQL query.
+
+    Joins the group and its members so that the cost of a page view does not
+    grow with the number of students. Server status is not read from the
+    database: `running` is the set of member names with a running server
+    (see server_index). Returns a list of RosterRow sorted by user name,
+    skipping any name in `exclude`. `after` and `prefix` select a keyset
+    page / name prefix.
+    """
+    query = (
+        db.query(orm.User.name, orm.User.last_activity)
+        .select_from(orm.Group)
+        .join(orm.user_group_map, orm.user_group_map.c.group_id == orm.Group.id)
+        .join(orm.User, orm.User.id == orm.user_group_map.c.user_id)
+        .filter(orm.Group.name == group_name, *name_filters(orm.User.name, after, prefix))
+    )
+    if exclude:
+        query = query.filter(orm.User.name.notin_(list(exclude)))
+    query = query.order_by(orm.User.name)
+    if limit:
+        query = query.limit(limit)
+
+    return [
+        RosterRow(name, last_activity, name in running)
+        for name, last_activity in query
+    ]
+
+
+def load_roster_counts(db, group_name, exclude=(), running=()):
+    """Total and active member counts of a class in one query.
+
+    `running` is the set of member names with a running server. Returns
+    None if the group does not exist.
+    """
+    member = orm.User.id == orm.user_group_map.c.user_id
+    if exclude:
+        member = and_(member, orm.User.name.notin_(list(exclude)))
+    row = (
+        db.query(func.count(orm.User.id))
+        .select_from(orm.Group)
+        .outerjoin(orm.user_group_map, orm.user_group_map.c.group_id == orm.Group.id)
+        .outerjoin(orm.User, member)
+        .filter(orm.Group.name == group_name)
+        .group_by(orm.Group.id)
+        .first()
+    )
+    if row is None:
+        return None
+    return RosterCounts(row[0], len(set(running).difference(exclude)))
+
+
+def count_class_students(db, group_name, exclude=()):
+    """Count members of a class group with one COUNT query"""
+    query = (
+        db.query(func.count(orm.user_group_map.c.user_id))
+        .select_from(orm.user_group_map)
+        .join(orm.Group, orm.Group.id == orm.user_group_map.c.group_id)
+        .join(orm.User, orm.User.id == orm.user_group_map.c.user_id)
+        .filter(orm.Group.name == group_name)
+    )
+    if exclude:
+        query = query.filter(orm.User.name.notin_(list(exclude)))
+    return query.scalar() or 0
+
+
+def resolve_enrolled_class(db, user_id):
+    """Name of the class group a user is enrolled in, or None.
+
+    One query on the association table's (user_id, group_id) primary key,
+    joined to groups by id and filtered by the class name prefix, so the
+    cost does not depend on class sizes.
+    """
+    return (
+        db.query(func.min(orm.Group.name))
+        .select_from(orm.user_group_map)
+        .join(orm.Group, orm.Group.id == orm.user_group_map.c.group_id)
+        .filter(
+            orm.user_group_map.c.user_id == user_id,
+            orm.Group.name.like(CLASS_GROUP_PREFIX + '%'),
+        )
+        .scalar()
+    )
@@ -0,0 +1,173 @@
+"""Idle-server culler with per-class and time-of-day thresholds"""
+import asyncio
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timedelta, timezone
+
+from jupyterhub import orm
+from sqlalchemy import and_, func
+
+
+# How often running servers are checked
+CULL_INTERVAL_SECONDS = 5 * 60
+
+RunningServer = namedtuple('RunningServer', ['user_name', 'class_name', 'last_activity'])
+CullRecord = namedtuple('CullRecord', ['user_name', 'class_name', 'idle_minutes', 'timeout_minutes', 'reason', 'culled_at'])
+
+culler_log = get_logger('culler')
+
+
+def load_running_servers(db):
+    """Every running server with its user's class and last activity, in one query"""
+    rows = (
+        db.query(
+            orm.User.name,
+            func.min(orm.Group.name),
+            func.max(func.coalesce(orm.Spawner.last_activity, orm.Spawner.started)),
+        )
+        .join(orm.Spawner, orm.Spawner.user_id == orm.User.id)
+        .outerjoin(orm.user_group_map, orm.user_group_map.c.user_id == orm.User.id)
+        .outerjoin(orm.Group, and_(
+            orm.Group.id == orm.user_group_map.c.group_id,
+            orm.Group.name.like(CLASS_GROUP_PREFIX + '%'),
+        ))
+        .filter(orm.Spawner.server_id.isnot(None))
+        .group_by(orm.User.id)
+    )
+    return [RunningServer(*row) for row in rows]
+
+
+def load_class_properties(db):
+    """{class name: group properties} for every class group"""
+    rows = (
+        db.query(orm.Group.name, orm.Group.properties)
+        .filter(orm.Group.name.like(CLASS_GROUP_PREFIX + '%'))
+    )
+    return {name: properties or {} for name, properties in rows}
+
+
+class CullPolicy:
+    """Idle timeout of a server, by its class and the time of day.
+
+    In order of precedence:
+    - during one of its class's lab slots: `lab_timeout`
+    - at night (`night_start`..`night_end` hours): `night_timeout`
+    - the class's 'idle_timeout_minutes' group property
+    - `idle_timeout`
+    """
+
+    def __init__(self, idle_timeout=60 * 60, lab_timeout=3 * 60 * 60, night_timeout=20 * 60,
+                 night_start=20, night_end=7, tz=LAB_TIMEZONE):
+        self.idle_timeout = idle_timeout
+        self.lab_timeout = lab_timeout
+        self.night_timeout = night_timeout
+        self.night_start = night_start
+        self.night_end = night_end
+        self.tz = tz
+
+    def in_lab(self, slots, now):
+        for slot in slots:
+            if slot.weekday != now.weekday():
+                continue
+            start = now.replace(hour=slot.hour, minute=slot.minute, second=0, microsecond=0)
+            if start <= now < start + timedelta(minutes=slot.minutes):
+                return True
+        return False
+
+    def is_night(self, now):
+        return now.hour >= self.night_start or now.hour < self.night_end
+
+    def timeout(self, class_name, class_properties, now):
+        """(timeout seconds, why) for a server of `class_name` at `now`"""
+        properties = class_properties.get(class_name, {}) if class_name else {}
+        if self.in_lab(parse_lab_slots(class_name, properties), now):
+            return self.lab_timeout, 'lab in progress'
+        if self.is_night(now):
+            return self.night_timeout, 'night'
+        if 'idle_timeout_minutes' in properties:
+            return int(properties['idle_timeout_minutes']) * 60, f"{class_name} policy"
+        return self.idle_timeout, 'default'
+
+
+class IdleCuller:
+    """Stops servers idle longer than their CullPolicy timeout.
+
+    Each run stops at most `batch_size` servers, most idle first, with at most
+    `concurrency` stops in flight. The last `history` culls are kept with
+    their reason for the admin panel.
+    """
+
+    def __init__(self, policy=None, batch_size=50, concurrency=5, history=200, clock=time.time):
+        self.policy = policy or CullPolicy()
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.clock = clock
+        self._history = deque(maxlen=history)
+
+    def now(self):
+        return datetime.fromtimestamp(self.clock(), self.policy.tz)
+
+    def select(self, servers, class_properties, now):
+        """CullRecords for the servers that are over their idle timeout"""
+        due = []
+        for server in servers:
+            if server.last_activity is None:
+                continue
+            last_activity = server.last_activity
+            if last_activity.tzinfo is None:
+                # The hub stores naive UTC timestamps
+                last_activity = last_activity.replace(tzinfo=timezone.utc)
+            idle = (now - last_activity).total_seconds()
+            timeout, why = self.policy.timeout(server.class_name, class_properties, now)
+            if idle > timeout:
+                due.append(CullRecord(
+                    server.user_name, server.class_name, int(idle // 60), timeout // 60,
+                    f"idle {int(idle // 60)} min > {timeout // 60} min ({why})", now,
+                ))
+        due.sort(key=lambda record: record.idle_minutes, reverse=True)
+        return due[:self.batch_size]
+
+    async def cull(self, servers, class_properties, backend):
+        """Stop the idle servers among `servers`; returns the CullRecords of stopped ones"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def stop(record):
+            async with semaphore:
+                await backend.stop(record.user_name)
+            return record
+
+        due = self.select(servers, class_properties, self.now())
+        results = await asyncio.gather(*(stop(record) for record in due), return_exceptions=True)
+        culled = []
+        for record, result in zip(due, results):
+            if isinstance(result, Exception):
+                culler_log.warning('culler.stop_failed', user=record.user_name, error=result)
+                continue
+            self._history.append(result)
+            culled.append(result)
+        return culled
+
+    def recent(self, limit=50):
+        """Most recent culls first"""
+        return list(reversed(self._history))[:limit]
+
+
+idle_culler = IdleCuller()
+
+
+def schedule_culler(c):
+    """Cull idle servers periodically from the hub's event loop"""
+
+    async def cull_idle_servers(app):
+        culled = await idle_culler.cull(
+            load_running_servers(app.db), load_class_properties(app.db), HubSpawnBackend(app),
+        )
+        for record in culled:
+            culler_log.audit('culler.culled', user=record.user_name, class_name=record.class_name, reason=record.reason)
+
+    hub_tasks.every('idle-culler', CULL_INTERVAL_SECONDS, cull_idle_servers)
+    policy = idle_culler.policy
+    print(
+        f"✓ Idle culler: {policy.idle_timeout // 60} min default, "
+        f"{policy.lab_timeout // 60} min during labs, {policy.night_timeout // 60} min at night"
+    )
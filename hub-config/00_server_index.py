@@ -0,0 +1,103 @@
+"""In-process index of running user servers, per user and per class group"""
+from jupyterhub import orm
+from sqlalchemy import and_, func
+
+
+class ServerIndex:
+    """Which users have a running server, and in which class.
+
+    Seeded from the database with one query the first time it is consulted
+    (after the hub has restored its spawners at startup), then kept current
+    by ClassSelectionSpawner's start/stop. Lookups never touch the database
+    afterwards. Listeners are called as listener(class_name, user_name,
+    active) for every change.
+    """
+
+    def __init__(self):
+        self._classes = None
+        self._by_class = {}
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """Call listener(class_name, user_name, active) on every start/stop"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def invalidate(self):
+        """Forget everything; the next lookup reseeds from the database"""
+        self._classes = None
+        self._by_class = {}
+
+    def _ensure(self, db):
+        if self._classes is not None:
+            return
+        rows = (
+            db.query(orm.User.name, func.min(orm.Group.name))
+            .join(orm.Spawner, orm.Spawner.user_id == orm.User.id)
+            .outerjoin(orm.user_group_map, orm.user_group_map.c.user_id == orm.User.id)
+            .outerjoin(orm.Group, and_(
+                orm.Group.id == orm.user_group_map.c.group_id,
+                orm.Group.name.like(CLASS_GROUP_PREFIX + '%'),
+            ))
+            .filter(orm.Spawner.server_id.isnot(None))
+            .group_by(orm.User.id)
+        )
+        self._classes = {}
+        self._by_class = {}
+        for user_name, class_name in rows:
+            self._add(user_name, class_name)
+
+    def _add(self, user_name, class_name):
+        self._classes[user_name] = class_name
+        if class_name:
+            self._by_class.setdefault(class_name, set()).add(user_name)
+
+    def _remove(self, user_name):
+        class_name = self._classes.pop(user_name, None)
+        if class_name:
+            members = self._by_class.get(class_name)
+            members.discard(user_name)
+            if not members:
+                del self._by_class[class_name]
+        return class_name
+
+    def is_running(self, db, user_name):
+        """Whether the user has a running server"""
+        self._ensure(db)
+        return user_name in self._classes
+
+    def running_count(self, db):
+        """Number of users with a running server"""
+        self._ensure(db)
+        return len(self._classes)
+
+    def class_running(self, db, class_name):
+        """Names of the class's members with a running server"""
+        self._ensure(db)
+        return frozenset(self._by_class.get(class_name, ()))
+
+    def set_running(self, user_name, class_name, active):
+        """Record a server start (active=True) or stop of a user"""
+        if self._classes is not None:
+            if active:
+                self._remove(user_name)
+                self._add(user_name, class_name)
+            else:
+                class_name = self._remove(user_name) or class_name
+        for listener in self._listeners:
+            listener(class_name, user_name, active)
+
+    def reassign(self, user_name, class_name):
+        """Move a running user to another class after an enrollment change"""
+        if self._classes is not None and user_name in self._classes:
+            old_class = self._remove(user_name)
+            self._add(user_name, class_name)
+            if old_class != class_name:
+                for listener in self._listeners:
+                    if old_class:
+                        listener(old_class, user_name, False)
+                    if class_name:
+                        listener(class_name, user_name, True)
+
+
+server_index = ServerIndex()
@@ -0,0 +1,133 @@
+"""Admission queue for server spawns: global and per-class concurrency limits"""
+import asyncio
+import time
+from collections import deque, namedtuple
+from contextlib import asynccontextmanager
+
+from prometheus_client import Gauge, Histogram
+
+
+SPAWN_ADMISSION_WAITING = Gauge(
+    'custom_spawn_admission_waiting',
+    'Spawns waiting in the admission queue',
+    ['class_name'],
+)
+SPAWN_ADMISSION_RUNNING = Gauge(
+    'custom_spawn_admission_running',
+    'Spawns admitted and in progress',
+    ['class_name'],
+)
+SPAWN_ADMISSION_WAIT_SECONDS = Histogram(
+    'custom_spawn_admission_wait_seconds',
+    'Time spawns spent waiting for admission',
+    buckets=[0.1, 1, 5, 10, 30, 60, 120, 300, float('inf')],
+)
+
+Waiter = namedtuple('Waiter', ['user_name', 'class_name', 'future'])
+
+
+class SpawnAdmission:
+    """FIFO admission of spawns under a global and a per-class limit.
+
+    Waiters are admitted in arrival order; a waiter whose class is at its
+    limit does not hold up later waiters of other classes. A limit of 0
+    means unlimited. Spawns without a class (teachers, admins) only count
+    toward the global limit.
+    """
+
+    def __init__(self, global_limit=20, class_limit=8):
+        self.global_limit = global_limit
+        self.class_limit = class_limit
+        self._running = 0
+        self._running_by_class = {}
+        self._waiting = deque()
+
+    def configure(self, global_limit, class_limit):
+        """Apply (possibly changed) limits and admit whoever now fits"""
+        self.global_limit = global_limit
+        self.class_limit = class_limit
+        self._dispatch()
+
+    @staticmethod
+    def _label(class_name):
+        return class_name or 'none'
+
+    def _has_room(self, class_name):
+        if self.global_limit and self._running >= self.global_limit:
+            return False
+        if class_name and self.class_limit:
+            return self._running_by_class.get(class_name, 0) < self.class_limit
+        return True
+
+    def _admit(self, class_name):
+        self._running += 1
+        self._running_by_class[class_name] = self._running_by_class.get(class_name, 0) + 1
+        SPAWN_ADMISSION_RUNNING.labels(self._label(class_name)).inc()
+
+    def _dispatch(self):
+        for waiter in list(self._waiting):
+            if self.global_limit and self._running >= self.global_limit:
+                break
+            if waiter.future.done() or not self._has_room(waiter.class_name):
+                continue
+            self._waiting.remove(waiter)
+            SPAWN_ADMISSION_WAITING.labels(self._label(waiter.class_name)).dec()
+            self._admit(waiter.class_name)
+            waiter.future.set_result(None)
+
+    async def acquire(self, user_name, class_name=None):
+        """Wait for a spawn slot; callers must release() it afterwards"""
+        if not self._waiting and self._has_room(class_name):
+            self._admit(class_name)
+            SPAWN_ADMISSION_WAIT_SECONDS.observe(0)
+            return
+
+        waiter = Waiter(user_name, class_name, asyncio.get_running_loop().create_future())
+        self._waiting.append(waiter)
+        SPAWN_ADMISSION_WAITING.labels(self._label(class_name)).inc()
+        started = time.monotonic()
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self._waiting:
+                self._waiting.remove(waiter)
+                SPAWN_ADMISSION_WAITING.labels(self._label(class_name)).dec()
+            elif waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as the spawn was cancelled
+                self.release(class_name)
+            raise
+        SPAWN_ADMISSION_WAIT_SECONDS.observe(time.monotonic() - started)
+
+    def release(self, class_name=None):
+        """Free a slot taken by acquire() and admit the next waiters"""
+        self._running -= 1
+        self._running_by_class[class_name] -= 1
+        if not self._running_by_class[class_name]:
+            del self._running_by_class[class_name]
+        SPAWN_ADMISSION_RUNNING.labels(self._label(class_name)).dec()
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, user_name, class_name=None):
+        """async with spawn_admission.slot(name, class_name): <spawn>"""
+        await self.acquire(user_name, class_name)
+        try:
+            yield
+        finally:
+            self.release(class_name)
+
+    def position(self, user_name):
+        """1-based position of the user's spawn in the queue, or None"""
+        for position, waiter in enumerate(self._waiting, 1):
+            if waiter.user_name == user_name:
+                return position
+        return None
+
+    @property
+    def waiting(self):
+        """Number of spawns waiting for admission"""
+        return len(self._waiting)
+
+
+spawn_admission = SpawnAdmission()
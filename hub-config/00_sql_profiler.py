@@ -0,0 +1,206 @@
+"""Opt-in SQL profiler for the custom handlers: statements grouped by shape, repeats flagged"""
+import itertools
+import re
+import time
+from collections import deque, namedtuple
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from jupyterhub.handlers import BaseHandler
+from sqlalchemy import event
+from tornado import web
+
+
+# Request header (or ?sql_profile=1) an admin sends to profile one request
+PROFILE_HEADER = 'X-SQL-Profile'
+
+# The same statement shape this many times in one request is flagged: most
+# likely a query run in a loop (N+1)
+PROFILE_REPEAT_THRESHOLD = 3
+
+# Profiled requests kept for /hub/debug/profile, and patterns kept per request
+PROFILE_HISTORY = 50
+PROFILE_TOP_PATTERNS = 10
+
+# Pattern: one normalized statement and how often / how long it ran
+Pattern = namedtuple('Pattern', ['sql', 'count', 'seconds'])
+ProfileRecord = namedtuple('ProfileRecord', [
+    'handler', 'method', 'path', 'user_name', 'statements', 'sql_seconds', 'patterns', 'repeated', 'profiled_at',
+])
+
+_SPACE_RE = re.compile(r'\s+')
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAM_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+
+sql_log = get_logger('sql')
+
+# Profile of the request being served, if it is being profiled
+current_profile = ContextVar('current_profile', default=None)
+
+
+def normalize_sql(statement):
+    """Statement shape: literals become ? and IN lists of any length (?, ...)"""
+    statement = _SPACE_RE.sub(' ', statement).strip()
+    statement = _LITERAL_RE.sub('?', statement)
+    return _PARAM_LIST_RE.sub('(?, ...)', statement)
+
+
+class SQLProfile:
+    """Statements one request runs, grouped by normalized SQL.
+
+    Session events do not see cursor executions, so the listeners go on the
+    engine behind the request's session for the duration of the request
+    and only count statements run from this request's context.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.requested = False
+        self.statements = 0
+        self.sql_seconds = 0.0
+        # normalized SQL -> [count, seconds]
+        self._patterns = {}
+        self._active = False
+
+    def start(self):
+        self._active = True
+        current_profile.set(self)
+        event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(self.engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def stop(self):
+        if not self._active:
+            return
+        event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.remove(self.engine, 'after_cursor_execute', self._after_cursor_execute)
+        current_profile.set(None)
+        self._active = False
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if current_profile.get() is self:
+            conn.info.setdefault('profile_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('profile_query_start')
+        if current_profile.get() is not self or not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        pattern = self._patterns.setdefault(normalize_sql(statement), [0, 0.0])
+        pattern[0] += 1
+        pattern[1] += elapsed
+        self.statements += 1
+        self.sql_seconds += elapsed
+
+    def patterns(self):
+        """Patterns, most frequent first"""
+        patterns = [Pattern(sql, count, seconds) for sql, (count, seconds) in self._patterns.items()]
+        return sorted(patterns, key=lambda pattern: (-pattern.count, -pattern.seconds))
+
+    def repeated(self, threshold=PROFILE_REPEAT_THRESHOLD):
+        return [pattern for pattern in self.patterns() if pattern.count >= threshold]
+
+    def summary(self):
+        """Value of the X-SQL-Profile response header"""
+        return (
+            f"statements={self.statements}; time_ms={self.sql_seconds * 1000:.1f}; "
+            f"patterns={len(self._patterns)}; repeated={len(self.repeated())}"
+        )
+
+
+class SQLProfiler:
+    """Which requests to profile, and the most recent profiles.
+
+    Admins opt a request in with an `X-SQL-Profile: 1` header or a
+    `sql_profile=1` argument and get the summary back in the X-SQL-Profile
+    response header; `sample_every=N` also profiles every Nth request to a
+    custom page, for anyone, without the header. Every profile shows up on
+    /hub/debug/profile.
+    """
+
+    def __init__(self, enabled=True, sample_every=0, history=PROFILE_HISTORY):
+        self.enabled = enabled
+        self.sample_every = sample_every
+        self._requests = itertools.count(1)
+        self._history = deque(maxlen=history)
+
+    def requested(self, handler):
+        """Did an admin ask for this request to be profiled?"""
+        user = handler.current_user
+        if user is None or not user.admin:
+            return False
+        return (
+            handler.request.headers.get(PROFILE_HEADER) == '1'
+            or handler.get_query_argument('sql_profile', '') == '1'
+        )
+
+    def begin(self, handler):
+        """Profile of the request if it is to be profiled, else None"""
+        if not self.enabled:
+            return None
+        requested = self.requested(handler)
+        if not requested and not (self.sample_every and next(self._requests) % self.sample_every == 0):
+            return None
+        profile = SQLProfile(handler.db.get_bind())
+        profile.requested = requested
+        profile.start()
+        return profile
+
+    def end(self, handler, profile):
+        """Stop profiling, keep the profile and, if asked for, send its summary"""
+        profile.stop()
+        user = handler.current_user
+        repeated = profile.repeated()
+        self._history.append(ProfileRecord(
+            type(handler).__name__, handler.request.method, handler.request.path,
+            user.name if user else None, profile.statements, profile.sql_seconds,
+            profile.patterns()[:PROFILE_TOP_PATTERNS], repeated, datetime.now(timezone.utc),
+        ))
+        for pattern in repeated:
+            sql_log.info(
+                'sql.repeated', handler=type(handler).__name__, path=handler.request.path,
+                count=pattern.count, sql=pattern.sql,
+            )
+        if profile.requested and not handler._headers_written:
+            handler.set_header(PROFILE_HEADER, profile.summary())
+
+    def recent(self, limit=PROFILE_HISTORY):
+        """Most recent profiles first"""
+        return list(reversed(self._history))[:limit]
+
+
+sql_profiler = SQLProfiler()
+
+
+class SQLProfileHandler(InstrumentedHandler, BaseHandler):
+    """Recent profiled requests and their repeated statements, for admins"""
+
+    @web.authenticated
+    async def get(self):
+        if not self.current_user.admin:
+            self.set_status(403)
+            self.write("<h1>Access Denied</h1><p>This page is for administrators only.</p>")
+            return
+
+        profiles = sql_profiler.recent()
+        html = render_page(
+            'sql-profile.html',
+            profiles=profiles,
+            flagged=[profile for profile in profiles if profile.repeated],
+            threshold=PROFILE_REPEAT_THRESHOLD,
+            enabled=sql_profiler.enabled,
+            sample_every=sql_profiler.sample_every,
+        )
+        self.finish(html)
+
+
+def configure_profiler(c, enabled=True, sample_every=0):
+    """Allow opt-in profiling, optionally sample every Nth request, and serve /hub/debug/profile"""
+    sql_profiler.enabled = enabled
+    sql_profiler.sample_every = sample_every
+
+    if not hasattr(c.JupyterHub, 'extra_handlers') or c.JupyterHub.extra_handlers is None:
+        c.JupyterHub.extra_handlers = []
+
+    c.JupyterHub.extra_handlers.append((r'/debug/profile', SQLProfileHandler))
+    sampling = f", every {sample_every}th request sampled" if sample_every else ""
+    print(f"✓ SQL profiler at /hub/debug/profile ({PROFILE_HEADER}: 1 to profile a request{sampling})")
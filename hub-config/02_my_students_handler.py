@@ -1,249 +1,169 @@
 """Teacher dashboard - view students in their class"""
 from jupyterhub.handlers import BaseHandler
-from jupyterhub import orm
 from tornado import web
-from datetime import datetime, timezone
+from tornado.iostream import StreamClosedError
+import asyncio
+import json
 
 
-class MyStudentsHandler(BaseHandler):
+# Students rendered with the page; the rest are fetched from /my-students/roster
+FIRST_PAGE_SIZE = 100
+
+TEACHER_NAMES = {'prof_smith', 'prof_jones', 'prof_doe', 'admin'}
+
+
+class MyStudentsHandler(InstrumentedHandler, BaseHandler):
     """Handler for teachers to view their students"""
-    
+
+    def teacher_class(self):
+        """(is teacher or admin, class group name) for the current user"""
+        roles = role_cache.get(self.db, self.current_user)
+        return roles.is_teacher or roles.is_admin, roles.enrolled_class
+
+    async def load_page(self, teacher_group_name, after=None, prefix=None, limit=FIRST_PAGE_SIZE):
+        """Load one keyset page of the roster, plus the cursor of the next page"""
+        rows = await hub_reader.run(
+            self.db, load_class_roster, teacher_group_name, exclude=TEACHER_NAMES,
+            after=after, prefix=prefix, limit=limit + 1,
+            running=server_index.class_running(self.db, teacher_group_name),
+        )
+        next_after = rows[limit - 1].name if len(rows) > limit else None
+        return rows[:limit], next_after
+
     @web.authenticated
     async def get(self):
-        """Show list of students in teacher's class"""
-        user = self.current_user
-        
-        user_groups = {g.name for g in user.groups}
-        if 'teachers' not in user_groups and not user.admin:
+        """Show the first page of students in teacher's class"""
+        is_teacher, teacher_group_name = self.teacher_class()
+        if not is_teacher:
             self.set_status(403)
             self.write("<h1>Access Denied</h1><p>This page is for teachers only.</p>")
             return
-        
-        teacher_group_name = None
-        for group_name in user_groups:
-            if group_name.startswith('teacher-prof-'):
-                teacher_group_name = group_name
-                break
-        
+
         if not teacher_group_name:
             self.write("<h1>No Class Found</h1><p>You don't have a class assigned yet.</p>")
             return
-        
-        group = self.db.query(orm.Group).filter_by(name=teacher_group_name).first()
-        
-        if not group:
+
+        counts = await hub_reader.run(
+            self.db, load_roster_counts, teacher_group_name, exclude=TEACHER_NAMES,
+            running=server_index.class_running(self.db, teacher_group_name),
+        )
+        if counts is None:
             self.write("<h1>Class Not Found</h1>")
             return
-        
-        teacher_names = {'prof_smith', 'prof_jones', 'prof_doe', 'admin'}
-        students = [u for u in group.users if u.name not in teacher_names]
-        
-        active_count = 0
-        
-        student_rows = ""
-        for student in students:
-            try:
-                student_spawners = self.db.query(orm.Spawner).filter_by(user_id=student.id).all()
-                is_active = any(s.server is not None for s in student_spawners)
-                if is_active:
-                    active_count += 1
-            except:
-                is_active = False
-            
-            status = "Active" if is_active else "Offline"
-            status_badge = f'<span style="color: #38ef7d; font-weight: 600;">{status}</span>' if is_active else f'<span style="color: #95a5a6; font-weight: 600;">{status}</span>'
-            
-            last_activity = student.last_activity
-            if last_activity:
-                now = datetime.now(timezone.utc)
-                if last_activity.tzinfo is None:
-                    last_activity = last_activity.replace(tzinfo=timezone.utc)
-                
-                time_ago = now - last_activity
-                if time_ago.days > 0:
-                    activity_str = f"{time_ago.days} days ago"
-                elif time_ago.seconds > 3600:
-                    activity_str = f"{time_ago.seconds // 3600} hours ago"
-                elif time_ago.seconds > 60:
-                    activity_str = f"{time_ago.seconds // 60} minutes ago"
-                else:
-                    activity_str = "Just now"
-            else:
-                activity_str = "Never"
-            
-            # Add connect button
-            connect_btn = f'<a href="/user/{student.name}/" target="_blank" class="btn btn-xs" style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: #fff; padding: 6px 14px; border-radius: 8px; text-decoration: none; font-weight: 600;">Connect</a>'
-            
-            student_rows += f"""
-            <tr>
-                <td>{student.name}</td>
-                <td>{status_badge}</td>
-                <td>{activity_str}</td>
-                <td>{connect_btn}</td>
-            </tr>
-            """
-        
-        if not students:
-            student_rows = '<tr><td colspan="4" style="text-align: center; color: #999;">No students in your class yet</td></tr>'
-        
-        teacher_name = teacher_group_name.replace('teacher-prof-', 'Prof. ').replace('-', ' ').title()
-        
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>My Students - {teacher_name}</title>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1">
-            <link rel="stylesheet" href="/hub/static/css/style.min.css" type="text/css" />
-            <style>
-                body {{
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    min-height: 100vh;
-                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
-                }}
-                .page-title {{
-                    text-align: center;
-                    margin: 40px 0 12px;
-                    color: #fff;
-                    font-size: 2.8em;
-                    font-weight: 800;
-                    text-shadow: 0 4px 20px rgba(0,0,0,0.3);
-                    letter-spacing: -0.5px;
-                }}
-                .page-subtitle {{
-                    text-align: center;
-                    margin-bottom: 32px;
-                    color: rgba(255, 255, 255, 0.92);
-                    font-size: 1.15em;
-                    font-weight: 400;
-                    text-shadow: 0 2px 10px rgba(0,0,0,0.2);
-                }}
-                .button-row {{
-                    text-align: center;
-                    margin-top: 24px;
-                }}
-                .button-row .btn {{
-                    margin: 8px;
-                    min-width: 180px;
-                    padding: 14px 28px;
-                    font-size: 15px;
-                    font-weight: 600;
-                    border-radius: 12px;
-                    border: none;
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: #fff;
-                    box-shadow: 0 4px 15px rgba(102, 126, 234, 0.4);
-                    transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-                    text-transform: uppercase;
-                    letter-spacing: 0.5px;
-                    cursor: pointer;
-                }}
-                .button-row .btn:hover {{
-                    transform: translateY(-2px);
-                    box-shadow: 0 8px 25px rgba(102, 126, 234, 0.5);
-                    text-decoration: none;
-                    color: #fff;
-                }}
-                .card-panel {{
-                    background: linear-gradient(145deg, #ffffff 0%, #f8f9fa 100%);
-                    border-radius: 20px;
-                    padding: 32px;
-                    box-shadow: 0 20px 60px rgba(0,0,0,0.25), 0 0 0 1px rgba(255,255,255,0.1);
-                    backdrop-filter: blur(10px);
-                    border: 1px solid rgba(255,255,255,0.2);
-                }}
-                .stats-bar {{
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: white;
-                    padding: 20px;
-                    border-radius: 16px;
-                    margin-bottom: 24px;
-                    text-align: center;
-                    font-size: 16px;
-                    font-weight: 700;
-                    box-shadow: 0 8px 20px rgba(102, 126, 234, 0.3);
-                }}
-                .stats-bar strong {{
-                    font-size: 20px;
-                    margin: 0 4px;
-                }}
-                .table {{
-                    margin-bottom: 0;
-                }}
-                .table th {{
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: white;
-                    font-weight: 700;
-                    text-transform: uppercase;
-                    letter-spacing: 0.5px;
-                    font-size: 13px;
-                    padding: 14px 12px;
-                    border: none;
-                }}
-                .table th:first-child {{
-                    border-top-left-radius: 12px;
-                }}
-                .table th:last-child {{
-                    border-top-right-radius: 12px;
-                }}
-                .table td {{
-                    vertical-align: middle;
-                    padding: 16px 12px;
-                    font-size: 14px;
-                    border-bottom: 1px solid #e9ecef;
-                }}
-                .table tbody tr {{
-                    transition: all 0.2s ease;
-                }}
-                .table tbody tr:hover {{
-                    background: rgba(102, 126, 234, 0.05);
-                    transform: scale(1.01);
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1 class="page-title">{teacher_name}'s Class</h1>
-                <p class="page-subtitle">Hello, {user.name}! Here's your student roster.</p>
-
-                <div class="card-panel">
-                    <div class="stats-bar">
-                        Total Students: <strong>{len(students)}</strong> &nbsp; • &nbsp; Active Now: <strong>{active_count}</strong>
-                    </div>
-
-                    <table class="table table-striped">
-                        <thead>
-                            <tr>
-                                <th>Student Name</th>
-                                <th>Status</th>
-                                <th>Last Activity</th>
-                                <th>Actions</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                            {student_rows}
-                        </tbody>
-                    </table>
-                </div>
-
-                <div class="button-row">
-                    <a class="btn" href="/hub/home">Back to Home</a>
-                    <button class="btn" onclick="location.reload()">Refresh</button>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+
+        students, next_after = await self.load_page(teacher_group_name)
+
+        html = render_page(
+            'my-students.html',
+            class_name=teacher_group_name,
+            username=self.current_user.name,
+            students=students,
+            total_count=counts.total,
+            active_count=counts.active,
+            next_after=next_after,
+            page_size=FIRST_PAGE_SIZE,
+        )
         self.finish(html)
 
 
+class MyStudentsRosterHandler(MyStudentsHandler):
+    """JSON roster with keyset pagination and name-prefix search"""
+
+    @web.authenticated
+    async def get(self):
+        """GET /hub/my-students/roster?after=<name>&q=<prefix>&limit=<n>"""
+        is_teacher, teacher_group_name = self.teacher_class()
+        if not is_teacher:
+            raise web.HTTPError(403, "This page is for teachers only")
+        if not teacher_group_name:
+            raise web.HTTPError(404, "You don't have a class assigned yet")
+
+        limit = page_limit(self.get_argument('limit', None), FIRST_PAGE_SIZE)
+        students, next_after = await self.load_page(
+            teacher_group_name,
+            after=self.get_argument('after', None),
+            prefix=self.get_argument('q', None),
+            limit=limit,
+        )
+
+        self.set_header('Content-Type', 'application/json')
+        self.finish({
+            'students': [
+                {
+                    'name': student.name,
+                    'active': student.is_active,
+                    'last_activity': time_ago(student.last_activity),
+                }
+                for student in students
+            ],
+            'next': next_after,
+        })
+
+
+class MyStudentsEventsHandler(MyStudentsHandler):
+    """Server-Sent Events stream of the class's server status.
+
+    Sends one 'snapshot' event with the currently active students, then a
+    'status' event per server start/stop, so open dashboards stay current
+    without polling the database.
+    """
+
+    streaming = True
+    keepalive_interval = 20
+
+    async def send_event(self, event, data):
+        try:
+            self.write(f"event: {event}\ndata: {json.dumps(data)}\n\n")
+            await self.flush()
+        except StreamClosedError:
+            raise web.Finish()
+
+    @web.authenticated
+    async def get(self):
+        """GET /hub/my-students/events"""
+        is_teacher, teacher_group_name = self.teacher_class()
+        if not is_teacher:
+            raise web.HTTPError(403, "This page is for teachers only")
+        if not teacher_group_name:
+            raise web.HTTPError(404, "You don't have a class assigned yet")
+
+        self.set_header('Content-Type', 'text/event-stream')
+        self.set_header('Cache-Control', 'no-cache')
+
+        queue, snapshot = class_status.subscribe(self.db, teacher_group_name, exclude=TEACHER_NAMES)
+        try:
+            await self.send_event('snapshot', {
+                'active': sorted(name for name, active in snapshot.items() if active),
+                'total': len(snapshot),
+            })
+            while True:
+                try:
+                    change = await asyncio.wait_for(queue.get(), timeout=self.keepalive_interval)
+                except asyncio.TimeoutError:
+                    # Comment line, keeps intermediate proxies from closing the stream
+                    await self.send_event_comment('keepalive')
+                    continue
+                if change is None:
+                    break
+                await self.send_event('status', change)
+        finally:
+            class_status.unsubscribe(teacher_group_name, queue)
+
+    async def send_event_comment(self, comment):
+        try:
+            self.write(f": {comment}\n\n")
+            await self.flush()
+        except StreamClosedError:
+            raise web.Finish()
+
+
 def register_handler(c):
     """Register the my students handler"""
     if not hasattr(c.JupyterHub, 'extra_handlers') or c.JupyterHub.extra_handlers is None:
         c.JupyterHub.extra_handlers = []
-    
+
     c.JupyterHub.extra_handlers.append((r'/my-students', MyStudentsHandler))
+    c.JupyterHub.extra_handlers.append((r'/my-students/roster', MyStudentsRosterHandler))
+    c.JupyterHub.extra_handlers.append((r'/my-students/events', MyStudentsEventsHandler))
+    server_index.add_listener(class_status.set_active)
     print("✓ Teacher dashboard available at: /hub/my-students")
-
-
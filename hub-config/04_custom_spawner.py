@@ -1,6 +1,11 @@
 """Custom spawner with profile-based class selection"""
+import time
+
 from kubespawner import KubeSpawner
-from jupyterhub import orm
+from traitlets import Integer
+
+
+spawner_log = get_logger('spawner')
 
 
 class ClassSelectionSpawner(KubeSpawner):
@@ -9,24 +14,44 @@ class ClassSelectionSpawner(KubeSpawner):
     1. Shows class profiles for students to select
     2. Assigns students to teacher groups based on selection
     3. Filters profiles based on user type
+    4. Queues spawns behind global and per-class concurrency limits
+    5. Takes over a warm placeholder pod of the selected profile, if any
+    6. Applies the student's class resource policy on top of the profile
+    7. Packs pods onto nodes with the placement advisor
+    8. Times each phase of a spawn (custom_spawn_phase_duration_seconds)
     """
+
+    # Class the current spawn counts toward, set by start()
+    class_name = None
+
+    # Node preference added by place_pod() for the last spawn
+    _placement_preference = None
+
+    spawn_concurrency_limit = Integer(
+        20,
+        config=True,
+        help="""Spawns allowed to run at once across the hub (0 for unlimited).
+
+        Time spent queued counts toward start_timeout.
+        """,
+    )
+
+    class_spawn_concurrency_limit = Integer(
+        8,
+        config=True,
+        help="Spawns allowed to run at once per class (0 for unlimited).",
+    )
     
     def _options_form_default(self):
         """Filter profiles based on user type - teachers get no form, just default environment"""
-        user_groups = {g.name for g in self.user.groups}
+        roles = role_cache.get(self.db, self.user)
         
         # Teachers and admins don't need to select a profile - they get teacher-environment automatically
-        if 'teachers' in user_groups or self.user.admin:
+        if roles.is_teacher or roles.is_admin:
             return ''  # No form for teachers, just use default profile
         
-        # If already enrolled, skip options entirely (check ORM)
-        for group_name in ('teacher-prof-smith', 'teacher-prof-jones', 'teacher-prof-doe'):
-            group = self.db.query(orm.Group).filter_by(name=group_name).first()
-            if group and self.user.orm_user in group.users:
-                return ''
-
-        # If already enrolled (fallback to group list), skip options entirely
-        if any(g.startswith('teacher-prof-') for g in user_groups):
+        # If already enrolled, skip options entirely
+        if roles.enrolled_class:
             return ''
 
         # Students see only class profiles (not teacher-environment)
@@ -43,51 +68,128 @@ class ClassSelectionSpawner(KubeSpawner):
     
     async def start(self):
         """Assign student to teacher group based on profile selection (only once)"""
-        user_groups = {g.name for g in self.user.groups}
+        enrollment_started = time.perf_counter()
+        roles = role_cache.get(self.db, self.user)
         username = self.user.name
 
         # For teachers/admins, automatically set teacher-environment profile
-        if 'teachers' in user_groups or self.user.admin:
+        if roles.is_teacher or roles.is_admin:
             if not self.user_options.get('profile'):
                 self.user_options['profile'] = 'teacher-environment'
-                print(f"Teacher/Admin {username} automatically assigned teacher-environment profile")
+                spawner_log.info('spawn.teacher_profile', user=username, profile='teacher-environment')
 
         # For students, handle class enrollment
-        if 'teachers' not in user_groups and not self.user.admin:
-            profile_to_group = {
-                'prof-smith-class': 'teacher-prof-smith',
-                'prof-jones-class': 'teacher-prof-jones',
-                'prof-doe-class': 'teacher-prof-doe',
-            }
-            group_to_profile = {group: profile for profile, group in profile_to_group.items()}
-
-            # Check if student is already enrolled in any class
-            enrolled_group = None
-            for group_name in profile_to_group.values():
-                group = self.db.query(orm.Group).filter_by(name=group_name).first()
-                if group and self.user.orm_user in group.users:
-                    enrolled_group = group_name
-                    print(f"Student {username} already enrolled in {group_name}, keeping current enrollment")
-                    break
+        class_name = None
+        if not roles.is_teacher and not roles.is_admin:
+            # Check if student is already enrolled in any class, never trusting a cached "not enrolled"
+            enrolled_group = roles.enrolled_class or resolve_enrolled_class(self.db, self.user.id)
+            if enrolled_group and not roles.enrolled_class:
+                role_cache.invalidate(self.user.id)
 
             # If already enrolled, clear profile entirely and use default
             if enrolled_group:
                 self.user_options['profile'] = ''
-                print(f"Student {username} using default profile (enrolled in {enrolled_group})")
+                spawner_log.info('spawn.enrolled_student', user=username, class_name=enrolled_group)
+                class_name = enrolled_group
             else:
                 selected_profile = self.user_options.get('profile', '')
-                teacher_group = profile_to_group.get(selected_profile)
+                teacher_group = class_policies.class_for_profile(self.db, selected_profile)
 
                 if teacher_group:
-                    print(f"Student {username} selected {selected_profile} → {teacher_group} (first enrollment)")
+                    enrollment = await hub_writer.submit(self.db, enroll_student, self.user.id, teacher_group)
+                    if enrollment.added:
+                        expire_memberships(self.db, [self.user.id], [enrollment.group_id])
+                        role_cache.invalidate(self.user.id)
+                        record_enrollment('spawner', 'enrolled')
+                        spawner_log.audit('spawn.first_enrollment', user=username, profile=selected_profile, class_name=teacher_group)
+                    class_name = enrollment.class_name
+
+        self.class_name = class_name
+        queued = time.perf_counter()
+        SPAWN_PHASE_SECONDS.labels('enrollment').observe(queued - enrollment_started)
+        spawn_admission.configure(self.spawn_concurrency_limit, self.class_spawn_concurrency_limit)
+        async with spawn_admission.slot(username, class_name):
+            SPAWN_PHASE_SECONDS.labels('queue').observe(time.perf_counter() - queued)
+            with spawn_phase('placeholder'):
+                claimed = await self.claim_placeholder()
+            try:
+                with spawn_phase('start'):
+                    url = await super().start()
+            except Exception:
+                placement_advisor.release(username)
+                raise
+            finally:
+                # The user pod is scheduled (or failed): only now replace the placeholder
+                if claimed:
+                    placeholder_pool.refill_after_spawn(claimed)
+        self.publish_status(True)
+        return url
+
+    async def load_user_options(self):
+        """Apply the selected profile, then the student's class resource policy"""
+        await super().load_user_options()
+        policy = class_policies.get(self.db, self.class_name) if self.class_name else None
+        if policy and policy.overrides:
+            self._apply_overrides(policy.overrides)
+            spawner_log.info('spawn.class_resources', user=self.user.name, class_name=self.class_name, **policy.overrides)
+        self.place_pod()
+
+    def place_pod(self):
+        """Steer the pod to the best-fit node, or refuse if the cluster is full"""
+        if not placement_advisor.enabled:
+            return
+        node = placement_advisor.reserve(
+            self.user.name, parse_cpu(self.cpu_guarantee), parse_memory(self.mem_guarantee)
+        )
+        preference = {
+            'weight': 100,
+            'preference': {
+                'matchExpressions': [
+                    {'key': 'kubernetes.io/hostname', 'operator': 'In', 'values': [node]},
+                ],
+            },
+        }
+        # Keep the configured and profile preferences, replacing the previous spawn's node
+        self.node_affinity_preferred = [
+            term for term in self.node_affinity_preferred if term != self._placement_preference
+        ] + [preference]
+        self._placement_preference = preference
+
+    async def stop(self, now=False):
+        """Stop the server and drop it from the server index"""
+        await super().stop(now=now)
+        placement_advisor.release(self.user.name)
+        self.publish_status(False)
+
+    def selected_profile_slug(self):
+        """Slug of the profile this spawn uses (the default one if none was chosen)"""
+        profiles = self.profile_list if isinstance(self.profile_list, list) else []
+        selected = self.user_options.get('profile')
+        for profile in profiles:
+            slug = profile_slug(profile)
+            if slug == selected or (not selected and profile.get('default')):
+                return slug
+        return None
+
+    async def claim_placeholder(self):
+        """Free a warm placeholder pod of our profile for the user pod to take over.
 
-                    group = self.db.query(orm.Group).filter_by(name=teacher_group).first()
-                    if group:
-                        group.users.append(self.user.orm_user)
-                        self.db.commit()
-                        print(f"  → Added to {teacher_group}")
+        Returns the profile slug if a placeholder was claimed, else None.
+        """
+        slug = self.selected_profile_slug()
+        try:
+            if await placeholder_pool.claim(slug):
+                spawner_log.info('spawn.placeholder_claimed', user=self.user.name, profile=slug)
+                return slug
+        except Exception as e:
+            # The pool only speeds spawns up; never fail a spawn because of it
+            spawner_log.warning('spawn.placeholder_claim_failed', user=self.user.name, profile=slug, error=e)
+        return None
 
-        return await super().start()
+    def publish_status(self, active):
+        """Record a start/stop of this user's server in the server index"""
+        roles = role_cache.get(self.db, self.user)
+        server_index.set_running(self.user.name, roles.enrolled_class, active)
 
 
 def configure_spawner(c):
@@ -1,32 +1,134 @@
 """Student auto-authorization hook"""
+import asyncio
+import re
+
 from nativeauthenticator.orm import UserInfo as NativeUserInfo
+from sqlalchemy import inspect
+
+
+# Sign-ups with an email in one of these domains are authorized automatically
+STUDENT_EMAIL_DOMAINS = ['stud.acs.pub.ro']
+
+PROTECTED_USERS = {'admin', 'prof_smith', 'prof_jones', 'prof_doe'}
+
+auth_log = get_logger('auth')
+
+
+def compile_email_domains(domains):
+    """One case-insensitive regex matching an email in any of the domains"""
+    alternatives = '|'.join(re.escape(domain.lstrip('@')) for domain in domains)
+    return re.compile(rf'@(?:{alternatives})$', re.IGNORECASE)
+
+
+student_email_re = compile_email_domains(STUDENT_EMAIL_DOMAINS)
+
+
+class AuthorizationBatcher:
+    """Coalesces student authorizations into one UPDATE per batch.
+
+    Users known to be authorized are remembered, so their later logins do
+    not touch the database. A batch is handed to hub_writer `flush_delay`
+    seconds after its first authorization, or as soon as it holds
+    `max_batch` users.
+    """
+
+    def __init__(self, flush_delay=0.05, max_batch=200):
+        self.flush_delay = flush_delay
+        self.max_batch = max_batch
+        self.authorized = set()
+        self._pending = {}
+        self._db = None
+        self._flush_handle = None
+
+    def authorize(self, db, username):
+        """Queue a user's authorization; returns a future resolved once committed"""
+        future = self._pending.get(username)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[username] = future
+        self._db = db
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_delay, self.flush)
+        return future
+
+    def flush(self):
+        """Write all queued authorizations in one UPDATE"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+
+        db = self._db
+        write = hub_writer.submit(db, authorize_students, list(batch))
+        write.add_done_callback(lambda write: self._written(db, batch, write))
+
+    def _written(self, db, batch, write):
+        error = write.exception()
+        if error is not None:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        expire_authorizations(db, batch)
+        self.authorized.update(batch)
+        for future in batch.values():
+            if not future.done():
+                future.set_result(None)
+        auth_log.audit('auth.students_authorized', count=len(batch))
+
+
+def authorize_students(db, usernames):
+    db.query(NativeUserInfo).filter(
+        NativeUserInfo.username.in_(usernames)
+    ).update({NativeUserInfo.is_authorized: True}, synchronize_session=False)
+
+
+def expire_authorizations(db, usernames):
+    """Expire is_authorized of UserInfo rows the hub session already loaded"""
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, NativeUserInfo) and inspect(obj).dict.get('username') in usernames:
+            db.expire(obj, ['is_authorized'])
+
+
+authorization_batcher = AuthorizationBatcher()
 
 
 async def student_post_auth_hook(authenticator, handler, authentication):
-    """Auto-authorize students with @stud.acs.pub.ro emails"""
+    """Auto-authorize students with an email in STUDENT_EMAIL_DOMAINS"""
     if authentication is None:
         return None
-    
+
     username = authentication['name']
-    
-    if username in ['admin', 'prof_smith', 'prof_jones', 'prof_doe']:
+
+    if username in PROTECTED_USERS or username in authorization_batcher.authorized:
+        return authentication
+
+    row = (
+        handler.db.query(NativeUserInfo.email, NativeUserInfo.is_authorized)
+        .filter(NativeUserInfo.username == username)
+        .first()
+    )
+    if row is None:
         return authentication
-    
-    user_info = handler.db.query(NativeUserInfo).filter_by(username=username).first()
-    
-    if user_info and user_info.email:
-        if user_info.email.endswith('@stud.acs.pub.ro'):
-            if not user_info.is_authorized:
-                user_info.is_authorized = True
-                handler.db.commit()
-                print(f"Auto-authorized student: {username}")
-    
+
+    email, is_authorized = row
+    if is_authorized:
+        authorization_batcher.authorized.add(username)
+    elif email and student_email_re.search(email):
+        await authorization_batcher.authorize(handler.db, username)
+
     return authentication
 
 
-def configure_auth_hook(c):
+def configure_auth_hook(c, email_domains=None):
     """Configure the post-authentication hook"""
+    global student_email_re
+    if email_domains is not None:
+        student_email_re = compile_email_domains(email_domains)
     c.NativeAuthenticator.post_auth_hook = student_post_auth_hook
     print("✓ Student auto-authorization hook configured")
-
-
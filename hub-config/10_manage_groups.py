@@ -1,11 +1,166 @@
 """Custom groups management page"""
 from jupyterhub.handlers import BaseHandler
 from jupyterhub import orm
+from sqlalchemy import and_, literal
 from tornado import web
+from collections import namedtuple
 import json
 
 
-class ManageGroupsHandler(BaseHandler):
+MembershipChanges = namedtuple(
+    'MembershipChanges',
+    ['added', 'removed', 'moved', 'changed_user_ids', 'changed_group_ids'],
+)
+
+# Stay well below SQLite's limit on bound parameters per statement
+IN_CHUNK_SIZE = 500
+
+# Users per page in the edit modal
+USER_PAGE_SIZE = 50
+
+groups_log = get_logger('groups')
+
+# Protected users (teachers and admins) are never listed or edited here
+PROTECTED_USERS = {'admin', 'prof_smith', 'prof_jones', 'prof_doe'}
+
+
+def _chunks(values, size=IN_CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def find_user_ids(db, names):
+    """Map user names to ids with IN queries; unknown names are skipped"""
+    found = {}
+    for chunk in _chunks(names):
+        found.update(db.query(orm.User.name, orm.User.id).filter(orm.User.name.in_(chunk)))
+    return found
+
+
+def change_group_members(db, group_id, add_ids=(), remove_ids=(), exclusive_prefix=None):
+    """Add and remove group members with set operations on user_group_map.
+
+    Issues one bulk INSERT for ids that are not members yet and one bulk
+    DELETE for removed ids. With `exclusive_prefix`, added members are first
+    removed from every other group whose name starts with it, in one DELETE.
+    Does not commit, so the caller controls the transaction.
+    """
+    membership = orm.user_group_map
+    add_ids = set(add_ids)
+    remove_ids = set(remove_ids) - add_ids
+
+    existing_ids = set()
+    for chunk in _chunks(add_ids):
+        existing_ids.update(
+            user_id for (user_id,) in
+            db.query(membership.c.user_id).filter(
+                membership.c.group_id == group_id,
+                membership.c.user_id.in_(chunk),
+            )
+        )
+    to_add = add_ids - existing_ids
+
+    moved = 0
+    changed_group_ids = {group_id}
+    if exclusive_prefix and to_add:
+        other_groups = [
+            other_id for (other_id,) in
+            db.query(orm.Group.id).filter(
+                orm.Group.name.like(f'{exclusive_prefix}%'),
+                orm.Group.id != group_id,
+            )
+        ]
+        if other_groups:
+            changed_group_ids.update(other_groups)
+            for chunk in _chunks(to_add):
+                moved += db.execute(
+                    membership.delete().where(
+                        membership.c.group_id.in_(other_groups),
+                        membership.c.user_id.in_(chunk),
+                    )
+                ).rowcount
+
+    removed = 0
+    for chunk in _chunks(remove_ids):
+        removed += db.execute(
+            membership.delete().where(
+                membership.c.group_id == group_id,
+                membership.c.user_id.in_(chunk),
+            )
+        ).rowcount
+    if to_add:
+        db.execute(
+            membership.insert(),
+            [{'user_id': user_id, 'group_id': group_id} for user_id in to_add],
+        )
+
+    return MembershipChanges(
+        added=len(to_add),
+        removed=removed,
+        moved=moved,
+        changed_user_ids=to_add | remove_ids,
+        changed_group_ids=changed_group_ids,
+    )
+
+
+def replace_group_members(db, group_id, member_ids, exclusive_prefix=None, protected_ids=()):
+    """Set a group's members to exactly `member_ids`, diffed against the current rows.
+
+    Current members in `protected_ids` are kept even when not listed.
+    """
+    membership = orm.user_group_map
+    member_ids = set(member_ids)
+    current_ids = {
+        user_id for (user_id,) in
+        db.query(membership.c.user_id).filter(membership.c.group_id == group_id)
+    }
+    return change_group_members(
+        db, group_id,
+        add_ids=member_ids - current_ids,
+        remove_ids=current_ids - member_ids - set(protected_ids),
+        exclusive_prefix=exclusive_prefix,
+    )
+
+
+def reassign_running_servers(db, class_name, changes, added_names):
+    """Move running servers in server_index after a class's members changed.
+
+    `added_names` maps the ids added to the class to their names; changed
+    ids not in it were removed from the class, which leaves them in no
+    class. Dashboards of both classes are notified through server_index.
+    """
+    removed_ids = changes.changed_user_ids - added_names.keys()
+    running = server_index.class_running(db, class_name)
+    if removed_ids and running:
+        for chunk in _chunks(removed_ids):
+            for (name,) in db.query(orm.User.name).filter(orm.User.id.in_(chunk)):
+                if name in running:
+                    server_index.reassign(name, None)
+    for name in added_names.values():
+        server_index.reassign(name, class_name)
+
+
+def load_user_page(db, exclude=(), group_id=None, members_only=False, after=None, prefix=None, limit=50):
+    """One keyset page of user names, with membership flags for `group_id`"""
+    membership = orm.user_group_map
+    if group_id is None:
+        query = db.query(orm.User.name, literal(False))
+    else:
+        query = db.query(orm.User.name, membership.c.user_id.isnot(None)).outerjoin(
+            membership,
+            and_(membership.c.user_id == orm.User.id, membership.c.group_id == group_id),
+        )
+        if members_only:
+            query = query.filter(membership.c.user_id.isnot(None))
+
+    query = query.filter(*name_filters(orm.User.name, after, prefix))
+    if exclude:
+        query = query.filter(orm.User.name.notin_(list(exclude)))
+    return [(name, bool(is_member)) for name, is_member in query.order_by(orm.User.name).limit(limit)]
+
+
+class ManageGroupsHandler(InstrumentedHandler, BaseHandler):
     """Custom group management interface"""
     
     @web.authenticated
@@ -18,422 +173,24 @@ class ManageGroupsHandler(BaseHandler):
             self.write("<h1>Access Denied</h1><p>This page is for administrators only.</p>")
             return
         
-        # Get all groups and users
-        all_groups = self.db.query(orm.Group).order_by(orm.Group.name).all()
-        all_users = self.db.query(orm.User).order_by(orm.User.name).all()
-        
-        # Define protected users (teachers and admins)
-        protected_users = {'admin', 'prof_smith', 'prof_jones', 'prof_doe'}
-        
-        # Build groups list
-        groups_html = ""
-        for group in all_groups:
-            if group.name in ['admins', 'teachers'] or group.name.startswith('teacher-prof-'):
-                member_names = sorted([u.name for u in group.users])
-                members_list = ', '.join(member_names) if member_names else '<em style="color: #999;">No members</em>'
-                
-                # For prof groups, separate prof from students for JSON
-                if group.name.startswith('teacher-prof-'):
-                    # Only send student names to modal (excluding the prof)
-                    student_names = [name for name in member_names if name not in protected_users]
-                    members_json = json.dumps(student_names)
-                else:
-                    members_json = json.dumps(member_names)
-                
-                # Display name for UI
-                display_name = group.name.replace('teacher-prof-', 'Prof. ').replace('-', ' ').title()
-                
-                # Check if group is editable
-                is_editable = group.name not in ['admins', 'teachers']
-                
-                if is_editable:
-                    # Extract prof name for this specific group
-                    prof_username = group.name.replace('teacher-', '').replace('-', '_') if group.name.startswith('teacher-prof-') else ''
-                    edit_button = f'<button class="btn-action" onclick=\'showEditModal("{group.name}", "{display_name}", {members_json}, "{prof_username}")\'>Edit Members</button>'
-                else:
-                    edit_button = '<button class="btn-action" disabled style="opacity: 0.5; cursor: not-allowed;">Protected Group</button>'
-                
-                groups_html += f"""
-                <div class="group-card" data-group="{group.name}">
-                    <div class="group-header">
-                        <h4>{display_name}</h4>
-                        <span class="member-count">{len(group.users)} members</span>
-                    </div>
-                    <div class="group-body">
-                        <p class="members-list">{members_list}</p>
-                        <div class="group-actions">
-                            {edit_button}
-                        </div>
-                    </div>
-                </div>
-                """
+        # Group cards only need counts and the first few member names
+        stats = await hub_reader.run(
+            self.db, load_hub_stats, PROTECTED_USERS, preview_size=10,
+            active_servers=server_index.running_count(self.db),
+        )
         
-        # Build all users list for the modal - ONLY students (exclude protected users)
-        students_only = [{"name": u.name} for u in all_users if u.name not in protected_users]
-        all_users_json = json.dumps(students_only)
+        groups = []
+        for group in sorted(stats.groups, key=lambda g: g.name):
+            groups.append({
+                'name': group.name,
+                'member_count': group.member_count,
+                'member_names': group.member_names,
+                # e.g. "teacher-prof-smith" -> "prof_smith"
+                'prof_username': group.name.replace('teacher-', '').replace('-', '_') if group.name.startswith('teacher-prof-') else '',
+                'is_editable': group.name not in ['admins', 'teachers'],
+            })
         
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Manage Groups</title>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1">
-            <link rel="stylesheet" href="/hub/static/css/style.min.css" type="text/css" />
-            <style>
-                body {{
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    min-height: 100vh;
-                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
-                }}
-                .page-title {{
-                    text-align: center;
-                    margin: 40px 0 12px;
-                    color: #fff;
-                    font-size: 2.8em;
-                    font-weight: 800;
-                    text-shadow: 0 4px 20px rgba(0,0,0,0.3);
-                }}
-                .page-subtitle {{
-                    text-align: center;
-                    margin-bottom: 32px;
-                    color: rgba(255, 255, 255, 0.92);
-                    font-size: 1.15em;
-                }}
-                .groups-grid {{
-                    display: grid;
-                    grid-template-columns: repeat(auto-fill, minmax(350px, 1fr));
-                    gap: 20px;
-                    margin-bottom: 30px;
-                }}
-                .group-card {{
-                    background: linear-gradient(145deg, #ffffff 0%, #f8f9fa 100%);
-                    border-radius: 16px;
-                    padding: 24px;
-                    box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-                    border: 1px solid rgba(255,255,255,0.2);
-                    transition: transform 0.3s ease;
-                }}
-                .group-card:hover {{
-                    transform: translateY(-4px);
-                }}
-                .group-header {{
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    margin-bottom: 16px;
-                    padding-bottom: 16px;
-                    border-bottom: 2px solid #e0e0e0;
-                }}
-                .group-header h4 {{
-                    margin: 0;
-                    color: #667eea;
-                    font-size: 1.3em;
-                }}
-                .member-count {{
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: white;
-                    padding: 6px 12px;
-                    border-radius: 20px;
-                    font-size: 13px;
-                    font-weight: 600;
-                }}
-                .members-list {{
-                    color: #555;
-                    font-size: 14px;
-                    line-height: 1.6;
-                    margin-bottom: 16px;
-                    min-height: 40px;
-                }}
-                .btn-action {{
-                    width: 100%;
-                    padding: 12px 24px;
-                    font-size: 14px;
-                    font-weight: 600;
-                    border-radius: 10px;
-                    border: none;
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: #fff;
-                    cursor: pointer;
-                    transition: all 0.3s ease;
-                    text-transform: uppercase;
-                    letter-spacing: 0.5px;
-                }}
-                .btn-action:hover {{
-                    transform: translateY(-2px);
-                    box-shadow: 0 6px 20px rgba(102, 126, 234, 0.4);
-                }}
-                .button-row {{
-                    text-align: center;
-                    margin-top: 30px;
-                }}
-                .btn {{
-                    padding: 14px 28px;
-                    font-size: 15px;
-                    font-weight: 600;
-                    border-radius: 12px;
-                    border: none;
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: #fff;
-                    text-decoration: none;
-                    display: inline-block;
-                    transition: all 0.3s ease;
-                    text-transform: uppercase;
-                    letter-spacing: 0.5px;
-                }}
-                .btn:hover {{
-                    transform: translateY(-2px);
-                    box-shadow: 0 8px 25px rgba(102, 126, 234, 0.5);
-                    color: #fff;
-                    text-decoration: none;
-                }}
-                
-                /* Modal styles */
-                .modal {{
-                    display: none;
-                    position: fixed;
-                    z-index: 1000;
-                    left: 0;
-                    top: 0;
-                    width: 100%;
-                    height: 100%;
-                    background: rgba(0, 0, 0, 0.6);
-                    backdrop-filter: blur(5px);
-                }}
-                .modal-content {{
-                    background: linear-gradient(145deg, #ffffff 0%, #f8f9fa 100%);
-                    margin: 5% auto;
-                    padding: 32px;
-                    border-radius: 20px;
-                    width: 90%;
-                    max-width: 600px;
-                    box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-                }}
-                .modal-header {{
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    margin-bottom: 24px;
-                }}
-                .modal-header h3 {{
-                    margin: 0;
-                    color: #667eea;
-                    font-size: 1.8em;
-                }}
-                .close {{
-                    font-size: 32px;
-                    font-weight: bold;
-                    color: #999;
-                    cursor: pointer;
-                    transition: color 0.3s;
-                }}
-                .close:hover {{
-                    color: #667eea;
-                }}
-                .user-list {{
-                    max-height: 400px;
-                    overflow-y: auto;
-                    margin-bottom: 20px;
-                    border: 2px solid #e0e0e0;
-                    border-radius: 12px;
-                    padding: 16px;
-                }}
-                .user-item {{
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    padding: 12px;
-                    margin-bottom: 8px;
-                    background: #fff;
-                    border-radius: 8px;
-                    transition: all 0.2s;
-                }}
-                .user-item:hover {{
-                    background: rgba(102, 126, 234, 0.05);
-                }}
-                .user-item input[type="checkbox"] {{
-                    width: 20px;
-                    height: 20px;
-                    cursor: pointer;
-                }}
-                .modal-actions {{
-                    display: flex;
-                    gap: 12px;
-                    justify-content: flex-end;
-                }}
-                .btn-save {{
-                    padding: 12px 24px;
-                    font-size: 14px;
-                    font-weight: 600;
-                    border-radius: 10px;
-                    border: none;
-                    background: linear-gradient(135deg, #28a745 0%, #20c997 100%);
-                    color: #fff;
-                    cursor: pointer;
-                    transition: all 0.3s ease;
-                }}
-                .btn-save:hover {{
-                    transform: translateY(-2px);
-                    box-shadow: 0 6px 20px rgba(40, 167, 69, 0.4);
-                }}
-                .btn-cancel {{
-                    padding: 12px 24px;
-                    font-size: 14px;
-                    font-weight: 600;
-                    border-radius: 10px;
-                    border: 2px solid #667eea;
-                    background: transparent;
-                    color: #667eea;
-                    cursor: pointer;
-                    transition: all 0.3s ease;
-                }}
-                .btn-cancel:hover {{
-                    background: #667eea;
-                    color: #fff;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1 class="page-title">Manage Groups</h1>
-                <p class="page-subtitle">Add or remove users from groups</p>
-                
-                <div class="groups-grid">
-                    {groups_html}
-                </div>
-                
-                <div class="button-row">
-                    <a class="btn" href="/hub/admin-panel">Back to Admin Panel</a>
-                </div>
-            </div>
-            
-            <!-- Edit Modal -->
-            <div id="editModal" class="modal">
-                <div class="modal-content">
-                    <div class="modal-header">
-                        <h3 id="modalGroupName">Edit Group</h3>
-                        <span class="close" onclick="closeModal()">&times;</span>
-                    </div>
-                    <div class="user-list" id="userList"></div>
-                    <div class="modal-actions">
-                        <button class="btn-cancel" onclick="closeModal()">Cancel</button>
-                        <button class="btn-save" onclick="saveChanges()">Save Changes</button>
-                    </div>
-                </div>
-            </div>
-            
-            <script>
-                const allUsers = {all_users_json};
-                let currentGroup = '';
-                let currentMembers = [];
-                let currentProfessor = '';
-                
-                function showEditModal(groupName, displayName, members, profUsername) {{
-                    currentGroup = groupName;  // Store actual group name (e.g., "teacher-prof-smith")
-                    currentMembers = members;
-                    currentProfessor = profUsername || '';
-                    
-                    document.getElementById('modalGroupName').textContent = 'Edit Group: ' + displayName;
-                    
-                    const userList = document.getElementById('userList');
-                    userList.innerHTML = '';
-                    
-                    // If there's a professor, show them as permanent member
-                    if (currentProfessor) {{
-                        const profItem = document.createElement('div');
-                        profItem.className = 'user-item';
-                        profItem.style.background = 'rgba(102, 126, 234, 0.1)';
-                        profItem.style.borderLeft = '4px solid #667eea';
-                        profItem.innerHTML = `
-                            <label style="display: flex; align-items: center; gap: 10px; width: 100%;">
-                                <input type="checkbox" checked disabled style="opacity: 0.5;">
-                                <span style="font-weight: 600; color: #667eea;">${{currentProfessor}} (Group Owner - Permanent)</span>
-                            </label>
-                        `;
-                        userList.appendChild(profItem);
-                        
-                        // Add separator
-                        const separator = document.createElement('div');
-                        separator.style.borderTop = '2px solid #e0e0e0';
-                        separator.style.margin = '12px 0';
-                        userList.appendChild(separator);
-                    }}
-                    
-                    // Show student users
-                    allUsers.forEach(user => {{
-                        const isChecked = members.includes(user.name);
-                        const item = document.createElement('div');
-                        item.className = 'user-item';
-                        item.innerHTML = `
-                            <label style="display: flex; align-items: center; gap: 10px; cursor: pointer; width: 100%;">
-                                <input type="checkbox" value="${{user.name}}" ${{isChecked ? 'checked' : ''}}>
-                                <span style="font-weight: 500;">${{user.name}}</span>
-                            </label>
-                        `;
-                        userList.appendChild(item);
-                    }});
-                    
-                    document.getElementById('editModal').style.display = 'block';
-                }}
-                
-                function closeModal() {{
-                    document.getElementById('editModal').style.display = 'none';
-                }}
-                
-                async function saveChanges() {{
-                    const checkboxes = document.querySelectorAll('#userList input[type="checkbox"]:not([disabled])');
-                    const selectedUsers = Array.from(checkboxes)
-                        .filter(cb => cb.checked)
-                        .map(cb => cb.value);
-                    
-                    console.log('Saving group:', currentGroup, 'with users:', selectedUsers);
-                    
-                    const xsrfToken = getCookie('_xsrf');
-                    console.log('XSRF token:', xsrfToken);
-                    
-                    try {{
-                        const response = await fetch('/hub/manage-groups', {{
-                            method: 'POST',
-                            headers: {{
-                                'Content-Type': 'application/json',
-                                'X-XSRFToken': xsrfToken
-                            }},
-                            body: JSON.stringify({{
-                                group: currentGroup,
-                                users: selectedUsers
-                            }})
-                        }});
-                        
-                        if (response.ok) {{
-                            window.location.reload();
-                        }} else {{
-                            const error = await response.text();
-                            console.error('Error response:', error);
-                            alert('Failed to save changes: ' + response.status + ' - ' + error);
-                        }}
-                    }} catch (error) {{
-                        console.error('Error:', error);
-                        alert('Error saving changes: ' + error);
-                    }}
-                }}
-                
-                function getCookie(name) {{
-                    const value = `; ${{document.cookie}}`;
-                    const parts = value.split(`; ${{name}}=`);
-                    if (parts.length === 2) return parts.pop().split(';').shift();
-                }}
-                
-                // Close modal when clicking outside
-                window.onclick = function(event) {{
-                    const modal = document.getElementById('editModal');
-                    if (event.target == modal) {{
-                        closeModal();
-                    }}
-                }}
-            </script>
-        </body>
-        </html>
-        """
+        html = render_page('manage-groups.html', groups=groups, page_size=USER_PAGE_SIZE)
         self.finish(html)
     
     @web.authenticated
@@ -446,12 +203,18 @@ class ManageGroupsHandler(BaseHandler):
             self.write({"error": "Access denied"})
             return
         
-        import json
         data = json.loads(self.request.body.decode('utf-8'))
         group_name = data.get('group')
-        user_names = data.get('users', [])
         
-        self.log.info(f"Updating group {group_name} with users: {user_names}")
+        # Either a full member list ("users") or a delta ("add" / "remove")
+        replace_members = 'users' in data
+        add_names = set(data.get('users', [])) if replace_members else set(data.get('add', []))
+        remove_names = set() if replace_members else set(data.get('remove', []))
+        
+        groups_log.debug(
+            'groups.update_requested', admin=user.name, group=group_name,
+            replace=replace_members, add=len(add_names), remove=len(remove_names),
+        )
         
         # Validate: cannot edit protected groups
         if group_name in ['admins', 'teachers']:
@@ -466,60 +229,104 @@ class ManageGroupsHandler(BaseHandler):
             self.write({"error": f"Group '{group_name}' not found"})
             return
         
-        # Define protected users (teachers and admins)
-        protected_users = {'admin', 'prof_smith', 'prof_jones', 'prof_doe'}
-        
         # Validate: prof groups can only contain students (no teachers or admins)
         if group_name.startswith('teacher-prof-'):
-            invalid_users = [name for name in user_names if name in protected_users]
+            invalid_users = sorted(name for name in add_names if name in PROTECTED_USERS)
             if invalid_users:
                 self.set_status(400)
                 self.write({"error": f"Cannot add teachers or admins to class groups. Invalid users: {', '.join(invalid_users)}"})
                 return
         
-        # Get all users to add (only non-protected users)
-        users_to_add = []
-        for username in user_names:
-            u = self.db.query(orm.User).filter_by(name=username).first()
-            if u and username not in protected_users:
-                users_to_add.append(u)
+        # Never add or remove protected users (teachers and admins) here
+        add_names -= PROTECTED_USERS
+        remove_names -= PROTECTED_USERS
         
-        # For prof groups: enforce that students can only be in ONE prof group
+        # For prof groups, the professor always stays in their own group
+        # e.g. "teacher-prof-smith" -> "prof_smith"
+        prof_name = None
         if group_name.startswith('teacher-prof-'):
-            # Get all other prof groups
-            all_prof_groups = self.db.query(orm.Group).filter(
-                orm.Group.name.like('teacher-prof-%'),
-                orm.Group.name != group_name
-            ).all()
-            
-            # Remove students from other prof groups
-            for student in users_to_add:
-                for other_group in all_prof_groups:
-                    if student in other_group.users:
-                        other_group.users.remove(student)
-                        self.log.info(f"Removed {student.name} from {other_group.name} (moving to {group_name})")
-            
-            # Extract prof name from group name (e.g., "teacher-prof-smith" -> "prof_smith")
             prof_name = group_name.replace('teacher-', '').replace('-', '_')
-            prof_user = self.db.query(orm.User).filter_by(name=prof_name).first()
-            if prof_user and prof_user not in users_to_add:
-                users_to_add.append(prof_user)
-                self.log.info(f"Keeping {prof_name} in their own group {group_name}")
+            add_names.add(prof_name)
         
-        # Update group membership
-        group.users = users_to_add
-        self.db.commit()
+        # Resolve all names with IN queries; a full member list also needs the
+        # protected users, so that replacing it keeps them in the group
+        protected_names = PROTECTED_USERS if replace_members else set()
+        user_ids = find_user_ids(self.db, add_names | remove_names | protected_names)
+        add_ids = {user_ids[name] for name in add_names if name in user_ids}
+        remove_ids = {user_ids[name] for name in remove_names if name in user_ids}
+        
+        # For prof groups: enforce that students can only be in ONE prof group
+        exclusive_prefix = 'teacher-prof-' if group_name.startswith('teacher-prof-') else None
+        if replace_members:
+            protected_ids = {user_ids[name] for name in protected_names if name in user_ids}
+            changes = await hub_writer.submit(
+                self.db, replace_group_members, group.id, add_ids, exclusive_prefix, protected_ids,
+            )
+        else:
+            changes = await hub_writer.submit(
+                self.db, change_group_members, group.id, add_ids, remove_ids, exclusive_prefix,
+            )
         
-        self.log.info(f"Successfully updated group {group_name}")
+        expire_memberships(self.db, changes.changed_user_ids, changes.changed_group_ids)
+        role_cache.invalidate(*changes.changed_user_ids)
+        if exclusive_prefix and changes.changed_user_ids:
+            # Class moves change which class a running server counts toward
+            reassign_running_servers(self.db, group_name, changes, {
+                user_id: name for name, user_id in user_ids.items() if user_id in add_ids
+            })
+        if exclusive_prefix:
+            record_enrollment('manage-groups', 'enrolled', changes.added - changes.moved)
+            record_enrollment('manage-groups', 'moved', changes.moved)
+            record_enrollment('manage-groups', 'removed', changes.removed)
+        
+        groups_log.audit(
+            'groups.updated', admin=user.name, group=group_name,
+            added=changes.added, removed=changes.removed, moved=changes.moved,
+        )
         self.set_header('Content-Type', 'application/json')
         self.write(json.dumps({"status": "success"}))
         self.finish()
 
 
+
+class ManageGroupsUsersHandler(InstrumentedHandler, BaseHandler):
+    """JSON list of students for the edit modal, with keyset pagination and search"""
+    
+    @web.authenticated
+    async def get(self):
+        """GET /hub/manage-groups/users?group=<name>&members=1&after=<name>&q=<prefix>&limit=<n>"""
+        if not self.current_user.admin:
+            raise web.HTTPError(403, "This page is for administrators only")
+        
+        group_id = None
+        group_name = self.get_argument('group', None)
+        if group_name:
+            group_id = self.db.query(orm.Group.id).filter_by(name=group_name).scalar()
+            if group_id is None:
+                raise web.HTTPError(404, f"Group '{group_name}' not found")
+        
+        limit = page_limit(self.get_argument('limit', None), USER_PAGE_SIZE)
+        rows = load_user_page(
+            self.db,
+            exclude=PROTECTED_USERS,
+            group_id=group_id,
+            members_only=self.get_argument('members', '') == '1',
+            after=self.get_argument('after', None),
+            prefix=self.get_argument('q', None),
+            limit=limit + 1,
+        )
+        
+        self.set_header('Content-Type', 'application/json')
+        self.finish({
+            'users': [{'name': name, 'member': is_member} for name, is_member in rows[:limit]],
+            'next': rows[limit - 1][0] if len(rows) > limit else None,
+        })
+
 def register_handler(c):
     """Register the manage groups handler"""
     if not hasattr(c.JupyterHub, 'extra_handlers') or c.JupyterHub.extra_handlers is None:
         c.JupyterHub.extra_handlers = []
     
     c.JupyterHub.extra_handlers.append((r'/manage-groups', ManageGroupsHandler))
+    c.JupyterHub.extra_handlers.append((r'/manage-groups/users', ManageGroupsUsersHandler))
     print("✓ Custom groups management available at: /hub/manage-groups")
@@ -0,0 +1,160 @@
+let currentGroup = '';
+let currentProfessor = '';
+let userQuery = '';
+let nextAfter = null;
+let searchTimer = null;
+
+// Pending changes relative to the saved membership, keyed by user name
+const addedUsers = new Set();
+const removedUsers = new Set();
+
+function showEditModal(groupName, displayName, profUsername) {
+    currentGroup = groupName;  // Store actual group name (e.g., "teacher-prof-smith")
+    currentProfessor = profUsername || '';
+    addedUsers.clear();
+    removedUsers.clear();
+    userQuery = '';
+    document.getElementById('userSearch').value = '';
+
+    document.getElementById('modalGroupName').textContent = 'Edit Group: ' + displayName;
+
+    const userList = document.getElementById('userList');
+    userList.innerHTML = '';
+
+    // If there's a professor, show them as permanent member
+    if (currentProfessor) {
+        const profItem = document.createElement('div');
+        profItem.className = 'user-item';
+        profItem.style.background = 'rgba(102, 126, 234, 0.1)';
+        profItem.style.borderLeft = '4px solid #667eea';
+        profItem.innerHTML = `
+            <label style="display: flex; align-items: center; gap: 10px; width: 100%;">
+                <input type="checkbox" checked disabled style="opacity: 0.5;">
+                <span style="font-weight: 600; color: #667eea;"></span>
+            </label>
+        `;
+        profItem.querySelector('span').textContent = currentProfessor + ' (Group Owner - Permanent)';
+        userList.appendChild(profItem);
+
+        // Add separator
+        const separator = document.createElement('div');
+        separator.style.borderTop = '2px solid #e0e0e0';
+        separator.style.margin = '12px 0';
+        userList.appendChild(separator);
+    }
+
+    const studentItems = document.createElement('div');
+    studentItems.id = 'studentItems';
+    userList.appendChild(studentItems);
+
+    document.getElementById('editModal').style.display = 'block';
+    loadUsers(null, true);
+}
+
+function userItem(user) {
+    const isChecked = addedUsers.has(user.name) || (user.member && !removedUsers.has(user.name));
+    const item = document.createElement('div');
+    item.className = 'user-item';
+    item.innerHTML = `
+        <label style="display: flex; align-items: center; gap: 10px; cursor: pointer; width: 100%;">
+            <input type="checkbox">
+            <span style="font-weight: 500;"></span>
+        </label>
+    `;
+    const checkbox = item.querySelector('input');
+    checkbox.value = user.name;
+    checkbox.checked = isChecked;
+    checkbox.addEventListener('change', () => {
+        if (checkbox.checked) {
+            removedUsers.delete(user.name);
+            if (!user.member) addedUsers.add(user.name);
+        } else {
+            addedUsers.delete(user.name);
+            if (user.member) removedUsers.add(user.name);
+        }
+    });
+    item.querySelector('span').textContent = user.name;
+    return item;
+}
+
+async function loadUsers(after, replace) {
+    const params = new URLSearchParams({group: currentGroup, limit: userPageSize});
+    if (after) params.set('after', after);
+    if (userQuery) params.set('q', userQuery);
+
+    const response = await fetch('/hub/manage-groups/users?' + params.toString(), {credentials: 'same-origin'});
+    if (!response.ok) {
+        console.error('Failed to load users:', response.status);
+        return;
+    }
+    const page = await response.json();
+
+    const studentItems = document.getElementById('studentItems');
+    if (replace) studentItems.innerHTML = '';
+    page.users.forEach(user => studentItems.appendChild(userItem(user)));
+
+    nextAfter = page.next;
+    document.getElementById('loadMoreUsers').style.display = nextAfter ? '' : 'none';
+}
+
+document.getElementById('loadMoreUsers').addEventListener('click', () => loadUsers(nextAfter, false));
+
+document.getElementById('userSearch').addEventListener('input', event => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => {
+        userQuery = event.target.value.trim();
+        loadUsers(null, true);
+    }, 250);
+});
+
+function closeModal() {
+    document.getElementById('editModal').style.display = 'none';
+}
+
+async function saveChanges() {
+    const changes = {
+        group: currentGroup,
+        add: Array.from(addedUsers),
+        remove: Array.from(removedUsers)
+    };
+
+    console.log('Saving group:', currentGroup, 'adding', changes.add.length, 'removing', changes.remove.length);
+
+    const xsrfToken = getCookie('_xsrf');
+
+    try {
+        const response = await fetch('/hub/manage-groups', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-XSRFToken': xsrfToken
+            },
+            body: JSON.stringify(changes)
+        });
+
+        if (response.ok) {
+            window.location.reload();
+        } else {
+            const error = await response.text();
+            console.error('Error response:', error);
+            alert('Failed to save changes: ' + response.status + ' - ' + error);
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        alert('Error saving changes: ' + error);
+    }
+}
+
+function getCookie(name) {
+    const value = `; ${document.cookie}`;
+    const parts = value.split(`; ${name}=`);
+    if (parts.length === 2) return parts.pop().split(';').shift();
+}
+
+// Close modal when clicking outside
+window.onclick = function(event) {
+    const modal = document.getElementById('editModal');
+    if (event.target == modal) {
+        closeModal();
+    }
+}
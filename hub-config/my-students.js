@@ -0,0 +1,107 @@
+// Teacher roster: fetches further pages and search results from /hub/my-students/roster,
+// and follows server starts/stops live from /hub/my-students/events
+const rosterRows = document.getElementById('rosterRows');
+const loadMoreButton = document.getElementById('loadMore');
+const rosterSearch = document.getElementById('rosterSearch');
+let rosterQuery = '';
+let searchTimer = null;
+// Names with a running server, once the live status stream has sent its snapshot
+let activeStudents = null;
+
+function setBadge(badge, active) {
+    badge.className = active ? 'status-active' : 'status-offline';
+    badge.textContent = active ? 'Active' : 'Offline';
+}
+
+function rosterRow(student) {
+    const row = document.createElement('tr');
+    row.dataset.name = student.name;
+
+    const name = document.createElement('td');
+    name.textContent = student.name;
+    row.appendChild(name);
+
+    const status = document.createElement('td');
+    const badge = document.createElement('span');
+    setBadge(badge, activeStudents ? activeStudents.has(student.name) : student.active);
+    status.appendChild(badge);
+    row.appendChild(status);
+
+    const activity = document.createElement('td');
+    activity.textContent = student.last_activity;
+    row.appendChild(activity);
+
+    const actions = document.createElement('td');
+    const connect = document.createElement('a');
+    connect.href = '/user/' + encodeURIComponent(student.name) + '/';
+    connect.target = '_blank';
+    connect.className = 'btn btn-xs btn-connect';
+    connect.textContent = 'Connect';
+    actions.appendChild(connect);
+    row.appendChild(actions);
+
+    return row;
+}
+
+async function loadRoster(after, replace) {
+    const params = new URLSearchParams({limit: rosterPageSize});
+    if (after) params.set('after', after);
+    if (rosterQuery) params.set('q', rosterQuery);
+
+    const response = await fetch('/hub/my-students/roster?' + params.toString(), {credentials: 'same-origin'});
+    if (!response.ok) {
+        console.error('Failed to load roster:', response.status);
+        return;
+    }
+    const page = await response.json();
+
+    if (replace) rosterRows.innerHTML = '';
+    page.students.forEach(student => rosterRows.appendChild(rosterRow(student)));
+    if (replace && page.students.length === 0) {
+        rosterRows.innerHTML = '<tr><td colspan="4" class="empty-roster">No matching students</td></tr>';
+    }
+
+    loadMoreButton.dataset.next = page.next || '';
+    loadMoreButton.style.display = page.next ? '' : 'none';
+}
+
+loadMoreButton.addEventListener('click', () => loadRoster(loadMoreButton.dataset.next, false));
+
+rosterSearch.addEventListener('input', () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => {
+        rosterQuery = rosterSearch.value.trim();
+        loadRoster(null, true);
+    }, 250);
+});
+
+function showStatus(name, active) {
+    const row = rosterRows.querySelector('tr[data-name="' + CSS.escape(name) + '"]');
+    if (row) setBadge(row.querySelector('td:nth-child(2) span'), active);
+}
+
+if (window.EventSource) {
+    const events = new EventSource('/hub/my-students/events');
+
+    events.addEventListener('snapshot', event => {
+        const snapshot = JSON.parse(event.data);
+        activeStudents = new Set(snapshot.active);
+        document.getElementById('totalCount').textContent = snapshot.total;
+        document.getElementById('activeCount').textContent = activeStudents.size;
+        rosterRows.querySelectorAll('tr[data-name]').forEach(row => {
+            showStatus(row.dataset.name, activeStudents.has(row.dataset.name));
+        });
+    });
+
+    events.addEventListener('status', event => {
+        const change = JSON.parse(event.data);
+        if (!activeStudents) return;
+        if (change.active) {
+            activeStudents.add(change.name);
+        } else {
+            activeStudents.delete(change.name);
+        }
+        document.getElementById('activeCount').textContent = activeStudents.size;
+        showStatus(change.name, change.active);
+    });
+}
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Bulk import of students from a CSV roster
+Creates pre-authorized accounts in the JupyterHub and NativeAuthenticator
+databases and enrolls each student in a class
+MUST BE RUN INSIDE THE HUB POD
+
+CSV columns: username,email,password,class
+  class is a class group (teacher-prof-smith) or its profile (prof-smith-class)
+Rows whose username already has NativeAuthenticator credentials are skipped.
+
+Usage: python3 import_students.py roster.csv [--batch-size 1000] [--workers N] [--bcrypt-rounds 12]
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from sqlalchemy import insert
+from nativeauthenticator.orm import UserInfo
+from jupyterhub import orm
+from provisioning import BCRYPT_ROUNDS, EMAIL_PATTERN, credential_row, hash_passwords, open_session
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+
+
+EMAIL_RE = re.compile(EMAIL_PATTERN)
+
+
+def read_rows(path):
+    """Stream normalized roster rows from the CSV file"""
+    with open(path, newline='', encoding='utf-8') as f:
+        for line_no, row in enumerate(csv.DictReader(f), start=2):
+            yield line_no, {
+                'username': (row.get('username') or '').strip().lower(),
+                'email': (row.get('email') or '').strip(),
+                'password': row.get('password') or '',
+                'class': (row.get('class') or '').strip(),
+            }
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def load_class_groups(session):
+    """{class name or profile slug: group id} for the teacher-prof-* groups"""
+    classes = {}
+    for group_id, name in session.query(orm.Group.id, orm.Group.name).filter(orm.Group.name.like('teacher-prof-%')):
+        classes[name] = group_id
+        classes[name[len('teacher-'):] + '-class'] = group_id
+    return classes
+
+
+def import_batch(session, pool, rows, classes, stats, rounds=BCRYPT_ROUNDS):
+    """Create the users of one batch in a single transaction"""
+    valid = {}
+    for line_no, row in rows:
+        if not row['username'] or not row['password']:
+            print(f"  ⚠ line {line_no}: missing username or password, skipped")
+            stats['invalid'] += 1
+        elif row['email'] and not EMAIL_RE.match(row['email']):
+            print(f"  ⚠ line {line_no}: invalid email '{row['email']}', skipped")
+            stats['invalid'] += 1
+        elif row['class'] and row['class'] not in classes:
+            print(f"  ⚠ line {line_no}: unknown class '{row['class']}', skipped")
+            stats['invalid'] += 1
+        elif row['username'] in valid:
+            print(f"  ⚠ line {line_no}: duplicate username '{row['username']}', skipped")
+            stats['invalid'] += 1
+        else:
+            valid[row['username']] = row
+    if not valid:
+        return
+
+    names = list(valid)
+    credentialed = {
+        name for (name,) in session.query(UserInfo.username).filter(UserInfo.username.in_(names))
+    }
+    stats['skipped'] += len(credentialed)
+    new_rows = [row for name, row in valid.items() if name not in credentialed]
+    if not new_rows:
+        return
+
+    user_ids = dict(
+        session.query(orm.User.name, orm.User.id).filter(orm.User.name.in_([row['username'] for row in new_rows]))
+    )
+    missing = [row['username'] for row in new_rows if row['username'] not in user_ids]
+    if missing:
+        session.add_all([orm.User(name=name) for name in missing])
+        session.flush()
+        user_ids.update(session.query(orm.User.name, orm.User.id).filter(orm.User.name.in_(missing)))
+
+    hashes = hash_passwords([row['password'] for row in new_rows], rounds=rounds, pool=pool)
+    session.execute(insert(UserInfo.__table__), [
+        credential_row(row['username'], row['email'], password_hash)
+        for row, password_hash in zip(new_rows, hashes)
+    ])
+
+    memberships = [
+        {'user_id': user_ids[row['username']], 'group_id': classes[row['class']]}
+        for row in new_rows if row['class']
+    ]
+    if memberships:
+        # Students belong to exactly one class: replace any existing enrollment
+        session.execute(
+            orm.user_group_map.delete().where(
+                orm.user_group_map.c.user_id.in_([m['user_id'] for m in memberships]),
+                orm.user_group_map.c.group_id.in_(set(classes.values())),
+            )
+        )
+        session.execute(insert(orm.user_group_map), memberships)
+
+    session.commit()
+    stats['created'] += len(new_rows)
+    stats['enrolled'] += len(memberships)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import students from a CSV roster")
+    parser.add_argument('csv_path', help="CSV file with username,email,password,class columns")
+    parser.add_argument('--batch-size', type=int, default=1000, help="rows per transaction")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="password hashing processes")
+    parser.add_argument('--bcrypt-rounds', type=int, default=BCRYPT_ROUNDS, help="bcrypt cost factor")
+    args = parser.parse_args()
+
+    session = open_session()
+
+    print("=" * 60)
+    print(f"Importing students from {args.csv_path}")
+    print("=" * 60)
+
+    classes = load_class_groups(session)
+    stats = dict(created=0, enrolled=0, skipped=0, invalid=0)
+    rows_seen = 0
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for batch in batches(read_rows(args.csv_path), args.batch_size):
+            batch_started = time.perf_counter()
+            try:
+                import_batch(session, pool, batch, classes, stats, rounds=args.bcrypt_rounds)
+            except Exception as e:
+                session.rollback()
+                print(f"✗ Batch ending at line {batch[-1][0]} failed: {e}")
+                sys.exit(1)
+            rows_seen += len(batch)
+            elapsed = time.perf_counter() - started
+            print(
+                f"✓ {rows_seen} rows: {stats['created']} created, {stats['skipped']} existing, "
+                f"{stats['invalid']} invalid ({len(batch) / (time.perf_counter() - batch_started):.0f} rows/s, "
+                f"{rows_seen / elapsed:.0f} rows/s overall)"
+            )
+
+    session.close()
+    elapsed = time.perf_counter() - started
+    print()
+    print("=" * 60)
+    print(f"Import complete in {elapsed:.1f}s")
+    print("=" * 60)
+    print(f"Created:  {stats['created']} (enrolled in a class: {stats['enrolled']})")
+    print(f"Existing: {stats['skipped']} (skipped)")
+    print(f"Invalid:  {stats['invalid']} (skipped)")
+
+
+if __name__ == '__main__':
+    main()
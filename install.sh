@@ -49,6 +49,7 @@ if [ -z "$HUB_POD" ]; then
 fi
 
 echo "Copying setup script to hub pod..."
+kubectl cp provisioning.py $NAMESPACE/$HUB_POD:/tmp/provisioning.py
 kubectl cp setup_static_users.py $NAMESPACE/$HUB_POD:/tmp/setup_static_users.py
 
 echo "Running setup script in hub pod..."
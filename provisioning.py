@@ -0,0 +1,168 @@
+"""
+Account provisioning for the JupyterHub and NativeAuthenticator databases
+Shared by setup_static_users.py and import_students.py
+MUST BE RUN INSIDE THE HUB POD
+
+Provisioning is a diff: plan_accounts() compares the wanted accounts with
+the database using IN queries, and apply_plan() writes only the difference,
+one bulk statement per table and a single commit. Existing credentials are
+never re-hashed, so re-provisioning the same accounts does no bcrypt work.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from sqlalchemy import bindparam, create_engine, insert, update
+from sqlalchemy.orm import sessionmaker
+from nativeauthenticator.orm import UserInfo
+from jupyterhub import orm
+import base64
+import bcrypt
+import os
+
+
+# bcrypt cost factor (2^rounds iterations); bcrypt's own default is 12
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+
+# NativeAuthenticator's UserInfo email validation (bypassed by bulk inserts)
+EMAIL_PATTERN = r"^[A-Za-z0-9\.\+_-]+@[A-Za-z0-9\._-]+\.[a-zA-Z]*$"
+
+# groups: names of groups the account must be a member of
+AccountSpec = namedtuple('AccountSpec', ['username', 'email', 'password', 'is_admin', 'groups'])
+
+ProvisioningPlan = namedtuple('ProvisioningPlan', [
+    'new_users',        # AccountSpecs without an orm.User
+    'admin_changes',    # {username: is_admin} for existing users whose flag differs
+    'new_credentials',  # AccountSpecs without NativeAuthenticator credentials
+    'authorize',        # usernames with credentials that are not authorized yet
+    'new_memberships',  # [(username, group name)] missing group memberships
+    'unknown_groups',   # group names that do not exist
+])
+
+
+def open_session(db_url=None):
+    """Session on the hub database (JUPYTERHUB_DATABASE_URL or the hub's sqlite file)"""
+    db_url = db_url or os.environ.get('JUPYTERHUB_DATABASE_URL', 'sqlite:////srv/jupyterhub/jupyterhub.sqlite')
+    return sessionmaker(bind=create_engine(db_url))()
+
+
+def hash_password(password, rounds=BCRYPT_ROUNDS):
+    """bcrypt hash, as NativeAuthenticator stores it"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds))
+
+
+def hash_passwords(passwords, rounds=BCRYPT_ROUNDS, workers=None, pool=None):
+    """Hash passwords on a process pool (bcrypt is CPU-bound)"""
+    passwords = list(passwords)
+    hasher = partial(hash_password, rounds=rounds)
+    if pool is not None:
+        return list(pool.map(hasher, passwords, chunksize=16))
+    if len(passwords) < 2 or workers == 1:
+        return [hasher(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hasher, passwords, chunksize=16))
+
+
+def credential_row(username, email, password_hash):
+    """users_info row for a pre-authorized account, as UserInfo() would fill it"""
+    return {
+        'username': username,
+        'email': email or None,
+        'password': password_hash,
+        'is_authorized': True,
+        'otp_secret': base64.b32encode(os.urandom(10)).decode('utf-8'),
+    }
+
+
+def plan_accounts(session, accounts):
+    """Diff wanted AccountSpecs against the database"""
+    accounts = {account.username: account for account in accounts}
+    names = list(accounts)
+
+    users = dict(session.query(orm.User.name, orm.User.admin).filter(orm.User.name.in_(names)))
+    credentials = dict(
+        session.query(UserInfo.username, UserInfo.is_authorized).filter(UserInfo.username.in_(names))
+    )
+    wanted_groups = {group for account in accounts.values() for group in account.groups}
+    groups = dict(session.query(orm.Group.name, orm.Group.id).filter(orm.Group.name.in_(wanted_groups)))
+    memberships = set(
+        session.query(orm.User.name, orm.Group.name)
+        .join(orm.user_group_map, orm.user_group_map.c.user_id == orm.User.id)
+        .join(orm.Group, orm.Group.id == orm.user_group_map.c.group_id)
+        .filter(orm.User.name.in_(names), orm.Group.name.in_(wanted_groups))
+    )
+
+    return ProvisioningPlan(
+        new_users=[account for name, account in accounts.items() if name not in users],
+        admin_changes={
+            name: account.is_admin for name, account in accounts.items()
+            if name in users and bool(users[name]) != account.is_admin
+        },
+        new_credentials=[account for name, account in accounts.items() if name not in credentials],
+        authorize=[name for name, authorized in credentials.items() if not authorized],
+        new_memberships=[
+            (name, group) for name, account in accounts.items() for group in account.groups
+            if group in groups and (name, group) not in memberships
+        ],
+        unknown_groups=sorted(wanted_groups - set(groups)),
+    )
+
+
+def describe_plan(plan):
+    """Human readable lines describing what apply_plan() would change"""
+    lines = []
+    for account in plan.new_users:
+        lines.append(f"+ user {account.username}{' (admin)' if account.is_admin else ''}")
+    for name, is_admin in sorted(plan.admin_changes.items()):
+        lines.append(f"~ user {name}: admin={is_admin}")
+    for account in plan.new_credentials:
+        lines.append(f"+ credentials {account.username} <{account.email}>")
+    for name in plan.authorize:
+        lines.append(f"~ credentials {name}: authorize")
+    for name, group in plan.new_memberships:
+        lines.append(f"+ member {name} -> {group}")
+    for group in plan.unknown_groups:
+        lines.append(f"! group {group} does not exist, memberships skipped")
+    return lines
+
+
+def apply_plan(session, plan, rounds=BCRYPT_ROUNDS, workers=None, pool=None):
+    """Write a plan with one bulk statement per table and a single commit"""
+    if plan.new_users:
+        session.execute(insert(orm.User.__table__), [
+            {'name': account.username, 'admin': account.is_admin} for account in plan.new_users
+        ])
+    if plan.admin_changes:
+        session.execute(
+            update(orm.User.__table__)
+            .where(orm.User.__table__.c.name == bindparam('username'))
+            .values(admin=bindparam('is_admin')),
+            [{'username': name, 'is_admin': is_admin} for name, is_admin in plan.admin_changes.items()],
+        )
+
+    if plan.new_credentials:
+        hashes = hash_passwords(
+            [account.password for account in plan.new_credentials], rounds=rounds, workers=workers, pool=pool,
+        )
+        session.execute(insert(UserInfo.__table__), [
+            credential_row(account.username, account.email, password_hash)
+            for account, password_hash in zip(plan.new_credentials, hashes)
+        ])
+    if plan.authorize:
+        session.execute(
+            update(UserInfo.__table__)
+            .where(UserInfo.__table__.c.username.in_(plan.authorize))
+            .values(is_authorized=True)
+        )
+
+    if plan.new_memberships:
+        names = {name for name, _group in plan.new_memberships}
+        groups = {group for _name, group in plan.new_memberships}
+        user_ids = dict(session.query(orm.User.name, orm.User.id).filter(orm.User.name.in_(names)))
+        group_ids = dict(session.query(orm.Group.name, orm.Group.id).filter(orm.Group.name.in_(groups)))
+        session.execute(insert(orm.user_group_map), [
+            {'user_id': user_ids[name], 'group_id': group_ids[group]}
+            for name, group in plan.new_memberships
+        ])
+
+    session.commit()
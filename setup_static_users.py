@@ -5,12 +5,8 @@ Creates accounts in NativeAuthenticator database
 MUST BE RUN INSIDE THE HUB POD
 """
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from nativeauthenticator.orm import UserInfo
-from jupyterhub import orm
-import bcrypt
-import os
+from provisioning import AccountSpec, BCRYPT_ROUNDS, apply_plan, describe_plan, open_session, plan_accounts
+import argparse
 
 # Static user credentials
 STATIC_USERS = {
@@ -36,65 +32,59 @@ STATIC_USERS = {
     }
 }
 
-db_url = os.environ.get('JUPYTERHUB_DATABASE_URL', 'sqlite:////srv/jupyterhub/jupyterhub.sqlite')
-engine = create_engine(db_url)
-Session = sessionmaker(bind=engine)
-session = Session()
+def main():
+    parser = argparse.ArgumentParser(description="Create the admin and teacher accounts")
+    parser.add_argument('--dry-run', action='store_true', help="show what would change without writing")
+    parser.add_argument('--bcrypt-rounds', type=int, default=BCRYPT_ROUNDS, help="bcrypt cost factor")
+    parser.add_argument('--workers', type=int, default=None, help="password hashing processes")
+    args = parser.parse_args()
 
-print("=" * 60)
-print("Setting up static users (admin and teachers)")
-print("=" * 60)
-print()
+    session = open_session()
 
-for username, info in STATIC_USERS.items():
-    # 1. Create/Update JupyterHub user
-    jh_user = session.query(orm.User).filter_by(name=username).first()
-    if not jh_user:
-        jh_user = orm.User(name=username, admin=info['is_admin'])
-        session.add(jh_user)
-        print(f"✓ Created JupyterHub user '{username}'")
-    else:
-        jh_user.admin = info['is_admin']
-        print(f"✓ Updated JupyterHub user '{username}'")
-    
-    # 2. Create/Update NativeAuthenticator credentials
-    user_info = session.query(UserInfo).filter_by(username=username).first()
-    
-    if user_info:
-        print(f"  → NativeAuth credentials exist")
-        user_info.is_authorized = True
-    else:
-        # Hash password using bcrypt (NativeAuthenticator's method)
-        password_bytes = bcrypt.hashpw(info['password'].encode('utf-8'), bcrypt.gensalt())
-        
-        user_info = UserInfo(
-            username=username,
-            email=info['email'],
-            password=password_bytes,
-            is_authorized=True
-        )
-        session.add(user_info)
-        print(f"  → Created NativeAuth credentials")
-        print(f"     Email: {info['email']}")
-        print(f"     Password: {info['password']}")
-    
-    session.commit()
+    print("=" * 60)
+    print("Setting up static users (admin and teachers)")
+    print("=" * 60)
+    print()
 
-print()
-print("=" * 60)
-print("Static users setup complete!")
-print("=" * 60)
-print()
-print("Login credentials:")
-print("-" * 60)
-for username, info in STATIC_USERS.items():
-    role = "Admin" if info['is_admin'] else "Teacher"
-    print(f"{role:10} | Username: {username:15} | Password: {info['password']}")
-print()
-print("⚠️  IMPORTANT: Change these passwords in production!")
-print()
+    accounts = [
+        AccountSpec(username, info['email'], info['password'], info['is_admin'], info.get('groups', []))
+        for username, info in STATIC_USERS.items()
+    ]
+    plan = plan_accounts(session, accounts)
+    changes = describe_plan(plan)
+    for line in changes:
+        print(f"  {line}")
+    if not changes:
+        print("✓ All static users are up to date")
 
-session.close()
+    if args.dry_run:
+        print()
+        print("Dry run: nothing was written")
+        session.close()
+        return
 
+    apply_plan(session, plan, rounds=args.bcrypt_rounds, workers=args.workers)
+    for account in plan.new_credentials:
+        print(f"✓ Created NativeAuth credentials for '{account.username}'")
+        print(f"     Email: {account.email}")
+        print(f"     Password: {account.password}")
 
+    print()
+    print("=" * 60)
+    print("Static users setup complete!")
+    print("=" * 60)
+    print()
+    print("Login credentials:")
+    print("-" * 60)
+    for username, info in STATIC_USERS.items():
+        role = "Admin" if info['is_admin'] else "Teacher"
+        print(f"{role:10} | Username: {username:15} | Password: {info['password']}")
+    print()
+    print("⚠️  IMPORTANT: Change these passwords in production!")
+    print()
 
+    session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Loads the hub-config modules for the tests the way the chart does: every
+00_*.py module exec'd in name order into one shared namespace. Tests build
+their own schedulers, pools and advisors from the classes in it instead of
+using the module-level instances.
+"""
+
+import glob
+import os
+
+import pytest
+from jupyterhub import orm
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HUB_CONFIG_DIR = os.path.join(REPO_ROOT, 'hub-config')
+
+# Modules with side effects outside the hub process
+SKIPPED_MODULES = ('00_install_nativeauth.py',)
+
+
+@pytest.fixture(scope='session')
+def hub_config():
+    """Namespace of the 00_*.py hub-config modules (loaded once: they register metrics)"""
+    namespace = {}
+    for path in sorted(glob.glob(os.path.join(HUB_CONFIG_DIR, '00_*.py'))):
+        if os.path.basename(path) in SKIPPED_MODULES:
+            continue
+        with open(path) as f:
+            exec(compile(f.read(), path, 'exec'), namespace)
+    return namespace
+
+
+@pytest.fixture
+def db():
+    """Empty in-memory hub database"""
+    session = orm.new_session_factory('sqlite://')()
+    yield session
+    session.close()
+
+
+def add_class(db, class_name, members, properties=None):
+    """Class group with the given member names, creating the users"""
+    group = orm.Group(name=class_name, properties=properties or {})
+    db.add(group)
+    for name in members:
+        user = orm.User.find(db, name) or orm.User(name=name)
+        db.add(user)
+        group.users.append(user)
+    db.commit()
+    return group
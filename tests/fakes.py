@@ -0,0 +1,66 @@
+"""Offline stand-ins for the hub and the Kubernetes API"""
+
+
+class FakeSpawnBackend:
+    """Stand-in for HubSpawnBackend: records starts and stops"""
+
+    def __init__(self):
+        self.running = set()
+        self.activity = {}
+        self.started = []
+        self.stopped = []
+
+    def is_running(self, user_name):
+        return user_name in self.running
+
+    def last_activity(self, user_name):
+        return self.activity.get(user_name)
+
+    async def start(self, user_name):
+        self.running.add(user_name)
+        self.started.append(user_name)
+
+    async def stop(self, user_name):
+        self.running.discard(user_name)
+        self.stopped.append(user_name)
+
+
+class FakeClock:
+    """time.time stand-in that only moves when advanced"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakePlaceholderBackend:
+    """Stand-in for KubePlaceholderBackend: keeps placeholder pods in a dict"""
+
+    def __init__(self):
+        # name -> [slug, scheduled]
+        self.pods = {}
+        self.created = []
+        self.deleted = []
+
+    def schedule(self, *names):
+        """Mark placeholder pods as scheduled on a node"""
+        for name in names:
+            self.pods[name][1] = True
+
+    async def list(self, slug):
+        return {name: scheduled for name, (pod_slug, scheduled) in self.pods.items() if pod_slug == slug}
+
+    async def create(self, spec):
+        name = f"placeholder-{spec.slug}-{len(self.created)}"
+        self.pods[name] = [spec.slug, False]
+        self.created.append(name)
+        return name
+
+    async def delete(self, name):
+        self.pods.pop(name, None)
+        self.deleted.append(name)
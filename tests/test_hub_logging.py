@@ -0,0 +1,52 @@
+import glob
+import logging
+import os
+import re
+
+import pytest
+
+from conftest import HUB_CONFIG_DIR
+
+
+@pytest.fixture(autouse=True)
+def capture(caplog):
+    caplog.set_level(logging.INFO, logger='JupyterHub.custom')
+
+
+@pytest.fixture
+def log(hub_config):
+    clock = iter(range(1000)).__next__
+    return hub_config['HubLogger']('test', rate_limit=2, interval=3600, clock=clock)
+
+
+def test_info_is_sampled_per_event(log, caplog):
+    for _ in range(5):
+        log.info('test.viewed', user='stud0001')
+    log.info('test.other')
+    assert [str(record.msg) for record in caplog.records] == [
+        'test.viewed user=stud0001', 'test.viewed user=stud0001', 'test.other',
+    ]
+
+
+def test_audit_records_are_never_sampled(log, caplog):
+    for _ in range(5):
+        log.audit('test.updated', added=1)
+    assert len(caplog.records) == 5
+    assert all(record.levelno == logging.INFO for record in caplog.records)
+
+
+def test_audit_follows_the_level(hub_config, caplog):
+    log = hub_config['HubLogger']('test', level='WARNING')
+    log.audit('test.updated')
+    assert caplog.records == []
+
+
+def test_modules_bind_their_own_logger():
+    # Config files share one namespace: a second `log = get_logger(...)`
+    # would send every earlier module's records to the last logger
+    bound = []
+    for path in sorted(glob.glob(os.path.join(HUB_CONFIG_DIR, '*.py'))):
+        with open(path) as f:
+            bound += re.findall(r'^(\w+) = get_logger\(', f.read(), re.MULTILINE)
+    assert bound
+    assert len(bound) == len(set(bound))
@@ -0,0 +1,123 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from conftest import add_class
+from fakes import FakeClock, FakeSpawnBackend
+
+
+CLASS = 'teacher-prof-smith'
+STUDENTS = ['stud0001', 'stud0002', 'stud0003']
+# A Monday, 10 minutes before the lab below
+LEAD_TIME = (2026, 10, 19, 9, 55)
+
+
+@pytest.fixture
+def lab(hub_config, db):
+    add_class(db, CLASS, ['prof_smith'] + STUDENTS, {'lab_slots': [{'day': 'mon', 'start': '10:00'}]})
+    return db
+
+
+@pytest.fixture
+def clock(hub_config):
+    return FakeClock(datetime(*LEAD_TIME, tzinfo=hub_config['LAB_TIMEZONE']).timestamp())
+
+
+async def settle():
+    """Let started background tasks and their callbacks run"""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_parse_lab_slots_skips_malformed_entries(hub_config):
+    slots = hub_config['parse_lab_slots'](CLASS, {'lab_slots': [
+        {'day': 'Monday', 'start': '10:30', 'minutes': 90},
+        {'day': 'xyz', 'start': '10:00'},
+        {'day': 'tue'},
+    ]})
+    assert slots == [hub_config['LabSlot'](CLASS, 0, 10, 30, 90)]
+
+
+def test_tick_warms_enrolled_students_once(hub_config, lab, clock):
+    scheduler = hub_config['PrewarmScheduler'](clock=clock)
+    backend = FakeSpawnBackend()
+    backend.running.add('stud0002')
+
+    async def run():
+        first = await scheduler.tick(lab, backend, exclude={'prof_smith'})
+        await settle()
+        clock.advance(60)
+        second = await scheduler.tick(lab, backend, exclude={'prof_smith'})
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == (['stud0001', 'stud0003'], [])
+    assert second == ([], [])
+    assert backend.started == ['stud0001', 'stud0003']
+
+
+def test_tick_does_not_wait_for_spawns(hub_config, lab, clock):
+    scheduler = hub_config['PrewarmScheduler'](clock=clock)
+
+    class QueuedBackend(FakeSpawnBackend):
+        def __init__(self):
+            super().__init__()
+            self.admitted = asyncio.Event()
+
+        async def start(self, user_name):
+            await self.admitted.wait()
+            await super().start(user_name)
+
+    async def run():
+        backend = QueuedBackend()
+        started, _ = await asyncio.wait_for(scheduler.tick(lab, backend, exclude={'prof_smith'}), 1)
+        # Past the grace period while the spawns are still queued: nothing to stop yet
+        clock.advance(60 * 60)
+        assert await scheduler.tick(lab, backend) == ([], [])
+        backend.admitted.set()
+        await settle()
+        return started, backend
+
+    started, backend = asyncio.run(run())
+    assert started == STUDENTS
+    assert backend.started == STUDENTS
+    assert backend.stopped == []
+
+
+def test_tick_stops_unused_servers_after_grace(hub_config, lab, clock):
+    scheduler = hub_config['PrewarmScheduler'](clock=clock)
+    backend = FakeSpawnBackend()
+
+    async def run():
+        await scheduler.tick(lab, backend, exclude={'prof_smith'})
+        await settle()
+        # stud0001 logs in when the lab starts; the hub stores naive UTC times
+        clock.advance(5 * 60)
+        backend.activity['stud0001'] = datetime.fromtimestamp(clock(), timezone.utc).replace(tzinfo=None)
+        clock.advance(hub_config['PREWARM_GRACE_SECONDS'] + 60)
+        return await scheduler.tick(lab, backend)
+
+    assert asyncio.run(run()) == ([], ['stud0002', 'stud0003'])
+    assert backend.running == {'stud0001'}
+
+
+def test_failed_start_is_forgotten(hub_config, lab, clock):
+    scheduler = hub_config['PrewarmScheduler'](clock=clock)
+
+    class FailingBackend(FakeSpawnBackend):
+        async def start(self, user_name):
+            if user_name == 'stud0002':
+                raise RuntimeError("spawn failed")
+            await super().start(user_name)
+
+    backend = FailingBackend()
+
+    async def run():
+        await scheduler.tick(lab, backend, exclude={'prof_smith'})
+        await settle()
+        clock.advance(40 * 60)
+        return await scheduler.tick(lab, backend)
+
+    # Only the servers that did start are stopped again
+    assert asyncio.run(run()) == ([], ['stud0001', 'stud0003'])
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+from jupyterhub import orm
+
+from conftest import HUB_CONFIG_DIR, add_class
+
+
+@pytest.fixture
+def manage_groups(hub_config):
+    namespace = dict(hub_config)
+    path = os.path.join(HUB_CONFIG_DIR, '10_manage_groups.py')
+    with open(path) as f:
+        exec(compile(f.read(), path, 'exec'), namespace)
+    return namespace
+
+
+@pytest.fixture
+def classes(db):
+    add_class(db, 'teacher-prof-smith', ['stud0001', 'stud0002', 'stud0003'])
+    add_class(db, 'teacher-prof-jones', ['stud0004'])
+    for name in ('stud0001', 'stud0002', 'stud0004'):
+        db.add(orm.Spawner(name='', user=orm.User.find(db, name), server=orm.Server()))
+    db.commit()
+    return db
+
+
+def test_class_moves_notify_both_classes(hub_config, manage_groups, classes):
+    db = classes
+    index = hub_config['ServerIndex']()
+    manage_groups['server_index'] = index
+    events = []
+    index.add_listener(lambda class_name, user_name, active: events.append((class_name, user_name, active)))
+    index.is_running(db, 'stud0001')
+
+    ids = manage_groups['find_user_ids'](db, ['stud0001', 'stud0002', 'stud0003', 'stud0004'])
+    group_id = db.query(orm.Group.id).filter_by(name='teacher-prof-jones').scalar()
+    # stud0001 moves to jones, stud0004 leaves it, stud0003 has no server
+    add_ids = {ids['stud0001'], ids['stud0003']}
+    changes = manage_groups['change_group_members'](
+        db, group_id, add_ids, {ids['stud0004']}, 'teacher-prof-',
+    )
+    db.commit()
+    added_names = {ids[name]: name for name in ('stud0001', 'stud0003')}
+    manage_groups['reassign_running_servers'](db, 'teacher-prof-jones', changes, added_names)
+
+    assert sorted(events) == [
+        ('teacher-prof-jones', 'stud0001', True),
+        ('teacher-prof-jones', 'stud0004', False),
+        ('teacher-prof-smith', 'stud0001', False),
+    ]
+    assert index.class_running(db, 'teacher-prof-jones') == {'stud0001'}
+    assert index.class_running(db, 'teacher-prof-smith') == {'stud0002'}
+
+
+def test_replacing_members_keeps_protected_users(manage_groups, db):
+    add_class(db, 'study-group', ['prof_smith', 'admin', 'stud0001', 'stud0002'])
+    add_class(db, 'other-group', ['stud0003'])
+    ids = manage_groups['find_user_ids'](db, ['prof_smith', 'admin', 'stud0001', 'stud0002', 'stud0003'])
+    group_id = db.query(orm.Group.id).filter_by(name='study-group').scalar()
+
+    changes = manage_groups['replace_group_members'](
+        db, group_id, {ids['stud0002'], ids['stud0003']},
+        protected_ids={ids['prof_smith'], ids['admin']},
+    )
+    db.commit()
+
+    membership = orm.user_group_map
+    members = {
+        name for (name,) in db.query(orm.User.name).join(membership, membership.c.user_id == orm.User.id)
+        .filter(membership.c.group_id == group_id)
+    }
+    assert members == {'prof_smith', 'admin', 'stud0002', 'stud0003'}
+    assert changes.changed_user_ids == {ids['stud0001'], ids['stud0003']}
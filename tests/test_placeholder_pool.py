@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from fakes import FakePlaceholderBackend
+
+
+PROFILES = [
+    {'display_name': 'Student Environment', 'kubespawner_override': {'cpu_guarantee': 0.5, 'mem_guarantee': '1G'}},
+    {'display_name': 'GPU', 'slug': 'gpu', 'kubespawner_override': {'image': 'gpu:1'}},
+]
+
+
+@pytest.fixture
+def pool(hub_config):
+    specs = hub_config['placeholder_specs'](PROFILES, {'student-environment': 2}, default_image='lab:1')
+    pool = hub_config['PlaceholderPool']()
+    pool.configure({'student-environment': 2}, specs, FakePlaceholderBackend())
+    return pool
+
+
+def test_placeholder_specs_follow_profile_overrides(hub_config):
+    specs = hub_config['placeholder_specs'](PROFILES, {'student-environment': 2, 'gpu': 1}, default_image='lab:1')
+    spec = hub_config['PlaceholderSpec']
+    assert specs == {
+        # Requests in KubeSpawner's units: '1G' is 1024**3 bytes
+        'student-environment': spec('student-environment', 'lab:1', 0.5, 2**30),
+        'gpu': spec('gpu', 'gpu:1', None, None),
+    }
+
+
+def test_refill_fills_the_pool(pool):
+    asyncio.run(pool.refill_all())
+    assert len(pool.backend.pods) == 2
+    # Created placeholders are pending until the scheduler places them
+    assert pool.ready('student-environment') == 0
+
+
+def test_pending_placeholders_are_not_claimed(pool):
+    async def run():
+        await pool.refill_all()
+        return await pool.claim('student-environment')
+
+    assert asyncio.run(run()) is False
+    assert pool.backend.deleted == []
+
+
+def test_claim_waits_for_the_spawn_before_refilling(pool):
+    backend = pool.backend
+
+    async def run():
+        await pool.refill_all()
+        backend.schedule(*backend.pods)
+        await pool.refill_all()
+        assert await pool.claim('student-environment') is True
+        # The capacity just freed is left to the spawn, even on a periodic refill
+        await pool.refill_all()
+        assert len(backend.pods) == 1
+        pool.refill_after_spawn('student-environment')
+        await pool.refill_all()
+
+    asyncio.run(run())
+    assert len(backend.deleted) == 1
+    assert len(backend.pods) == 2
+    assert len(backend.created) == 3
+
+
+def test_claim_without_placeholders(pool):
+    async def run():
+        # An empty pool, and a profile that is not pooled
+        return await pool.claim('student-environment'), await pool.claim('gpu')
+
+    assert asyncio.run(run()) == (False, False)
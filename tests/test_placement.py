@@ -0,0 +1,101 @@
+import os
+
+import pytest
+import yaml
+from jupyterhub.traitlets import ByteSpecification
+from traitlets import TraitError
+from traitlets.config import Config
+
+from conftest import HUB_CONFIG_DIR, REPO_ROOT
+
+
+# A 'G' in KubeSpawner sizes
+GB = 2**30
+
+
+@pytest.fixture
+def advisor(hub_config):
+    node = hub_config['NodeCapacity']
+    return hub_config['PlacementAdvisor']([node('node-a', 4, 8 * GB), node('node-b', 4, 8 * GB)])
+
+
+def test_parse_quantities(hub_config):
+    parse_cpu, parse_memory = hub_config['parse_cpu'], hub_config['parse_memory']
+    parse_quantity = hub_config['parse_memory_quantity']
+    assert parse_cpu('500m') == 0.5
+    assert parse_cpu(2) == 2.0
+    assert parse_cpu(None) == 0.0
+    # Hub-side sizes are KubeSpawner's: powers of 1024
+    assert parse_memory('1G') == GB
+    assert parse_memory('2000M') == 2000 * 2**20
+    assert parse_memory(1024) == 1024
+    with pytest.raises(TraitError):
+        parse_memory('lots')
+    # Pod specs use Kubernetes quantities
+    assert parse_quantity('1G') == 10**9
+    assert parse_quantity('512Mi') == 512 * 2**20
+    with pytest.raises(ValueError):
+        parse_quantity('lots')
+
+
+def test_best_fit_fills_the_fullest_node(advisor):
+    assert advisor.reserve('stud0001', 1, 2 * GB) == 'node-a'
+    # node-a has the least room left afterwards
+    assert advisor.reserve('stud0002', 1, 2 * GB) == 'node-a'
+    # Too big for what is left on node-a
+    assert advisor.reserve('stud0003', 3, 2 * GB) == 'node-b'
+    assert advisor.free('node-a') == (2, 4 * GB)
+
+
+def test_full_cluster_raises(hub_config, advisor):
+    advisor.reserve('stud0001', 4, 2 * GB)
+    advisor.reserve('stud0002', 2, 8 * GB)
+    with pytest.raises(hub_config['ClusterFullError']) as error:
+        advisor.reserve('stud0003', 2, GB)
+    assert error.value.jupyterhub_message.startswith("The cluster is full: no node has 2 CPU and 1.0 GB")
+    # A failed reservation grants nothing; a stop frees room again
+    advisor.release('stud0002')
+    assert advisor.reserve('stud0003', 2, GB) == 'node-b'
+
+
+def test_sync_keeps_reservations_not_seen_yet(hub_config, advisor):
+    grant = hub_config['Grant']
+    advisor.reserve('stud0001', 1, GB)
+    advisor.reserve('stud0002', 1, GB)
+    advisor.sync({'stud0001': grant('node-b', 1, GB), 'stud0009': grant('node-b', 2, GB)})
+    assert advisor.free('node-a') == (3, 7 * GB)
+    assert advisor.free('node-b') == (1, 6 * GB)
+    # stud0001 was seen, so it is no longer kept when its pod disappears
+    advisor.sync({})
+    assert advisor.free('node-b') == (4, 8 * GB)
+    assert advisor.free('node-a') == (3, 7 * GB)
+
+
+def test_disabled_without_nodes(hub_config):
+    assert not hub_config['PlacementAdvisor']().enabled
+
+
+def test_reserved_requests_come_off_the_node(hub_config):
+    hub_config['schedule_placement'](
+        Config(),
+        nodes={'node-a': {'cpu': 2, 'memory': '2G'}},
+        reserved={'node-a': {'cpu': '200m', 'memory': '512M'}},
+    )
+    assert hub_config['placement_advisor'].free('node-a') == (1.8, 1.5 * GB)
+
+
+def test_shipped_placement_admits_a_default_profile_pod(hub_config):
+    with open(os.path.join(REPO_ROOT, 'config.yaml')) as f:
+        config = yaml.safe_load(f)
+    namespace = {**hub_config, 'c': Config()}
+    code = config['hub']['extraConfig']['00-placement']
+    exec(code.replace('/usr/local/etc/jupyterhub/hub-config', HUB_CONFIG_DIR), namespace)
+
+    profile = next(p for p in config['singleuser']['profileList'] if p.get('default'))
+    override = profile['kubespawner_override']
+    # The values KubeSpawner's traits hold once the profile is applied
+    cpu = float(override['cpu_guarantee'])
+    memory = ByteSpecification().validate(None, override['mem_guarantee'])
+    advisor = namespace['placement_advisor']
+    if advisor.enabled:
+        advisor.reserve('stud0001', cpu, memory)
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from fakes import FakeClock, FakeSpawnBackend
+
+
+CLASS = 'teacher-prof-smith'
+CLASS_PROPERTIES = {
+    CLASS: {'lab_slots': [{'day': 'mon', 'start': '10:00'}], 'idle_timeout_minutes': 30},
+    'teacher-prof-doe': {},
+}
+
+
+@pytest.fixture
+def lab_time(hub_config):
+    def at(day, hour, minute=0):
+        # October 2026, the 19th is a Monday
+        return datetime(2026, 10, day, hour, minute, tzinfo=hub_config['LAB_TIMEZONE'])
+    return at
+
+
+@pytest.fixture
+def culler(hub_config, lab_time):
+    return hub_config['IdleCuller'](batch_size=2, clock=FakeClock(lab_time(20, 14).timestamp()))
+
+
+def running(hub_config, user_name, class_name, idle_minutes, now):
+    """RunningServer idle for `idle_minutes`, with a naive UTC timestamp like the hub stores"""
+    last_activity = (now - timedelta(minutes=idle_minutes)).astimezone(timezone.utc).replace(tzinfo=None)
+    return hub_config['RunningServer'](user_name, class_name, last_activity)
+
+
+def test_timeout_precedence(hub_config, lab_time):
+    policy = hub_config['CullPolicy']()
+    assert policy.timeout(CLASS, CLASS_PROPERTIES, lab_time(19, 11)) == (3 * 60 * 60, 'lab in progress')
+    # The lab is over at 12:00
+    assert policy.timeout(CLASS, CLASS_PROPERTIES, lab_time(19, 12)) == (30 * 60, f"{CLASS} policy")
+    assert policy.timeout(CLASS, CLASS_PROPERTIES, lab_time(19, 22)) == (20 * 60, 'night')
+    assert policy.timeout(CLASS, CLASS_PROPERTIES, lab_time(20, 6, 59)) == (20 * 60, 'night')
+    assert policy.timeout('teacher-prof-doe', CLASS_PROPERTIES, lab_time(19, 11)) == (60 * 60, 'default')
+    assert policy.timeout(None, CLASS_PROPERTIES, lab_time(19, 11)) == (60 * 60, 'default')
+
+
+def test_select_most_idle_first_up_to_batch_size(hub_config, culler):
+    now = culler.now()
+    servers = [
+        running(hub_config, 'stud0001', CLASS, 31, now),
+        running(hub_config, 'stud0002', CLASS, 29, now),
+        running(hub_config, 'stud0003', 'teacher-prof-doe', 59, now),
+        running(hub_config, 'stud0004', 'teacher-prof-doe', 120, now),
+        running(hub_config, 'stud0005', None, 90, now),
+        hub_config['RunningServer']('stud0006', None, None),
+    ]
+    records = culler.select(servers, CLASS_PROPERTIES, now)
+    assert [record.user_name for record in records] == ['stud0004', 'stud0005']
+    assert records[0].reason == 'idle 120 min > 60 min (default)'
+
+
+def test_select_uses_the_class_policy(hub_config, culler):
+    now = culler.now()
+    servers = [running(hub_config, 'stud0001', CLASS, 31, now), running(hub_config, 'stud0002', CLASS, 29, now)]
+    records = culler.select(servers, CLASS_PROPERTIES, now)
+    assert [(record.user_name, record.timeout_minutes) for record in records] == [('stud0001', 30)]
+
+
+def test_cull_stops_idle_servers_and_keeps_history(hub_config, culler):
+    now = culler.now()
+
+    class Backend(FakeSpawnBackend):
+        async def stop(self, user_name):
+            if user_name == 'stud0002':
+                raise RuntimeError("stop failed")
+            await super().stop(user_name)
+
+    backend = Backend()
+    servers = [running(hub_config, 'stud0001', None, 90, now), running(hub_config, 'stud0002', None, 120, now)]
+    culled = asyncio.run(culler.cull(servers, CLASS_PROPERTIES, backend))
+
+    assert [record.user_name for record in culled] == ['stud0001']
+    assert backend.stopped == ['stud0001']
+    assert culler.recent() == culled